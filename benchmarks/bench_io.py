@@ -0,0 +1,116 @@
+"""Write-path benchmarks for `generate`.
+
+pipeline: simulates a high-latency output filesystem (NFS/SMB) by sleeping on
+every filesystem operation of the local sink, and compares direct writes with
+the pipelined writer.
+durability: real writes under each --durability level (none/batch/file), to
+show the throughput cost of each fsync policy on the filesystem under test.
+
+    python3 benchmarks/bench_io.py --products 50 --latency-ms 5
+    python3 benchmarks/bench_io.py --suite durability --dir /mnt/share/tmp
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from mvp_image_workflow.batch import ProductRow  # noqa: E402
+from mvp_image_workflow.generator import generate_product_package  # noqa: E402
+from mvp_image_workflow.storage import DURABILITY_LEVELS, LocalSink, PipelinedSink, Sink  # noqa: E402
+
+
+class LatencyLocalSink(LocalSink):
+    """LocalSink that pays a fixed round-trip delay per operation (open+write+rename ~ 3 ops)."""
+
+    def __init__(self, root: Path, latency: float) -> None:
+        super().__init__(root)
+        self.latency = latency
+
+    def ensure_dir(self, rel: str) -> None:
+        time.sleep(self.latency)
+        super().ensure_dir(rel)
+
+    def write_bytes(self, rel: str, data: bytes) -> None:
+        time.sleep(self.latency * 3)
+        super().write_bytes(rel, data)
+
+
+def _product(i: int) -> ProductRow:
+    return ProductRow(
+        product_id=f"SKU{i:06d}",
+        product_name_en="Stainless Steel Insulated Tumbler",
+        style_pack="minimal_white",
+        output_set="minimum",
+        units="cm",
+        dimensions_l="20",
+        dimensions_w="8",
+        dimensions_h="8",
+        specs=("Capacity: 500 ml", "Double-wall insulation", "Leak-proof lid", "BPA-free materials"),
+        howto_title="How to Use",
+        steps=("Fill with your drink", "Close the lid firmly", "Enjoy hot or cold beverages"),
+        tips=("Hand wash recommended",),
+        manager_notes=None,
+        must_have_keywords=None,
+        must_avoid_elements=None,
+        personalization_text_en="Happy Holidays",
+    )
+
+
+def _run(sink: Sink, root: Path, products: list[ProductRow]) -> float:
+    start = time.perf_counter()
+    with sink:
+        for p in products:
+            generate_product_package(p, root, batch_id="BENCH", sink=sink)
+    return time.perf_counter() - start
+
+
+def bench_pipeline(products: int, latency: float, workers: list[int]) -> None:
+    items = [_product(i) for i in range(products)]
+    print(f"pipelined writer: {products} products, {latency * 1000:.1f} ms injected latency per op")
+    baseline: float | None = None
+    for n in [1, *workers]:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            inner = LatencyLocalSink(root, latency)
+            sink: Sink = inner if n == 1 else PipelinedSink(inner, workers=n)
+            elapsed = _run(sink, root, items)
+        baseline = baseline or elapsed
+        label = "direct" if n == 1 else f"{n} io workers"
+        print(f"  {label:>14}: {elapsed:7.3f}s  {products / elapsed:8.1f} products/s  x{baseline / elapsed:.1f}")
+
+
+def bench_durability(products: int, base_dir: str | None) -> None:
+    items = [_product(i) for i in range(products)]
+    print(f"durability: {products} products, real writes under {base_dir or tempfile.gettempdir()}")
+    baseline: float | None = None
+    for level in DURABILITY_LEVELS:
+        with tempfile.TemporaryDirectory(dir=base_dir) as td:
+            root = Path(td)
+            elapsed = _run(LocalSink(root, durability=level), root, items)
+        baseline = baseline or elapsed
+        print(f"  {level:>14}: {elapsed:7.3f}s  {products / elapsed:8.1f} products/s  x{elapsed / baseline:.1f} time")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--suite", choices=["pipeline", "durability", "all"], default="all")
+    parser.add_argument("--products", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--workers", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--dir", default=None, help="Folder on the filesystem to measure (durability suite)")
+    args = parser.parse_args(argv)
+    if args.suite in {"pipeline", "all"}:
+        bench_pipeline(args.products, args.latency_ms / 1000.0, args.workers)
+    if args.suite in {"durability", "all"}:
+        bench_durability(args.products, args.dir)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
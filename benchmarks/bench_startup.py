@@ -0,0 +1,128 @@
+"""CLI startup benchmarks.
+
+imports: wall time of importing the CLI over a bare interpreter, plus the
+modules with the largest self import time (python -X importtime).
+validate: wall time of `validate` on a one-product tree, end to end.
+many: N single-catalog `generate` invocations against one `generate-many`.
+
+Bytecode is compiled up front so every run measures a warm __pycache__, as an
+installed package would (PYTHONDONTWRITEBYTECODE would otherwise hide it).
+
+    python3 benchmarks/bench_startup.py
+    python3 benchmarks/bench_startup.py --suite many --batches 40
+"""
+
+from __future__ import annotations
+
+import argparse
+import compileall
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+EXAMPLE_CSV = REPO_ROOT / "examples" / "products_minimum.csv"
+ENV = {**os.environ, "PYTHONPATH": str(REPO_ROOT)}
+
+
+def _wall(cmd: list[str], runs: int) -> float:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(cmd, env=ENV, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def _cli(*args: str) -> list[str]:
+    return [sys.executable, "-m", "mvp_image_workflow", *args]
+
+
+def bench_imports(runs: int, top: int) -> None:
+    bare = _wall([sys.executable, "-c", "pass"], runs)
+    cli = _wall([sys.executable, "-c", "import mvp_image_workflow.cli"], runs)
+    print(f"imports: median of {runs} runs")
+    print(f"  {'interpreter':>14}: {bare * 1000:7.1f} ms")
+    print(f"  {'cli import':>14}: {cli * 1000:7.1f} ms  (+{(cli - bare) * 1000:.1f} ms)")
+
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import mvp_image_workflow.cli"],
+        env=ENV,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        parts = line.removeprefix("import time:").split("|")
+        if len(parts) == 3 and parts[0].strip().isdigit():
+            rows.append((int(parts[0]), parts[2].strip()))
+    print(f"  largest self import times ({len(rows)} modules):")
+    for us, name in sorted(rows, reverse=True)[:top]:
+        print(f"    {us / 1000:6.1f} ms  {name}")
+
+
+def bench_validate(runs: int) -> None:
+    with tempfile.TemporaryDirectory() as td:
+        out = str(Path(td) / "out")
+        subprocess.run(_cli("generate", "--input", str(EXAMPLE_CSV), "--out", out), env=ENV, check=True,
+                       stdout=subprocess.DEVNULL)
+        elapsed = _wall(_cli("validate", "--out", out), runs)
+    print(f"validate (1 product): {elapsed * 1000:7.1f} ms median of {runs} runs")
+
+
+def bench_many(batches: int) -> None:
+    with tempfile.TemporaryDirectory() as td:
+        root = Path(td)
+        cats = root / "catalogs"
+        cats.mkdir()
+        for i in range(batches):
+            shutil.copyfile(EXAMPLE_CSV, cats / f"supplier_{i:03d}.csv")
+
+        start = time.perf_counter()
+        for catalog in sorted(cats.glob("*.csv")):
+            subprocess.run(
+                _cli("generate", "--input", str(catalog), "--out", str(root / "single" / catalog.stem)),
+                env=ENV,
+                stdout=subprocess.DEVNULL,
+                check=True,
+            )
+        single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        subprocess.run(
+            _cli("generate-many", "--input-dir", str(cats), "--out", str(root / "many")),
+            env=ENV,
+            stdout=subprocess.DEVNULL,
+            check=True,
+        )
+        many = time.perf_counter() - start
+    print(f"many: {batches} one-product catalogs")
+    print(f"  {'generate xN':>14}: {single:7.3f}s  {single / batches * 1000:7.1f} ms/batch")
+    print(f"  {'generate-many':>14}: {many:7.3f}s  {many / batches * 1000:7.1f} ms/batch  x{single / many:.1f}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--suite", choices=["imports", "validate", "many", "all"], default="all")
+    parser.add_argument("--runs", type=int, default=15)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--batches", type=int, default=20)
+    args = parser.parse_args(argv)
+    compileall.compile_dir(REPO_ROOT / "mvp_image_workflow", quiet=1, force=True)
+    if args.suite in {"imports", "all"}:
+        bench_imports(args.runs, args.top)
+    if args.suite in {"validate", "all"}:
+        bench_validate(args.runs)
+    if args.suite in {"many", "all"}:
+        bench_many(args.batches)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
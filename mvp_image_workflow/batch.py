@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass, fields
 
 
 @dataclass(frozen=True)
@@ -29,3 +29,15 @@ class ProductRow:
 
 DEFAULT_STYLE_PACK = "minimal_white"
 DEFAULT_OUTPUT_SET = "minimum"
+
+
+def product_to_dict(product: ProductRow) -> dict:
+    return asdict(product)
+
+
+def product_from_dict(data: dict) -> ProductRow:
+    values = {}
+    for f in fields(ProductRow):
+        v = data.get(f.name)
+        values[f.name] = tuple(v) if isinstance(v, list) else v
+    return ProductRow(**values)
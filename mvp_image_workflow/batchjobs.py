@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import csv
+from dataclasses import dataclass
+from pathlib import Path
+
+from .util import ValidationError, safe_id
+
+
+@dataclass(frozen=True)
+class BatchJob:
+    """One catalog CSV generated into one output root, as a `generate` run would."""
+
+    input: Path
+    out: str
+    batch_id: str | None
+
+
+def _resolve(base: Path, value: str) -> str:
+    if value.startswith("s3://") or Path(value).is_absolute():
+        return value
+    return str(base / value)
+
+
+def read_batch_jobs_csv(path: str | Path, batch_id: str | None = None) -> list[BatchJob]:
+    """Read input,out[,batch_id] rows; relative paths are taken from the jobs CSV's folder."""
+    p = Path(path)
+    if not p.exists():
+        raise ValidationError(f"Jobs CSV not found: {p}")
+    jobs: list[BatchJob] = []
+    with p.open("r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.DictReader(f)
+        if reader.fieldnames is None or not {"input", "out"} <= set(reader.fieldnames):
+            raise ValidationError("Jobs CSV needs 'input' and 'out' columns (and optionally 'batch_id').")
+        for idx, row in enumerate(reader, start=2):
+            catalog = (row.get("input") or "").strip()
+            out = (row.get("out") or "").strip()
+            if not catalog or not out:
+                raise ValidationError(f"Jobs CSV line {idx}: input and out are required")
+            jobs.append(
+                BatchJob(
+                    input=Path(_resolve(p.parent, catalog)),
+                    out=_resolve(p.parent, out),
+                    batch_id=(row.get("batch_id") or "").strip() or batch_id,
+                )
+            )
+    if not jobs:
+        raise ValidationError(f"No jobs in {p}")
+    return jobs
+
+
+def discover_batch_jobs(input_dir: str | Path, out_root: str, batch_id: str | None = None) -> list[BatchJob]:
+    """One job per *.csv in `input_dir`, written to <out_root>/<csv stem>."""
+    folder = Path(input_dir)
+    if not folder.is_dir():
+        raise ValidationError(f"Input folder not found: {folder}")
+    catalogs = sorted(c for c in folder.glob("*.csv") if c.is_file())
+    if not catalogs:
+        raise ValidationError(f"No .csv catalogs found in: {folder}")
+    jobs = []
+    for catalog in catalogs:
+        if safe_id(catalog.stem) != catalog.stem:
+            raise ValidationError(
+                f"Catalog file name '{catalog.name}' cannot be used as an output folder; "
+                "allowed: letters, numbers, '-' and '_'"
+            )
+        if out_root.startswith("s3://"):
+            out = f"{out_root.rstrip('/')}/{catalog.stem}"
+        else:
+            out = str(Path(out_root) / catalog.stem)
+        jobs.append(BatchJob(input=catalog, out=out, batch_id=batch_id))
+    return jobs
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import csv
+import hashlib
+import heapq
+import json
+import os
+import tempfile
+from contextlib import ExitStack
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+from .batch import product_from_dict, product_to_dict
+from .io_csv import PRODUCT_CSV_FIELDS, iter_products_csv, product_to_csv_row
+from .util import ValidationError
+
+DEFAULT_RUN_ROWS = 100_000
+CHANGE_COLUMN = "change"
+
+
+@dataclass
+class CatalogDiff:
+    added: int = 0
+    modified: int = 0
+    removed: int = 0
+    unchanged: int = 0
+
+
+def _row_digest(payload: str) -> str:
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _write_runs(csv_path: str | Path, work_dir: Path, tag: str, run_rows: int, keep_payload: bool) -> list[Path]:
+    """Split a catalog into sorted run files of `product_id \\t sha256 \\t payload` lines."""
+    runs: list[Path] = []
+    buffer: list[tuple[str, str]] = []
+
+    def flush() -> None:
+        buffer.sort()
+        run = work_dir / f"{tag}-{len(runs):05d}.run"
+        with run.open("w", encoding="utf-8", newline="\n") as f:
+            f.writelines(f"{pid}\t{line}\n" for pid, line in buffer)
+        runs.append(run)
+        buffer.clear()
+
+    for product in iter_products_csv(csv_path):
+        # product_id is restricted to [A-Za-z0-9_-] and JSON escapes newlines, so lines stay tab-separable.
+        payload = json.dumps(product_to_dict(product), sort_keys=True, ensure_ascii=False)
+        digest = _row_digest(payload)
+        buffer.append((product.product_id, f"{digest}\t{payload}" if keep_payload else digest))
+        if len(buffer) >= run_rows:
+            flush()
+    if buffer:
+        flush()
+    if not runs:
+        raise ValidationError(f"CSV has no product rows: {csv_path}")
+    return runs
+
+
+def _merged(runs: list[Path], stack: ExitStack, label: str) -> Iterator[tuple[str, str, str]]:
+    files = [stack.enter_context(run.open("r", encoding="utf-8")) for run in runs]
+    # '\t' sorts below every product_id character, so whole-line order is product_id order.
+    previous = None
+    for line in heapq.merge(*files):
+        pid, _, rest = line.rstrip("\n").partition("\t")
+        if pid == previous:
+            raise ValidationError(f"Duplicate product_id in {label}: '{pid}'")
+        previous = pid
+        digest, _, payload = rest.partition("\t")
+        yield pid, digest, payload
+
+
+def diff_catalogs(
+    old_csv: str | Path,
+    new_csv: str | Path,
+    out_csv: str | Path,
+    removed_out: str | Path | None = None,
+    run_rows: int = DEFAULT_RUN_ROWS,
+    tmp_dir: str | Path | None = None,
+) -> CatalogDiff:
+    """Write the added and modified rows of `new_csv` to `out_csv` (a valid generate input).
+
+    Both catalogs are streamed through the CSV validation, cut into sorted runs of at
+    most `run_rows` rows on disk and merge-joined, so memory stays bounded by the run
+    size rather than the catalog size.
+    """
+    if run_rows < 1:
+        raise ValidationError("run_rows must be >= 1")
+    result = CatalogDiff()
+    out_path = Path(out_csv)
+    with tempfile.TemporaryDirectory(dir=tmp_dir, prefix="catalog-diff-") as td, ExitStack() as stack:
+        work_dir = Path(td)
+        old_runs = _write_runs(old_csv, work_dir, "old", run_rows, keep_payload=False)
+        new_runs = _write_runs(new_csv, work_dir, "new", run_rows, keep_payload=True)
+        old_iter = _merged(old_runs, stack, str(old_csv))
+        new_iter = _merged(new_runs, stack, str(new_csv))
+
+        tmp_out = stack.enter_context(
+            tempfile.NamedTemporaryFile(
+                "w", encoding="utf-8", newline="", dir=out_path.parent, prefix=f".{out_path.name}.", delete=False
+            )
+        )
+        removed_f = None
+        if removed_out is not None:
+            removed_f = stack.enter_context(Path(removed_out).open("w", encoding="utf-8", newline="\n"))
+        writer = csv.DictWriter(tmp_out, fieldnames=[*PRODUCT_CSV_FIELDS, CHANGE_COLUMN])
+        writer.writeheader()
+
+        def emit(payload: str, change: str) -> None:
+            row = product_to_csv_row(product_from_dict(json.loads(payload)))
+            row[CHANGE_COLUMN] = change
+            writer.writerow(row)
+
+        try:
+            old = next(old_iter, None)
+            new = next(new_iter, None)
+            while old is not None or new is not None:
+                if new is None or (old is not None and old[0] < new[0]):
+                    result.removed += 1
+                    if removed_f is not None:
+                        removed_f.write(old[0] + "\n")
+                    old = next(old_iter, None)
+                elif old is None or new[0] < old[0]:
+                    result.added += 1
+                    emit(new[2], "added")
+                    new = next(new_iter, None)
+                else:
+                    if old[1] == new[1]:
+                        result.unchanged += 1
+                    else:
+                        result.modified += 1
+                        emit(new[2], "modified")
+                    old = next(old_iter, None)
+                    new = next(new_iter, None)
+            tmp_out.close()
+            os.replace(tmp_out.name, out_path)
+        except BaseException:
+            tmp_out.close()
+            Path(tmp_out.name).unlink(missing_ok=True)
+            raise
+    return result
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from contextlib import AbstractContextManager
+
+from .locking import ROOT_LOCK
+from .storage import Sink
+from .util import ValidationError, now_utc_iso
+
+CHANGE_LOG_NAME = "changes.json"
+
+
+def load_change_index(sink: Sink) -> dict[str, dict[str, dict]]:
+    """Size and sha256 of every live file in the root's changes.json, by product; {} without one."""
+    raw = sink.read_bytes(CHANGE_LOG_NAME)
+    if raw is None:
+        return {}
+    try:
+        data = json.loads(raw.decode("utf-8"))
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValidationError(f"Invalid JSON in existing {CHANGE_LOG_NAME}: {e}") from None
+    products = data.get("products") if isinstance(data, dict) else None
+    if not isinstance(products, dict):
+        raise ValidationError(f"Invalid existing {CHANGE_LOG_NAME}: missing 'products' object")
+
+    previous: dict[str, dict[str, dict]] = {}
+    for pid, entry in products.items():
+        if not isinstance(entry, dict) or entry.get("status") == "removed":
+            continue
+        files = entry.get("files")
+        if not isinstance(files, dict):
+            continue
+        previous[pid] = {
+            rel: {"size": info.get("size"), "sha256": info.get("sha256")}
+            for rel, info in files.items()
+            if isinstance(info, dict) and info.get("status") != "removed"
+        }
+    return previous
+
+
+class ChangeLogSink(Sink):
+    """Records what a run wrote and emits changes.json at the output root on close.
+
+    Each file is classified against the previous run's change log as added, modified or
+    unchanged, with its size and sha256, so downstream sync can act on the delta only.
+    Products and files this run did not write are still on disk and are carried forward
+    unchanged; only a `full_catalog` run, whose input is the whole catalog, reports them
+    as removed.
+    """
+
+    name = "changes"
+
+    def __init__(
+        self,
+        inner: Sink,
+        batch_id: str | None = None,
+        generated_at: str | None = None,
+        sort_keys: bool = False,
+        full_catalog: bool = False,
+    ) -> None:
+        self.inner = inner
+        self.full_catalog = full_catalog
+        self.batch_id = batch_id
+        self.generated_at = generated_at
+        self.sort_keys = sort_keys
+        self._written: dict[str, dict[str, dict]] = {}
+        self._lock = threading.Lock()
+
+    def ensure_dir(self, rel: str) -> None:
+        self.inner.ensure_dir(rel)
+
+    def read_bytes(self, rel: str) -> bytes | None:
+        return self.inner.read_bytes(rel)
+
+    def exists(self, rel: str) -> bool:
+        return self.inner.exists(rel)
+
+    def lock(self, name: str) -> AbstractContextManager[None]:
+        return self.inner.lock(name)
+
+    def write_bytes(self, rel: str, data: bytes) -> None:
+        product, _, file_rel = rel.partition("/")
+        if file_rel:
+            info = {"size": len(data), "sha256": hashlib.sha256(data).hexdigest()}
+            with self._lock:
+                self._written.setdefault(product, {})[file_rel] = info
+        self.inner.write_bytes(rel, data)
+
+    def written_totals(self) -> tuple[int, int]:
+        """(files, bytes) of package files written so far."""
+        with self._lock:
+            infos = [info for files in self._written.values() for info in files.values()]
+        return len(infos), sum(info["size"] for info in infos)
+
+    def build_change_log(self) -> dict:
+        previous = load_change_index(self.inner)
+        products: dict[str, dict] = {}
+        summary = {status: 0 for status in ("added", "modified", "unchanged", "removed")}
+
+        for pid, files in self._written.items():
+            before = previous.get(pid)
+            before_files = before or {}
+            entry_files: dict[str, dict] = {}
+            for file_rel, info in files.items():
+                prev = before_files.get(file_rel)
+                if prev is None:
+                    status = "added"
+                elif prev.get("sha256") == info["sha256"] and prev.get("size") == info["size"]:
+                    status = "unchanged"
+                else:
+                    status = "modified"
+                entry_files[file_rel] = {"status": status, **info}
+            stale = "removed" if self.full_catalog else "unchanged"
+            for file_rel in sorted(set(before_files) - set(files)):
+                entry_files[file_rel] = {"status": stale, **before_files[file_rel]}
+
+            if before is None:
+                product_status = "added"
+            elif all(f["status"] == "unchanged" for f in entry_files.values()):
+                product_status = "unchanged"
+            else:
+                product_status = "modified"
+            summary[product_status] += 1
+            products[pid] = {"status": product_status, "files": entry_files}
+
+        for pid in sorted(set(previous) - set(self._written)):
+            stale = "removed" if self.full_catalog else "unchanged"
+            summary[stale] += 1
+            products[pid] = {
+                "status": stale,
+                "files": {rel: {"status": stale, **info} for rel, info in previous[pid].items()},
+            }
+
+        return {
+            "generated_at_utc": self.generated_at or now_utc_iso(),
+            "batch_id": self.batch_id,
+            "summary": summary,
+            "products": products,
+        }
+
+    def close(self) -> None:
+        # Root-level files are read-modify-write; concurrent runs on one root take turns.
+        with self.inner.lock(ROOT_LOCK):
+            log = self.build_change_log()
+            text = json.dumps(log, ensure_ascii=False, indent=2, sort_keys=self.sort_keys) + "\n"
+            self.inner.write_bytes(CHANGE_LOG_NAME, text.encode("utf-8"))
+        self.inner.close()
+
+    def abort(self) -> None:
+        self.inner.abort()
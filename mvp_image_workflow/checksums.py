@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AbstractContextManager
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
+
+from .locking import state_dir
+from .storage import Sink, atomic_write_bytes
+from .util import ValidationError
+
+# sha256sum-compatible sidecar, so `sha256sum -c checksums.sha256` also works inside a package.
+CHECKSUM_FILE = "checksums.sha256"
+VERIFY_CACHE_FILE = "verify-cache.json"  # in the root's state folder, so verify leaves the root untouched
+
+_MMAP_THRESHOLD = 4 * 1024 * 1024
+_READ_CHUNK = 1024 * 1024
+
+
+def format_checksums(checksums: dict[str, str]) -> str:
+    return "".join(f"{digest}  {rel}\n" for rel, digest in sorted(checksums.items()))
+
+
+def parse_checksums(text: str, source: str = CHECKSUM_FILE) -> dict[str, str]:
+    checksums: dict[str, str] = {}
+    for lineno, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        digest, sep, rel = line.partition("  ")
+        if not sep or len(digest) != 64 or not rel:
+            raise ValidationError(f"Invalid line {lineno} in {source}: expected '<sha256>  <path>'")
+        rel_path = Path(rel)
+        if rel_path.is_absolute() or ".." in rel_path.parts:
+            raise ValidationError(f"Invalid path on line {lineno} in {source}: {rel}")
+        checksums[rel] = digest.lower()
+    return checksums
+
+
+class ChecksumSink(Sink):
+    """Remembers the sha256 of every file written under one product folder."""
+
+    name = "checksums"
+
+    def __init__(self, inner: Sink, product_dir: PurePosixPath) -> None:
+        self.inner = inner
+        self.product_dir = product_dir
+        self.checksums: dict[str, str] = {}
+
+    def ensure_dir(self, rel: str) -> None:
+        self.inner.ensure_dir(rel)
+
+    def read_bytes(self, rel: str) -> bytes | None:
+        return self.inner.read_bytes(rel)
+
+    def exists(self, rel: str) -> bool:
+        return self.inner.exists(rel)
+
+    def lock(self, name: str) -> AbstractContextManager[None]:
+        return self.inner.lock(name)
+
+    def write_bytes(self, rel: str, data: bytes) -> None:
+        self.inner.write_bytes(rel, data)
+        file_rel = PurePosixPath(rel).relative_to(self.product_dir).as_posix()
+        self.checksums[file_rel] = hashlib.sha256(data).hexdigest()
+
+    def write_sidecar(self) -> None:
+        """Write checksums.sha256, keeping entries for files this run did not produce (images, sources)
+        as long as they are still in the package."""
+        sidecar = (self.product_dir / CHECKSUM_FILE).as_posix()
+        merged: dict[str, str] = {}
+        raw = self.inner.read_bytes(sidecar)
+        if raw is not None:
+            for rel, digest in parse_checksums(raw.decode("utf-8"), source=sidecar).items():
+                if rel in self.checksums or self.inner.exists((self.product_dir / rel).as_posix()):
+                    merged[rel] = digest
+        merged.update(self.checksums)
+        self.inner.write_bytes(sidecar, format_checksums(merged).encode("utf-8"))
+
+
+def hash_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= _MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                h.update(m)
+        else:
+            while True:
+                chunk = f.read(_READ_CHUNK)
+                if not chunk:
+                    break
+                h.update(chunk)
+    return h.hexdigest()
+
+
+def _package_files(product_dir: Path) -> list[str]:
+    files = []
+    for p in product_dir.rglob("*"):
+        if not p.is_file() or p.name == CHECKSUM_FILE or p.name.startswith("."):
+            continue
+        files.append(p.relative_to(product_dir).as_posix())
+    return sorted(files)
+
+
+def seal_package(product_dir: str | Path, workers: int = 8) -> int:
+    """Record checksums of every file currently in the package (texts, images, sources)."""
+    root = Path(product_dir)
+    if not (root / "manifest.json").is_file():
+        raise ValidationError(f"Missing required file: {root / 'manifest.json'}")
+    files = _package_files(root)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        digests = list(pool.map(hash_file, [root / rel for rel in files]))
+    atomic_write_bytes(root / CHECKSUM_FILE, format_checksums(dict(zip(files, digests))).encode("utf-8"))
+    return len(files)
+
+
+def update_sidecar(product_dir: Path, entries: dict[str, str]) -> None:
+    """Refresh some entries of an existing checksums.sha256 after files changed outside generate."""
+    sidecar = product_dir / CHECKSUM_FILE
+    if not sidecar.is_file():
+        return
+    checksums = {
+        rel: digest
+        for rel, digest in parse_checksums(sidecar.read_text(encoding="utf-8"), source=str(sidecar)).items()
+        if (product_dir / rel).is_file()
+    }
+    checksums.update(entries)
+    atomic_write_bytes(sidecar, format_checksums(checksums).encode("utf-8"))
+
+
+def _stat_signature(st: os.stat_result) -> list[int]:
+    return [st.st_size, st.st_mtime_ns, st.st_ino, st.st_ctime_ns]
+
+
+@dataclass
+class VerifyResult:
+    packages: int = 0
+    files: int = 0
+    hashed: int = 0
+    cached: int = 0
+    unrecorded: int = 0
+    problems: list[str] = field(default_factory=list)
+
+
+def verify_packages(
+    out_root: str | Path,
+    product_dirs: list[Path],
+    workers: int = 8,
+    use_cache: bool = True,
+) -> VerifyResult:
+    """Check package files against their checksums.sha256 sidecars.
+
+    Files whose stat signature (size, mtime, inode, ctime) matches the previous
+    successful verification are not re-read.
+    """
+    root = Path(out_root)
+    cache_path = state_dir(root) / VERIFY_CACHE_FILE
+    cache: dict[str, list] = {}
+    if use_cache and cache_path.is_file():
+        try:
+            loaded = json.loads(cache_path.read_text(encoding="utf-8"))
+            if isinstance(loaded, dict):
+                cache = loaded
+        except json.JSONDecodeError:
+            cache = {}
+
+    result = VerifyResult()
+    to_hash: list[tuple[str, Path, str, list[int]]] = []
+    # Entries of packages outside this run (e.g. verify --product-id) are kept for the next full pass.
+    prefixes = tuple(f"{d.relative_to(root).as_posix()}/" for d in product_dirs)
+    new_cache: dict[str, list] = {k: v for k, v in cache.items() if not k.startswith(prefixes)}
+    for product_dir in product_dirs:
+        sidecar = product_dir / CHECKSUM_FILE
+        if not sidecar.is_file():
+            result.problems.append(f"{product_dir}: missing {CHECKSUM_FILE}")
+            continue
+        recorded = parse_checksums(sidecar.read_text(encoding="utf-8"), source=str(sidecar))
+        result.packages += 1
+        result.unrecorded += len(set(_package_files(product_dir)) - set(recorded))
+        for rel, digest in recorded.items():
+            path = product_dir / rel
+            key = path.relative_to(root).as_posix()
+            try:
+                sig = _stat_signature(path.stat())
+            except FileNotFoundError:
+                result.problems.append(f"{key}: missing")
+                continue
+            result.files += 1
+            cached = cache.get(key)
+            if use_cache and cached == [*sig, digest]:
+                result.cached += 1
+                new_cache[key] = cached
+                continue
+            to_hash.append((key, path, digest, sig))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        actual = list(pool.map(hash_file, [path for _key, path, _digest, _sig in to_hash]))
+    result.hashed = len(to_hash)
+    for (key, _path, digest, sig), got in zip(to_hash, actual):
+        if got != digest:
+            result.problems.append(f"{key}: checksum mismatch (expected {digest[:12]}..., got {got[:12]}...)")
+        else:
+            new_cache[key] = [*sig, digest]
+
+    if use_cache:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_bytes(cache_path, (json.dumps(new_cache, sort_keys=True) + "\n").encode("utf-8"))
+    return result
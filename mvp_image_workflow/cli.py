@@ -1,46 +1,384 @@
 from __future__ import annotations
 
 import argparse
+import json
 import os
 import sys
-import traceback
+import tempfile
+import time
 from pathlib import Path
+from typing import Callable
 
-from .generator import generate_product_package
-from .io_csv import read_products_csv
-from .util import ValidationError, safe_id
-from .validator import validate_product_package
+from .batch import ProductRow
+from .locking import DEFAULT_LOCK_TIMEOUT
+from .runledger import (
+    RUN_LEDGER_NAME,
+    RunRecorder,
+    append_run_ledger_file,
+    append_run_record,
+    input_fingerprint,
+    write_metrics_file,
+)
+from .sharding import parse_shard, packaged_product_ids, verify_shard_coverage
+from .storage import DURABILITY_LEVELS, LocalSink, atomic_write_bytes, open_sink
+from .util import ValidationError, parse_source_date_epoch, safe_id, utc_iso_from_epoch
 
 
-def _cmd_generate(args: argparse.Namespace) -> int:
-    products = read_products_csv(args.input)
-    out_root = Path(args.out)
-
-    if out_root.exists() and not out_root.is_dir():
-        raise ValidationError(f"Output root must be a directory: {out_root}")
-    out_root.mkdir(parents=True, exist_ok=True)
+def _read_unique_products(path: str) -> list[ProductRow]:
+    from .io_csv import read_products_csv
 
+    products = read_products_csv(path)
     seen_product_ids: set[str] = set()
     for p in products:
         if p.product_id in seen_product_ids:
             raise ValidationError(f"Duplicate product_id in CSV: '{p.product_id}'")
         seen_product_ids.add(p.product_id)
+    return products
+
+
+def _finish_run(
+    run: RunRecorder, args: argparse.Namespace, ledger_out: str | None, create_ledger: bool = True
+) -> None:
+    record = run.record()
+    lock_timeout = getattr(args, "lock_timeout", DEFAULT_LOCK_TIMEOUT)
+    if args.run_ledger:
+        append_run_ledger_file(args.run_ledger, record, lock_timeout=lock_timeout)
+    elif ledger_out is not None:
+        with open_sink(
+            ledger_out,
+            endpoint_url=getattr(args, "s3_endpoint_url", None),
+            lock_timeout=lock_timeout,
+            durability=getattr(args, "durability", "none"),
+        ) as sink:
+            append_run_record(sink, record, create=create_ledger)
+    if args.metrics_file:
+        write_metrics_file(args.metrics_file, record)
+
+
+def _finish_failed_run(
+    run: RunRecorder, args: argparse.Namespace, ledger_out: str | None, create_ledger: bool = True
+) -> None:
+    # The run's own error is what the caller reports; a ledger problem on top of it is only a warning.
+    try:
+        _finish_run(run, args, ledger_out, create_ledger=create_ledger)
+    except Exception as e:
+        print(f"WARNING: could not record the failed run: {e}", file=sys.stderr)
+
+
+def _ledger_out(args: argparse.Namespace) -> str | None:
+    # Archives and deterministic roots stay byte-reproducible, so they carry no run history;
+    # --run-ledger keeps it outside the root instead.
+    if getattr(args, "deterministic", False) or getattr(args, "source_date_epoch", None) is not None:
+        return None
+    return None if Path(args.out).suffix.lower() == ".zip" and not args.out.startswith("s3://") else args.out
+
+
+def _cmd_generate(args: argparse.Namespace, report: Callable[[str], None] = print) -> int:
+    from .changes import ChangeLogSink
+    from .generator import generate_product_package
+    from .variants import read_orders_csv
+
+    run = RunRecorder("generate", batch_id=args.batch_id, shard=args.shard)
+    with run.stage("read_input"):
+        products = _read_unique_products(args.input)
+        run.input = input_fingerprint(args.input)
+    out_root = Path(args.out)
+
+    variants_by_product = read_orders_csv(args.orders) if args.orders else {}
+    unknown = sorted(set(variants_by_product) - {p.product_id for p in products})
+    if unknown:
+        raise ValidationError(f"Orders reference products missing from the catalog: {', '.join(unknown)}")
+
+    # Every node reads and validates the full catalog, then keeps only its own slice.
+    shard = parse_shard(args.shard)
+    if shard is not None and args.full_catalog:
+        raise ValidationError("--full-catalog marks unlisted products removed; a --shard run lists only its slice")
+    if shard is not None:
+        products = [p for p in products if shard.owns(p.product_id)]
+
+    if args.io_workers < 1:
+        raise ValidationError("--io-workers must be >= 1")
+
+    source_date_epoch: int | None = None
+    if args.source_date_epoch is not None:
+        source_date_epoch = parse_source_date_epoch(args.source_date_epoch)
+    elif args.deterministic:
+        source_date_epoch = parse_source_date_epoch(os.environ.get("SOURCE_DATE_EPOCH"))
+
+    if args.plan or args.plan_out:
+        if args.metrics_file or args.run_ledger:
+            raise ValidationError("--metrics-file and --run-ledger record real runs; a plan writes nothing")
+        return _plan_generate(args, products, variants_by_product, source_date_epoch)
 
     created: list[Path] = []
-    for p in products:
-        created.append(generate_product_package(p, out_root, batch_id=args.batch_id))
+    sink = ChangeLogSink(
+        open_sink(
+            args.out,
+            endpoint_url=args.s3_endpoint_url,
+            workers=args.upload_workers,
+            mtime=source_date_epoch,
+            lock_timeout=args.lock_timeout,
+            io_workers=args.io_workers,
+            durability=args.durability,
+        ),
+        # An unsafe batch id fails in generate_product_package before the log is written.
+        batch_id=safe_id(args.batch_id) if args.batch_id else None,
+        generated_at=utc_iso_from_epoch(source_date_epoch) if source_date_epoch is not None else None,
+        sort_keys=source_date_epoch is not None,
+        full_catalog=args.full_catalog,
+    )
+    run.products = len(products)
+    current: str | None = None
+    try:
+        try:
+            with run.stage("generate"):
+                for p in products:
+                    current = p.product_id
+                    created.append(
+                        generate_product_package(
+                            p,
+                            out_root,
+                            batch_id=args.batch_id,
+                            sink=sink,
+                            source_date_epoch=source_date_epoch,
+                            variants=variants_by_product.get(p.product_id),
+                        )
+                    )
+            current = None
+        except BaseException:
+            sink.abort()
+            raise
+        with run.stage("finalize"):
+            sink.close()
+    except Exception as e:
+        run.failures.append(f"{current}: {e}" if current else str(e))
+        _finish_failed_run(run, args, _ledger_out(args))
+        raise
+    run.files_written, run.bytes_written = sink.written_totals()
+    _finish_run(run, args, _ledger_out(args))
+
+    shard_note = f" (shard {shard})" if shard is not None else ""
+    variant_count = sum(len(variants_by_product.get(p.product_id, ())) for p in products)
+    variant_note = f" with {variant_count} personalization variant(s)" if args.orders else ""
+    report(f"Generated {len(created)} product package(s){variant_note} in {args.out}{shard_note}")
+    return 0
+
+
+def _plan_generate(
+    args: argparse.Namespace,
+    products: list[ProductRow],
+    variants_by_product: dict,
+    source_date_epoch: int | None,
+) -> int:
+    from .generator import generate_product_package
+    from .plan import PlanSink, case_conflicts, open_plan_base, summarize_plan
+
+    base, index, existing = open_plan_base(args.out, endpoint_url=args.s3_endpoint_url)
+    sink = PlanSink(base, index=index)
+    conflicts = case_conflicts([p.product_id for p in products], existing)
+    out_root = Path(args.out)
+    planned: dict[str, dict] = {}
+    try:
+        for p in products:
+            if p.product_id in conflicts:
+                planned[p.product_id] = {"status": "conflict", "reason": conflicts[p.product_id]}
+                continue
+            if isinstance(base, LocalSink) and (out_root / p.product_id).is_file():
+                planned[p.product_id] = {"status": "conflict", "reason": "a file with this name is in the way"}
+                continue
+            try:
+                generate_product_package(
+                    p,
+                    out_root,
+                    batch_id=args.batch_id,
+                    sink=sink,
+                    source_date_epoch=source_date_epoch,
+                    variants=variants_by_product.get(p.product_id),
+                )
+            except ValidationError as e:
+                sink.discard(p.product_id)
+                planned[p.product_id] = {"status": "conflict", "reason": str(e)}
+                continue
+            planned[p.product_id] = sink.product_plan(p.product_id)
+    finally:
+        sink.close()
+
+    summary = summarize_plan(planned)
+    plan = {
+        "out": args.out,
+        "batch_id": args.batch_id,
+        "compared_against": "index" if index is not None else "tree",
+        "summary": summary,
+        "products": dict(sorted(planned.items())),
+    }
+    if args.plan_out == "-":
+        print(json.dumps(plan, indent=2, ensure_ascii=False))
+        return 1 if summary["products"]["conflict"] else 0
+    if args.plan_out:
+        text = json.dumps(plan, indent=2, ensure_ascii=False) + "\n"
+        atomic_write_bytes(Path(args.plan_out), text.encode("utf-8"))
+
+    counts = ", ".join(f"{status}={n}" for status, n in summary["products"].items())
+    files = summary["files"]
+    print(
+        f"Plan for {args.out}: {len(planned)} product(s) ({counts}); "
+        f"{files['create'] + files['update']} file(s) to write ({summary['bytes_to_write']} bytes), "
+        f"{files['unchanged']} unchanged ({summary['bytes_unchanged']} bytes)"
+    )
+    # With --plan-out the JSON holds the per-product detail; only conflicts need eyes here.
+    for pid, entry in plan["products"].items():
+        if entry["status"] == "conflict":
+            print(f"  conflict   {pid}: {entry['reason']}")
+        elif entry["status"] != "unchanged" and not args.plan_out:
+            changed = sum(1 for f in entry["files"].values() if f["status"] != "unchanged")
+            print(f"  {entry['status']:<10} {pid}: {changed} file(s), {entry['bytes_to_write']} bytes")
+    if args.plan_out:
+        print(f"Wrote plan to {args.plan_out}")
+    return 1 if summary["products"]["conflict"] else 0
+
+
+def _cmd_generate_many(args: argparse.Namespace) -> int:
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    from .batchjobs import BatchJob, discover_batch_jobs, read_batch_jobs_csv
 
-    print(f"Generated {len(created)} product package(s) in {out_root}")
+    if args.workers < 1:
+        raise ValidationError("--workers must be >= 1")
+    if args.jobs:
+        if args.out:
+            raise ValidationError("--out goes with --input-dir; a jobs CSV names each batch's output")
+        jobs = read_batch_jobs_csv(args.jobs, batch_id=args.batch_id)
+    else:
+        if not args.out:
+            raise ValidationError("--input-dir needs --out (each catalog goes to <out>/<csv name>)")
+        jobs = discover_batch_jobs(args.input_dir, args.out, batch_id=args.batch_id)
+
+    # Batches share this process: imports and compiled output-set plans are paid for once.
+    # Each batch still opens its own --io-workers/--upload-workers pools.
+    def run(job: BatchJob) -> tuple[list[str], str | None]:
+        job_args = argparse.Namespace(
+            **{
+                **vars(args),
+                "input": str(job.input),
+                "out": job.out,
+                "batch_id": job.batch_id,
+                "orders": None,
+                "metrics_file": None,
+                "plan": False,
+                "plan_out": None,
+            }
+        )
+        lines: list[str] = []
+        try:
+            _cmd_generate(job_args, report=lines.append)
+        except ValidationError as e:
+            return lines, f"{job.input}: {e}"
+        except Exception as e:
+            return lines, f"{job.input}: {type(e).__name__}: {e}"
+        return lines, None
+
+    errors: list[str] = []
+    with ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="generate-many") as pool:
+        # Summaries are printed here, one batch at a time, so their lines never interleave.
+        for fut in as_completed([pool.submit(run, job) for job in jobs]):
+            lines, err = fut.result()
+            for line in lines:
+                print(line)
+            if err is not None:
+                errors.append(err)
+    print(f"Ran {len(jobs)} batch(es): {len(jobs) - len(errors)} ok, {len(errors)} failed")
+    if errors:
+        for err in errors:
+            print(f"ERROR: {err}", file=sys.stderr)
+        return 1
     return 0
 
 
+def _validate_archive(args: argparse.Namespace, run: RunRecorder) -> int:
+    import zipfile
+
+    archive = Path(args.out)
+    if not zipfile.is_zipfile(archive):
+        raise ValidationError(f"Not a zip archive: {archive}")
+    with tempfile.TemporaryDirectory() as td:
+        with run.stage("extract"), zipfile.ZipFile(archive) as zf:
+            zf.extractall(td)
+        return _validate_tree(Path(td), args, run, label=str(archive))
+
+
 def _cmd_validate(args: argparse.Namespace) -> int:
+    if args.out.startswith("s3://"):
+        raise ValidationError("validate reads local folders or .zip archives; sync the S3 prefix locally first")
     out_root = Path(args.out)
     if not out_root.exists():
         raise ValidationError(f"Output root not found: {out_root}")
-    if not out_root.is_dir():
+    archive = out_root.is_file() and out_root.suffix.lower() == ".zip"
+    if not archive and not out_root.is_dir():
         raise ValidationError(f"Output root must be a directory: {out_root}")
+    # Only a folder that already keeps a ledger gets one: validate must not add a file to a
+    # deterministic root. An archive is validated from a throwaway extraction.
+    ledger_out = None if archive else args.out
+    run = RunRecorder("validate", shard=args.shard)
+    try:
+        if archive:
+            code = _validate_archive(args, run)
+        else:
+            code = _validate_tree(out_root, args, run, label=str(out_root))
+    except Exception as e:
+        if not run.failures:
+            run.failures.append(str(e))
+        _finish_failed_run(run, args, ledger_out, create_ledger=False)
+        raise
+    _finish_run(run, args, ledger_out, create_ledger=False)
+    return code
+
+
+def _validate_tree(out_root: Path, args: argparse.Namespace, run: RunRecorder, label: str) -> int:
+    from .validator import validate_product_package
+
+    shard = parse_shard(args.shard)
+    with run.stage("discover"):
+        if args.product_id:
+            raw = args.product_id.strip()
+            sid = safe_id(raw)
+            if not sid or sid != raw:
+                raise ValidationError(
+                    "product_id contains unsafe characters; allowed: letters, numbers, '-' and '_'"
+                )
+            product_dirs = [out_root / sid]
+        else:
+            # Validate all product folders that have a manifest.json.
+            manifests = list(out_root.glob("*/manifest.json"))
+            if not manifests:
+                raise ValidationError(f"No product manifests found under: {label}")
+            if shard is not None:
+                manifests = [m for m in manifests if shard.owns(m.parent.name)]
+            product_dirs = [m.parent for m in manifests]
+    run.products = len(product_dirs)
+
+    # Keep going past a bad package so one run reports (and records) every failure.
+    with run.stage("validate"):
+        for product_dir in product_dirs:
+            try:
+                validate_product_package(product_dir, require_images=args.require_images)
+            except ValidationError as e:
+                run.failures.append(f"{product_dir.name}: {e}")
+    if run.failures:
+        listed = "\n".join(f"- {f}" for f in run.failures)
+        raise ValidationError(f"Validation failed for {len(run.failures)} of {len(product_dirs)} package(s):\n{listed}")
 
+    if args.product_id:
+        print(f"OK: {label}/{product_dirs[0].name}")
+        return 0
+    shard_note = f" (shard {shard})" if shard is not None else ""
+    print(f"OK: validated {len(product_dirs)} product package(s) under {label}{shard_note}")
+    return 0
+
+
+def _package_dirs(args: argparse.Namespace) -> tuple[Path, list[Path]]:
+    out_root = Path(args.out)
+    if not out_root.is_dir():
+        raise ValidationError(f"Output root must be a directory: {out_root}")
     if args.product_id:
         raw = args.product_id.strip()
         sid = safe_id(raw)
@@ -48,52 +386,938 @@ def _cmd_validate(args: argparse.Namespace) -> int:
             raise ValidationError(
                 "product_id contains unsafe characters; allowed: letters, numbers, '-' and '_'"
             )
-        product_dir = out_root / sid
-        validate_product_package(product_dir, require_images=args.require_images)
-        print(f"OK: {product_dir}")
+        return out_root, [out_root / sid]
+    dirs = [m.parent for m in sorted(out_root.glob("*/manifest.json"))]
+    if not dirs:
+        raise ValidationError(f"No product manifests found under: {out_root}")
+    return out_root, dirs
+
+
+def _cmd_seal(args: argparse.Namespace) -> int:
+    from .checksums import seal_package
+
+    if args.workers < 1:
+        raise ValidationError("--workers must be >= 1")
+    out_root, dirs = _package_dirs(args)
+    files = sum(seal_package(d, workers=args.workers) for d in dirs)
+    print(f"Sealed {len(dirs)} product package(s) under {out_root} ({files} file(s) checksummed)")
+    return 0
+
+
+def _cmd_verify(args: argparse.Namespace) -> int:
+    from .checksums import verify_packages
+
+    if args.workers < 1:
+        raise ValidationError("--workers must be >= 1")
+    out_root, dirs = _package_dirs(args)
+    result = verify_packages(out_root, dirs, workers=args.workers, use_cache=not args.no_cache)
+    if result.problems:
+        raise ValidationError("Checksum verification failed:\n- " + "\n- ".join(result.problems))
+    unrecorded = f"; {result.unrecorded} file(s) not recorded, run seal to add them" if result.unrecorded else ""
+    print(
+        f"OK: verified {result.files} file(s) in {result.packages} product package(s) under {out_root} "
+        f"(hashed={result.hashed}, unchanged={result.cached}{unrecorded})"
+    )
+    return 0
+
+
+def _cmd_export_jobs(args: argparse.Namespace) -> int:
+    from .renderjobs import write_render_jobs
+
+    out_root, dirs = _package_dirs(args)
+    shard = parse_shard(args.shard)
+    if shard is not None:
+        dirs = [d for d in dirs if shard.owns(d.name)]
+
+    if args.jsonl == "-":
+        count = write_render_jobs(dirs, sys.stdout)
+        print(f"Exported {count} render job(s) for {len(dirs)} product(s)", file=sys.stderr)
         return 0
 
-    # Validate all product folders that have a manifest.json.
-    manifests = list(out_root.glob("*/manifest.json"))
-    if not manifests:
-        raise ValidationError(f"No product manifests found under: {out_root}")
+    dest = Path(args.jsonl)
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", newline="\n", dir=dest.parent, prefix=f".{dest.name}.", delete=False
+    ) as f:
+        try:
+            count = write_render_jobs(dirs, f)
+        except BaseException:
+            f.close()
+            Path(f.name).unlink(missing_ok=True)
+            raise
+    os.replace(f.name, dest)
+    print(f"Exported {count} render job(s) for {len(dirs)} product(s) under {out_root} to {dest}")
+    return 0
 
-    for m in manifests:
-        validate_product_package(m.parent, require_images=args.require_images)
-    print(f"OK: validated {len(manifests)} product package(s) under {out_root}")
+
+def _cmd_layout(args: argparse.Namespace) -> int:
+    from .layout import layout_packages
+
+    out_root, dirs = _package_dirs(args)
+    shard = parse_shard(args.shard)
+    if shard is not None:
+        dirs = [d for d in dirs if shard.owns(d.name)]
+    if args.canvas < 1:
+        raise ValidationError("--canvas must be >= 1")
+    result = layout_packages(out_root, dirs, canvas=args.canvas, lock_timeout=args.lock_timeout)
+    print(
+        f"Laid out {result.texts} text(s) for {result.products} product(s) under {out_root} "
+        f"({result.written} layout file(s) updated, {len(result.overflows)} overflowing)"
+    )
+    if result.overflows:
+        for item in result.overflows:
+            print(f"OVERFLOW: {item}", file=sys.stderr)
+        return 1
     return 0
 
 
-def build_parser() -> argparse.ArgumentParser:
-    parser = argparse.ArgumentParser(prog="mvp_image_workflow")
-    sub = parser.add_subparsers(dest="cmd", required=True)
+def _cmd_render(args: argparse.Namespace) -> int:
+    from .render import make_backend, render_jobs
+    from .rendercache import RenderCache
+    from .renderjobs import iter_render_jobs
+
+    if args.concurrency < 1:
+        raise ValidationError("--concurrency must be >= 1")
+    if args.rate is not None and args.rate <= 0:
+        raise ValidationError("--rate must be > 0")
+    if args.max_retries < 0:
+        raise ValidationError("--max-retries must be >= 0")
+    out_root, dirs = _package_dirs(args)
+    shard = parse_shard(args.shard)
+    if shard is not None:
+        dirs = [d for d in dirs if shard.owns(d.name)]
+
+    jobs = (job for d in dirs for job in iter_render_jobs(d))
+    backend = make_backend(args.backend, args.endpoint_url, pool_size=args.concurrency, timeout=args.timeout)
+    cache = RenderCache(args.cache_dir, max_bytes=args.cache_max_bytes) if args.cache_dir else None
+    try:
+        result = render_jobs(
+            out_root,
+            jobs,
+            backend,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            burst=args.burst,
+            max_retries=args.max_retries,
+            retry_backoff=args.retry_backoff,
+            force=args.force,
+            lock_timeout=args.lock_timeout,
+            cache=cache,
+            style_pack_version=args.style_pack_version,
+        )
+    finally:
+        backend.close()
+        if cache is not None:
+            cache.close()
+
+    print(
+        f"Rendered {result.rendered} image(s) ({result.bytes} bytes) under {out_root}; "
+        f"{result.cached} from cache, skipped {result.skipped} already rendered, "
+        f"{result.retries} retries, {len(result.errors)} failed"
+    )
+    if result.errors:
+        for err in result.errors:
+            print(f"ERROR: {err}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def _cmd_compose(args: argparse.Namespace) -> int:
+    from .compose import compose_packages
+
+    if args.workers < 1:
+        raise ValidationError("--workers must be >= 1")
+    out_root, dirs = _package_dirs(args)
+    shard = parse_shard(args.shard)
+    if shard is not None:
+        dirs = [d for d in dirs if shard.owns(d.name)]
+    result = compose_packages(
+        out_root, dirs, workers=args.workers, force=args.force, lock_timeout=args.lock_timeout
+    )
+    print(
+        f"Composed {result.composed} image(s) for {len(dirs)} product(s) under {out_root} "
+        f"({result.skipped} unchanged)"
+    )
+    return 0
+
+
+def _cmd_check_images(args: argparse.Namespace) -> int:
+    from .imagecheck import check_images
+
+    if args.workers is not None and args.workers < 1:
+        raise ValidationError("--workers must be >= 1")
+    out_root, dirs = _package_dirs(args)
+    shard = parse_shard(args.shard)
+    if shard is not None:
+        dirs = [d for d in dirs if shard.owns(d.name)]
+    result = check_images(out_root, dirs, workers=args.workers, force=args.force, lock_timeout=args.lock_timeout)
+    print(
+        f"Checked {result.checked} image(s) for {len(dirs)} product(s) under {out_root} "
+        f"({result.reused} unchanged, {len(result.failures)} failed)"
+    )
+    if result.failures:
+        for failure in result.failures:
+            print(f"FAIL: {failure}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def _cmd_export(args: argparse.Namespace) -> int:
+    from .export import DEFAULT_PROFILES, export_packages
+
+    if args.workers is not None and args.workers < 1:
+        raise ValidationError("--workers must be >= 1")
+    out_root, dirs = _package_dirs(args)
+    shard = parse_shard(args.shard)
+    if shard is not None:
+        dirs = [d for d in dirs if shard.owns(d.name)]
+    profiles = tuple(args.profile or DEFAULT_PROFILES)
+    result = export_packages(out_root, dirs, args.dest, profiles=profiles, workers=args.workers, force=args.force)
+    print(
+        f"Exported {result.images} image(s) ({result.bytes} bytes) for {result.products} product(s) "
+        f"to {args.dest} ({', '.join(sorted(set(profiles)))}); {result.skipped} unchanged, "
+        f"{len(result.errors)} failed"
+    )
+    if result.errors:
+        for err in result.errors:
+            print(f"ERROR: {err}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def _cmd_contact_sheet(args: argparse.Namespace) -> int:
+    from .contactsheet import build_contact_sheets
+
+    if args.workers is not None and args.workers < 1:
+        raise ValidationError("--workers must be >= 1")
+    if args.per_page < 1:
+        raise ValidationError("--per-page must be >= 1")
+    if not 32 <= args.tile <= 1024:
+        raise ValidationError("--tile must be between 32 and 1024")
+    out_root, dirs = _package_dirs(args)
+    shard = parse_shard(args.shard)
+    if shard is not None:
+        dirs = [d for d in dirs if shard.owns(d.name)]
+    result = build_contact_sheets(
+        out_root,
+        dirs,
+        args.dest,
+        by_batch=args.by_batch,
+        per_page=args.per_page,
+        tile=args.tile,
+        cache_dir=args.cache_dir,
+        workers=args.workers,
+    )
+    print(
+        f"Wrote {result.sheets} contact sheet(s) for {len(dirs)} product(s) to {args.dest} "
+        f"({result.built} thumbnail(s) built, {result.cached} from cache)"
+    )
+    return 0
+
+
+def _cmd_stub_server(args: argparse.Namespace) -> int:
+    from .stubserver import StubRenderServer
+
+    with StubRenderServer(args.host, args.port, size=args.size) as server:
+        print(f"Stub render backend listening on {server.endpoint} (Ctrl+C to stop)", flush=True)
+        while True:
+            time.sleep(3600)
+
+
+def _cmd_diff_catalog(args: argparse.Namespace) -> int:
+    from .catalogdiff import diff_catalogs
+
+    result = diff_catalogs(
+        args.old,
+        args.new,
+        args.out,
+        removed_out=args.removed_out,
+        run_rows=args.run_rows,
+        tmp_dir=args.tmp_dir,
+    )
+    print(
+        f"Catalog diff: added={result.added}, modified={result.modified}, removed={result.removed}, "
+        f"unchanged={result.unchanged}; {result.added + result.modified} row(s) to generate in {args.out}"
+    )
+    return 0
+
+
+def _cmd_verify_shards(args: argparse.Namespace) -> int:
+    from .io_csv import read_products_csv
+
+    catalog_ids = [p.product_id for p in read_products_csv(args.input)]
+    coverage = verify_shard_coverage(catalog_ids, [Path(o) for o in args.out])
+    if not coverage.ok:
+        problems: list[str] = []
+        if coverage.missing:
+            problems.append(f"missing from every shard: {', '.join(coverage.missing)}")
+        for pid, roots in coverage.duplicated.items():
+            problems.append(f"'{pid}' packaged in more than one shard: {', '.join(roots)}")
+        for root, ids in coverage.unexpected.items():
+            problems.append(f"{root} has products not in the catalog: {', '.join(ids)}")
+        raise ValidationError("Shard coverage check failed:\n- " + "\n- ".join(problems))
+
+    total = sum(len(packaged_product_ids(Path(o))) for o in args.out)
+    print(f"OK: {len(args.out)} shard(s) cover all {len(catalog_ids)} catalog product(s) exactly once ({total} packaged)")
+    return 0
+
+
+def _cmd_ingest_sources(args: argparse.Namespace) -> int:
+    from .sources import discover_source_folders, ingest_sources, read_source_map_csv
+
+    out_root = Path(args.out)
+    if not out_root.is_dir():
+        raise ValidationError(f"Output root not found: {out_root}")
+
+    if args.map:
+        mapping = read_source_map_csv(args.map)
+    else:
+        # Only folders that match a generated package are picked up from a sources tree.
+        mapping = {
+            pid: folder
+            for pid, folder in discover_source_folders(args.sources).items()
+            if (out_root / pid / "manifest.json").is_file()
+        }
+    if not mapping:
+        raise ValidationError("No supplier folders matched any generated product package.")
+
+    result = ingest_sources(
+        out_root,
+        mapping,
+        mode=args.mode,
+        workers=args.workers,
+        lock_timeout=args.lock_timeout,
+        deterministic=args.deterministic,
+    )
+    methods = ", ".join(f"{k}={v}" for k, v in sorted(result.methods.items())) or "none"
+    print(
+        f"Ingested {result.files} source image(s) for {result.products} product(s) in {out_root} "
+        f"(placed: {methods}; unchanged={result.unchanged}; deduplicated={result.deduplicated})"
+    )
+    return 0
+
+
+def _cmd_enqueue(args: argparse.Namespace) -> int:
+    from .jobqueue import JobQueue
+
+    products = _read_unique_products(args.input)
+    out_root = Path(args.out)
+    if out_root.exists() and not out_root.is_dir():
+        raise ValidationError(f"Output root must be a directory: {out_root}")
+    out_root.mkdir(parents=True, exist_ok=True)
+
+    with JobQueue(args.db) as queue:
+        changed = queue.enqueue(products, out_root.resolve(), batch_id=args.batch_id)
+    print(f"Enqueued {changed} of {len(products)} product(s) into {args.db}")
+    return 0
+
+
+def _cmd_worker(args: argparse.Namespace) -> int:
+    from .jobqueue import JobQueue, default_worker_id, run_worker
+
+    if args.lease_seconds <= 0:
+        raise ValidationError("--lease-seconds must be > 0")
+    if args.max_attempts < 1:
+        raise ValidationError("--max-attempts must be >= 1")
+    if not Path(args.db).is_file():
+        raise ValidationError(f"Queue database not found: {args.db}")
+
+    worker_id = args.worker_id or default_worker_id()
+    with JobQueue(args.db) as queue:
+        done, failed = run_worker(
+            queue,
+            worker_id,
+            lease_seconds=args.lease_seconds,
+            max_attempts=args.max_attempts,
+            max_jobs=args.max_jobs,
+        )
+    print(f"Worker {worker_id}: {done} done, {failed} failed")
+    return 0
+
+
+def _cmd_status(args: argparse.Namespace) -> int:
+    from .jobqueue import JobQueue
 
-    g = sub.add_parser("generate", help="Generate per-product prompt/text packages")
+    if not Path(args.db).is_file():
+        raise ValidationError(f"Queue database not found: {args.db}")
+    with JobQueue(args.db) as queue:
+        status = queue.status()
+    if args.json:
+        print(json.dumps(status, indent=2))
+        return 0
+
+    states = status["states"]
+    print(
+        f"Queue depth: {status['depth']} (pending={states['pending']}, leased={states['leased']}, "
+        f"expired leases={status['expired_leases']}); done={states['done']}, failed={states['failed']}"
+    )
+    for w in status["workers"]:
+        print(f"  {w['worker']}: {w['done']} done, {w['products_per_sec']} products/sec")
+    return 0
+
+
+def _cmd_qc_record(args: argparse.Namespace) -> int:
+    from .qcledger import QCLedger, iter_reviews_csv, package_review, parse_review_time
+
+    out_root = Path(args.out)
+    if not out_root.is_dir():
+        raise ValidationError(f"Output root must be a directory: {out_root}")
+    if bool(args.csv) == bool(args.product_id):
+        raise ValidationError("Pass either --csv or --product-id with --verdict")
+    if args.csv:
+        if args.verdict or args.tag or args.note:
+            raise ValidationError("--verdict/--tag/--note apply to --product-id; the CSV carries its own")
+        reviews = iter_reviews_csv(args.csv, out_root)
+    else:
+        if not args.verdict:
+            raise ValidationError("--verdict is required with --product-id")
+        reviewed_at = parse_review_time(args.reviewed_at) if args.reviewed_at else None
+        reviews = [
+            package_review(
+                out_root, args.product_id, args.verdict, args.tag or (), args.reviewer, args.note, reviewed_at
+            )
+        ]
+    with QCLedger(args.db) as ledger:
+        count = ledger.record(reviews)
+    print(f"Recorded {count} QC review(s) in {args.db}")
+    return 0
+
+
+def _format_time(epoch: float) -> str:
+    return utc_iso_from_epoch(int(epoch))
+
+
+def _cmd_qc_report(args: argparse.Namespace) -> int:
+    from .qcledger import QCLedger, parse_review_time, write_catalog_subset
+
+    if not Path(args.db).is_file():
+        raise ValidationError(f"QC ledger not found: {args.db}")
+    if bool(args.input) != bool(args.rejected_csv):
+        raise ValidationError("--rejected-csv needs the catalog CSV as --input (and vice versa)")
+    since = parse_review_time(args.since) if args.since else None
+    until = parse_review_time(args.until) if args.until else None
+    filters = {"batch_id": args.batch_id, "style_pack": args.style_pack}
+
+    with QCLedger(args.db) as ledger:
+        if args.rejected_out or args.rejected_csv:
+            ids = ledger.rejected_products(args.tag, since, until, **filters)
+            if args.rejected_out:
+                Path(args.rejected_out).write_text("".join(f"{pid}\n" for pid in ids), encoding="utf-8")
+                print(f"Wrote {len(ids)} rejected product id(s) to {args.rejected_out}")
+            if args.rejected_csv:
+                rows = write_catalog_subset(args.input, ids, args.rejected_csv)
+                print(f"Wrote {rows} catalog row(s) of rejected products to {args.rejected_csv}")
+            return 0
+        if args.list:
+            records = ledger.rejects(args.tag, since, until, open_only=args.open, **filters)
+            if args.json:
+                print(json.dumps([r.__dict__ for r in records], indent=2))
+                return 0
+            for r in records:
+                print(
+                    f"{_format_time(r.reviewed_at)}  {r.product_id}  batch={r.batch_id or '-'}  "
+                    f"style_pack={r.style_pack}  tags={';'.join(r.tags)}  {r.note or ''}".rstrip()
+                )
+            print(f"{len(records)} reject(s)", file=sys.stderr)
+            return 0
+        if args.tag:
+            raise ValidationError("--tag filters --list and --rejected-out; group rates with --by tag instead")
+        rates = ledger.reject_rates(args.by, since, until, **filters)
+
+    if args.json:
+        print(json.dumps([{**r.__dict__, "rate": round(r.rate, 4)} for r in rates], indent=2))
+        return 0
+    print(f"Reject rate by {args.by}:")
+    for r in rates:
+        print(f"  {r.key if r.key is not None else '-'}: {r.rejects}/{r.reviews} ({r.rate:.1%})")
+    return 0
+
+
+def _generate_options(g: argparse.ArgumentParser) -> None:
+    """Options generate and generate-many share."""
+    g.add_argument(
+        "--s3-endpoint-url",
+        default=None,
+        help="S3-compatible endpoint for s3:// outputs (default: AWS_ENDPOINT_URL or AWS S3)",
+    )
+    g.add_argument(
+        "--upload-workers",
+        type=int,
+        default=8,
+        help="Concurrent uploads for s3:// outputs (default: 8)",
+    )
+    g.add_argument(
+        "--io-workers",
+        type=int,
+        default=1,
+        help="Parallel file writers for folder outputs; raise on NFS/SMB to hide latency (default: 1)",
+    )
+    g.add_argument(
+        "--durability",
+        choices=DURABILITY_LEVELS,
+        default="none",
+        help="fsync policy: none (OS decides), batch (bulk fsync at checkpoints and at the end), "
+        "file (fsync every file and folder; slowest) (default: none)",
+    )
+    g.add_argument(
+        "--lock-timeout",
+        type=float,
+        default=DEFAULT_LOCK_TIMEOUT,
+        help="Seconds to wait for another run's product/root lock on a shared output folder (default: 60)",
+    )
+    g.add_argument(
+        "--shard",
+        default=None,
+        help="Only generate this node's slice of the catalog, e.g. 2/4 (stable hash of product_id)",
+    )
+    g.add_argument(
+        "--full-catalog",
+        action="store_true",
+        help="The input is the whole catalog: changes.json reports products and files it no longer "
+        "produces as removed (default: they are carried forward unchanged)",
+    )
+    g.add_argument(
+        "--deterministic",
+        action="store_true",
+        help="Byte-reproducible output: pinned timestamps (SOURCE_DATE_EPOCH, default 0) and sorted JSON keys",
+    )
+    g.add_argument(
+        "--source-date-epoch",
+        default=None,
+        help="Timestamp (seconds since epoch) to embed in deterministic mode; implies --deterministic",
+    )
+    g.add_argument(
+        "--run-ledger",
+        default=None,
+        help=f"Append the run record to this JSONL file instead of <out>/{RUN_LEDGER_NAME} "
+        "(deterministic and .zip outputs keep no ledger in the root)",
+    )
+
+
+def _generate_arguments(g: argparse.ArgumentParser) -> None:
     g.add_argument("--input", required=True, help="CSV file (utf-8) with product rows")
-    g.add_argument("--out", required=True, help="Output root folder")
+    g.add_argument(
+        "--out",
+        required=True,
+        help="Output root: a folder, a .zip archive, or an s3://bucket/prefix URL",
+    )
     g.add_argument(
         "--batch-id",
         default=None,
         help="Optional batch id appended to expected image filenames (e.g. 2025-12-26A)",
     )
+    g.add_argument(
+        "--orders",
+        default=None,
+        help="CSV of order_id,product_id,personalization_text_en; each order becomes a line in "
+        "texts/personalization_variants.jsonl of its product's package",
+    )
+    g.add_argument(
+        "--metrics-file",
+        default=None,
+        help="Also write the run's metrics to this file in Prometheus text format "
+        "(for node_exporter's textfile collector)",
+    )
+    g.add_argument(
+        "--plan",
+        action="store_true",
+        help="Dry run: render everything in memory and print which products would be created, "
+        "updated, left unchanged or are in conflict, without writing or locking anything",
+    )
+    g.add_argument(
+        "--plan-out",
+        default=None,
+        help="Write the plan as JSON to this file ('-' for stdout); implies --plan",
+    )
+    _generate_options(g)
     g.set_defaults(func=_cmd_generate)
 
-    v = sub.add_parser("validate", help="Validate generated packages")
-    v.add_argument("--out", required=True, help="Output root folder")
+
+def _generate_many_arguments(gm: argparse.ArgumentParser) -> None:
+    src = gm.add_mutually_exclusive_group(required=True)
+    src.add_argument(
+        "--jobs",
+        help="CSV with input,out[,batch_id] columns, one batch per row (relative paths: from the CSV's folder)",
+    )
+    src.add_argument("--input-dir", help="Folder of catalog CSVs; each becomes <out>/<csv name>")
+    gm.add_argument(
+        "--out", default=None, help="Output root for --input-dir: a folder or an s3://bucket/prefix URL"
+    )
+    gm.add_argument(
+        "--batch-id", default=None, help="Batch id for every batch (jobs CSV rows may set their own)"
+    )
+    gm.add_argument("--workers", type=int, default=1, help="Batches generated concurrently (default: 1)")
+    _generate_options(gm)
+    gm.set_defaults(func=_cmd_generate_many)
+
+
+def _ingest_sources_arguments(ing: argparse.ArgumentParser) -> None:
+    from .sources import PLACE_MODES
+
+    ing.add_argument("--out", required=True, help="Output root folder with generated packages")
+    src = ing.add_mutually_exclusive_group(required=True)
+    src.add_argument("--sources", help="Folder with one sub-folder of supplier images per product_id")
+    src.add_argument("--map", help="CSV with product_id,source_dir columns")
+    ing.add_argument(
+        "--mode",
+        choices=PLACE_MODES,
+        default="auto",
+        help="How to place files: auto tries reflink, then hardlink, then copy (default: auto)",
+    )
+    ing.add_argument("--workers", type=int, default=8, help="Parallel hashing workers (default: 8)")
+    ing.add_argument(
+        "--lock-timeout",
+        type=float,
+        default=DEFAULT_LOCK_TIMEOUT,
+        help="Seconds to wait for a product lock held by a concurrent run (default: 60)",
+    )
+    ing.add_argument(
+        "--deterministic",
+        action="store_true",
+        help="Write manifests with sorted JSON keys, as generate --deterministic does",
+    )
+    ing.set_defaults(func=_cmd_ingest_sources)
+
+
+def _enqueue_arguments(eq: argparse.ArgumentParser) -> None:
+    eq.add_argument("--input", required=True, help="CSV file (utf-8) with product rows")
+    eq.add_argument("--out", required=True, help="Output root folder the workers write to")
+    eq.add_argument("--db", required=True, help="SQLite queue database (created if missing)")
+    eq.add_argument("--batch-id", default=None, help="Optional batch id for expected image filenames")
+    eq.set_defaults(func=_cmd_enqueue)
+
+
+def _worker_arguments(wk: argparse.ArgumentParser) -> None:
+    wk.add_argument("--db", required=True, help="SQLite queue database")
+    wk.add_argument("--worker-id", default=None, help="Worker name (default: host:pid)")
+    wk.add_argument("--lease-seconds", type=float, default=300.0, help="Job lease length (default: 300)")
+    wk.add_argument("--max-attempts", type=int, default=3, help="Attempts before a job fails (default: 3)")
+    wk.add_argument("--max-jobs", type=int, default=None, help="Stop after this many jobs")
+    wk.set_defaults(func=_cmd_worker)
+
+
+def _status_arguments(st: argparse.ArgumentParser) -> None:
+    st.add_argument("--db", required=True, help="SQLite queue database")
+    st.add_argument("--json", action="store_true", help="Print machine-readable JSON")
+    st.set_defaults(func=_cmd_status)
+
+
+def _qc_arguments(qc: argparse.ArgumentParser) -> None:
+    from .qcledger import GROUP_BY
+
+    qc_sub = qc.add_subparsers(dest="qc_cmd", required=True)
+
+    qr = qc_sub.add_parser("record", help="Append reviews of generated packages to the QC ledger")
+    qr.add_argument("--db", required=True, help="SQLite QC ledger (created if missing)")
+    qr.add_argument("--out", required=True, help="Output root folder with generated packages")
+    qr.add_argument("--product-id", default=None, help="Product to record a verdict for")
+    qr.add_argument("--verdict", choices=["pass", "reject"], default=None)
+    qr.add_argument(
+        "--tag", action="append", default=None, help="Reject tag from meta/qc_checklist.json (repeatable)"
+    )
+    qr.add_argument("--reviewer", default=None, help="Who reviewed the package")
+    qr.add_argument("--note", default=None, help="Free-text remark")
+    qr.add_argument("--reviewed-at", default=None, help="Review time, ISO 8601 (default: now)")
+    qr.add_argument(
+        "--csv",
+        default=None,
+        help="Bulk import: CSV with product_id, verdict, tags (';'-separated), reviewer, note, reviewed_at",
+    )
+    qr.set_defaults(func=_cmd_qc_record)
+
+    qp = qc_sub.add_parser("report", help="Reject rates, reject lists, and rejected products to regenerate")
+    qp.add_argument("--db", required=True, help="SQLite QC ledger")
+    qp.add_argument("--by", choices=GROUP_BY, default="style_pack", help="Group reject rates by (default: style_pack)")
+    qp.add_argument("--since", default=None, help="Only reviews at or after this date/time (ISO 8601, UTC)")
+    qp.add_argument("--until", default=None, help="Only reviews before this date/time (ISO 8601, UTC)")
+    qp.add_argument("--batch-id", default=None, help="Only reviews of this batch")
+    qp.add_argument("--style-pack", default=None, help="Only reviews of this style pack")
+    qp.add_argument("--tag", default=None, help="Only rejects carrying this tag (with --list / --rejected-*)")
+    qp.add_argument("--list", action="store_true", help="List individual rejects instead of rates")
+    qp.add_argument("--open", action="store_true", help="With --list: only products whose latest review is a reject")
+    qp.add_argument(
+        "--rejected-out", default=None, help="Write ids of products whose latest review is a reject, one per line"
+    )
+    qp.add_argument("--input", default=None, help="Catalog CSV to take the rejected products' rows from")
+    qp.add_argument(
+        "--rejected-csv", default=None, help="Write the rejected products' catalog rows here (a generate input)"
+    )
+    qp.add_argument("--json", action="store_true", help="Print JSON instead of text")
+    qp.set_defaults(func=_cmd_qc_report)
+
+
+def _validate_arguments(v: argparse.ArgumentParser) -> None:
+    v.add_argument("--out", required=True, help="Output root folder or .zip archive")
     v.add_argument("--product-id", default=None, help="Validate a single product id")
     v.add_argument(
         "--require-images",
         action="store_true",
         help="Also require expected .png images to exist",
     )
+    v.add_argument("--shard", default=None, help="Only validate products of this slice, e.g. 2/4")
+    v.add_argument(
+        "--run-ledger",
+        default=None,
+        help=f"Append the run record to this JSONL file (default: <out>/{RUN_LEDGER_NAME}, if the root keeps one)",
+    )
+    v.add_argument(
+        "--metrics-file",
+        default=None,
+        help="Also write the run's metrics to this file in Prometheus text format "
+        "(for node_exporter's textfile collector)",
+    )
     v.set_defaults(func=_cmd_validate)
 
+
+def _seal_arguments(se: argparse.ArgumentParser) -> None:
+    se.add_argument("--out", required=True, help="Output root folder with generated packages")
+    se.add_argument("--product-id", default=None, help="Seal a single product id")
+    se.add_argument("--workers", type=int, default=8, help="Parallel hashing workers (default: 8)")
+    se.set_defaults(func=_cmd_seal)
+
+
+def _verify_arguments(vf: argparse.ArgumentParser) -> None:
+    vf.add_argument("--out", required=True, help="Output root folder with generated packages")
+    vf.add_argument("--product-id", default=None, help="Verify a single product id")
+    vf.add_argument("--workers", type=int, default=8, help="Parallel hashing workers (default: 8)")
+    vf.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Re-hash every file instead of skipping files unchanged since the last verify",
+    )
+    vf.set_defaults(func=_cmd_verify)
+
+
+def _export_jobs_arguments(ex: argparse.ArgumentParser) -> None:
+    ex.add_argument("--out", required=True, help="Output root folder with generated packages")
+    ex.add_argument("--jsonl", required=True, help="Destination JSONL file, or '-' for stdout")
+    ex.add_argument("--product-id", default=None, help="Export a single product id")
+    ex.add_argument("--shard", default=None, help="Only export products of this slice, e.g. 2/4")
+    ex.set_defaults(func=_cmd_export_jobs)
+
+
+def _layout_arguments(ly: argparse.ArgumentParser) -> None:
+    from .layout import CANVAS_SIZE
+
+    ly.add_argument("--out", required=True, help="Output root folder with generated packages")
+    ly.add_argument("--product-id", default=None, help="Lay out a single product id")
+    ly.add_argument("--shard", default=None, help="Only lay out products of this slice, e.g. 2/4")
+    ly.add_argument(
+        "--canvas", type=int, default=CANVAS_SIZE, help="Square canvas size in px (default: 2000)"
+    )
+    ly.add_argument(
+        "--lock-timeout",
+        type=float,
+        default=DEFAULT_LOCK_TIMEOUT,
+        help="Seconds to wait for a product lock held by a concurrent run (default: 60)",
+    )
+    ly.set_defaults(func=_cmd_layout)
+
+
+def _render_arguments(rd: argparse.ArgumentParser) -> None:
+    from .rendercache import DEFAULT_CACHE_MAX_BYTES
+
+    rd.add_argument("--out", required=True, help="Output root folder with generated packages")
+    rd.add_argument(
+        "--backend",
+        default="http",
+        help="http (POST jobs to --endpoint-url), stub (in-process placeholders) or package.module:factory",
+    )
+    rd.add_argument(
+        "--endpoint-url",
+        default=os.environ.get("MVP_RENDER_ENDPOINT"),
+        help="Render service base URL (default: MVP_RENDER_ENDPOINT)",
+    )
+    rd.add_argument("--concurrency", type=int, default=4, help="Requests in flight (default: 4)")
+    rd.add_argument("--rate", type=float, default=None, help="Max requests per second (default: unlimited)")
+    rd.add_argument("--burst", type=int, default=None, help="Token-bucket burst size (default: --concurrency)")
+    rd.add_argument("--max-retries", type=int, default=4, help="Retries for 429/5xx/connection errors (default: 4)")
+    rd.add_argument(
+        "--retry-backoff", type=float, default=0.5, help="First retry delay in seconds, doubling (default: 0.5)"
+    )
+    rd.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds (default: 120)")
+    rd.add_argument("--product-id", default=None, help="Render a single product id")
+    rd.add_argument("--shard", default=None, help="Only render products of this slice, e.g. 2/4")
+    rd.add_argument("--force", action="store_true", help="Ignore the resume journal and render everything again")
+    rd.add_argument(
+        "--cache-dir",
+        default=os.environ.get("MVP_RENDER_CACHE"),
+        help="Render cache shared across batches; unchanged shots are hardlinked from it (default: MVP_RENDER_CACHE)",
+    )
+    rd.add_argument(
+        "--cache-max-bytes",
+        type=int,
+        default=DEFAULT_CACHE_MAX_BYTES,
+        help="Evict least recently used cache entries above this size (default: 10 GiB)",
+    )
+    rd.add_argument(
+        "--style-pack-version",
+        default="1",
+        help="Bump when a style pack's look changes, so cached renders of it are not reused (default: 1)",
+    )
+    rd.add_argument(
+        "--lock-timeout",
+        type=float,
+        default=DEFAULT_LOCK_TIMEOUT,
+        help="Seconds to wait for a product lock when recording checksums (default: 60)",
+    )
+    rd.set_defaults(func=_cmd_render)
+
+
+def _compose_arguments(cp: argparse.ArgumentParser) -> None:
+    cp.add_argument("--out", required=True, help="Output root folder with rendered packages")
+    cp.add_argument("--product-id", default=None, help="Compose a single product id")
+    cp.add_argument("--shard", default=None, help="Only compose products of this slice, e.g. 2/4")
+    cp.add_argument("--workers", type=int, default=4, help="Products composed in parallel (default: 4)")
+    cp.add_argument("--force", action="store_true", help="Recompose images even if nothing changed")
+    cp.add_argument(
+        "--lock-timeout",
+        type=float,
+        default=DEFAULT_LOCK_TIMEOUT,
+        help="Seconds to wait for a product lock held by a concurrent run (default: 60)",
+    )
+    cp.set_defaults(func=_cmd_compose)
+
+
+def _check_images_arguments(ci: argparse.ArgumentParser) -> None:
+    ci.add_argument("--out", required=True, help="Output root folder with rendered packages")
+    ci.add_argument("--product-id", default=None, help="Check a single product id")
+    ci.add_argument("--shard", default=None, help="Only check products of this slice, e.g. 2/4")
+    ci.add_argument(
+        "--workers", type=int, default=None, help="Worker processes (default: one per CPU)"
+    )
+    ci.add_argument("--force", action="store_true", help="Re-check images even if unchanged since the last report")
+    ci.add_argument(
+        "--lock-timeout",
+        type=float,
+        default=DEFAULT_LOCK_TIMEOUT,
+        help="Seconds to wait for a product lock held by a concurrent run (default: 60)",
+    )
+    ci.set_defaults(func=_cmd_check_images)
+
+
+def _export_arguments(xp: argparse.ArgumentParser) -> None:
+    from .export import MARKETPLACE_PROFILES
+
+    xp.add_argument("--out", required=True, help="Output root folder with rendered and composed packages")
+    xp.add_argument("--dest", required=True, help="Folder for the <product>.zip files")
+    xp.add_argument(
+        "--profile",
+        action="append",
+        choices=sorted(MARKETPLACE_PROFILES),
+        help="Marketplace profile; repeat for several (default: master). "
+        + "; ".join(
+            f"{p.name}: {', '.join(f'{w}x{h}' for w, h in p.sizes)} ({p.description})"
+            for p in MARKETPLACE_PROFILES.values()
+        ),
+    )
+    xp.add_argument("--product-id", default=None, help="Export a single product id")
+    xp.add_argument("--shard", default=None, help="Only export products of this slice, e.g. 2/4")
+    xp.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per CPU)")
+    xp.add_argument("--force", action="store_true", help="Rebuild zips even if nothing changed")
+    xp.set_defaults(func=_cmd_export)
+
+
+def _contact_sheet_arguments(cs: argparse.ArgumentParser) -> None:
+    from .contactsheet import DEFAULT_PER_PAGE, DEFAULT_TILE
+
+    cs.add_argument("--out", required=True, help="Output root folder with generated packages")
+    cs.add_argument("--dest", required=True, help="Folder for the sheet PNGs")
+    cs.add_argument("--product-id", default=None, help="Build the sheet of a single product id")
+    cs.add_argument("--shard", default=None, help="Only include products of this slice, e.g. 2/4")
+    cs.add_argument(
+        "--by-batch",
+        action="store_true",
+        help="Write paginated <batch>_pNNN.png sheets, one row per product, instead of one sheet per product",
+    )
+    cs.add_argument(
+        "--per-page", type=int, default=DEFAULT_PER_PAGE, help="Products per page with --by-batch (default: 10)"
+    )
+    cs.add_argument("--tile", type=int, default=DEFAULT_TILE, help="Thumbnail size in px (default: 256)")
+    cs.add_argument("--cache-dir", default=None, help="Thumbnail cache folder (default: <out>.state/thumbs)")
+    cs.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per CPU)")
+    cs.set_defaults(func=_cmd_contact_sheet)
+
+
+def _stub_server_arguments(ss: argparse.ArgumentParser) -> None:
+    from .stubserver import DEFAULT_STUB_SIZE
+
+    ss.add_argument("--host", default="127.0.0.1", help="Bind address (default: 127.0.0.1)")
+    ss.add_argument("--port", type=int, default=8765, help="Port (default: 8765)")
+    ss.add_argument("--size", type=int, default=DEFAULT_STUB_SIZE, help="Square image size in px (default: 2000)")
+    ss.set_defaults(func=_cmd_stub_server)
+
+
+def _diff_catalog_arguments(dc: argparse.ArgumentParser) -> None:
+    from .catalogdiff import DEFAULT_RUN_ROWS
+
+    dc.add_argument("old", help="Previous catalog CSV")
+    dc.add_argument("new", help="Current catalog CSV")
+    dc.add_argument(
+        "--out",
+        required=True,
+        help="CSV of added/modified rows (with a 'change' column) that generate accepts as --input",
+    )
+    dc.add_argument("--removed-out", default=None, help="Write removed product_ids here, one per line")
+    dc.add_argument(
+        "--run-rows",
+        type=int,
+        default=DEFAULT_RUN_ROWS,
+        help=f"Rows held in memory per sorted run on disk (default: {DEFAULT_RUN_ROWS})",
+    )
+    dc.add_argument("--tmp-dir", default=None, help="Folder for sort runs (default: system temp)")
+    dc.set_defaults(func=_cmd_diff_catalog)
+
+
+def _verify_shards_arguments(vs: argparse.ArgumentParser) -> None:
+    vs.add_argument("--input", required=True, help="Full catalog CSV the shards were generated from")
+    vs.add_argument("--out", required=True, nargs="+", help="Output root folder of each shard")
+    vs.set_defaults(func=_cmd_verify_shards)
+
+
+# (name, help, argument builder) of every subcommand, in help order.
+_COMMANDS = (
+    ("generate", "Generate per-product prompt/text packages", _generate_arguments),
+    ("generate-many", "Generate several catalog CSVs as separate batches in one process", _generate_many_arguments),
+    ("ingest-sources", "Place supplier images into each package's source/ folder", _ingest_sources_arguments),
+    ("enqueue", "Enqueue CSV rows as generation jobs in a SQLite queue", _enqueue_arguments),
+    ("worker", "Claim queued jobs under a lease and generate them", _worker_arguments),
+    ("status", "Show queue depth and per-worker throughput", _status_arguments),
+    ("qc", "Record manual QC verdicts and query reject rates", _qc_arguments),
+    ("validate", "Validate generated packages", _validate_arguments),
+    ("seal", "Record checksums of every file (including images) in each package", _seal_arguments),
+    ("verify", "Check package files against their checksums.sha256", _verify_arguments),
+    ("export-jobs", "Write one JSONL record per expected image for bulk submission", _export_jobs_arguments),
+    ("layout", "Precompute text wrapping and font size for the info bars", _layout_arguments),
+    ("render", "Render every expected image through an image-generation backend", _render_arguments),
+    ("compose", "Draw spec/how-to text sources onto the rendered backgrounds", _compose_arguments),
+    (
+        "check-images",
+        "Check info-area contrast and safe margins of rendered spec/how-to backgrounds",
+        _check_images_arguments,
+    ),
+    ("export", "Package every expected image per marketplace profile into per-product zips", _export_arguments),
+    ("contact-sheet", "Build tiled preview sheets of each product for QC review", _contact_sheet_arguments),
+    ("stub-server", "Run a local stand-in render backend for testing", _stub_server_arguments),
+    ("diff-catalog", "Find new, changed and removed SKUs between two catalog CSVs", _diff_catalog_arguments),
+    ("verify-shards", "Check that shard outputs cover the catalog exactly once", _verify_shards_arguments),
+)
+
+
+def build_parser(command: str | None = None) -> argparse.ArgumentParser:
+    """The full parser; with `command`, the other subcommands get their help line but no options."""
+    parser = argparse.ArgumentParser(prog="mvp_image_workflow")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    for name, help_text, add_arguments in _COMMANDS:
+        p = sub.add_parser(name, help=help_text)
+        # Options pull in their module's defaults; skipping unused ones keeps startup light.
+        if command is None or command == name:
+            add_arguments(p)
     return parser
 
 
 def main(argv: list[str] | None = None) -> int:
     argv = sys.argv[1:] if argv is None else argv
-    parser = build_parser()
+    parser = build_parser(argv[0] if argv and not argv[0].startswith("-") else None)
     args = parser.parse_args(argv)
     try:
         return int(args.func(args))
@@ -105,6 +1329,8 @@ def main(argv: list[str] | None = None) -> int:
         return 130
     except Exception as e:
         if os.environ.get("MVP_IMAGE_WORKFLOW_DEBUG") == "1":
+            import traceback
+
             traceback.print_exc()
         else:
             print(f"FATAL: {type(e).__name__}: {e}", file=sys.stderr)
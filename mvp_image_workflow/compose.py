@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from .checksums import hash_file, update_sidecar
+from .font import BUILTIN_FONT, BitmapFont, GlyphAtlas, draw_text
+from .layout import INFO_BAR_FRACTION, SAFE_MARGIN, TextLayout, info_box, layout_text, load_layouts, planned_layout
+from .locking import DEFAULT_LOCK_TIMEOUT, file_lock, lock_path, product_lock_name
+from .png import decode_png, encode_png, png_dimensions
+from .renderjobs import RenderJob, iter_render_jobs
+from .storage import atomic_write_bytes
+from .util import ValidationError
+
+COMPOSE_LOG = "meta/compose.json"
+
+DARK_TEXT = (24, 24, 24)
+LIGHT_TEXT = (250, 250, 250)
+
+
+@dataclass
+class ComposeResult:
+    composed: int = 0
+    skipped: int = 0
+
+
+def _bar_luminance(pixels: bytearray, width: int, bar_top: int, height: int) -> float:
+    # Every 97th pixel of the info bar is plenty to pick dark or light text.
+    start, end, step = bar_top * width * 3, height * width * 3, 97 * 3
+    r = pixels[start:end:step]
+    if not r:
+        return 255.0
+    g = pixels[start + 1:end:step]
+    b = pixels[start + 2:end:step]
+    return (0.2126 * sum(r) + 0.7152 * sum(g) + 0.0722 * sum(b)) / len(r)
+
+
+def compose_image(
+    background: bytes,
+    text: str,
+    atlas: GlyphAtlas,
+    font: BitmapFont = BUILTIN_FONT,
+    margin: int = SAFE_MARGIN,
+    layout: TextLayout | None = None,
+) -> tuple[bytes, dict]:
+    """Draw `text` into the bottom info bar of a background PNG, inside the safe margins.
+
+    `layout` is a precomputed wrap of `text` for this canvas; without one it is laid out here.
+    """
+    width, height, pixels = decode_png(background)
+    x0, y0, x1, y1 = info_box(width, height, margin)
+    precomputed = layout is not None
+    if layout is None:
+        layout = layout_text(text, x1 - x0, y1 - y0, font)
+    scale = layout.scale
+    line_h = font.line_height * scale
+    color = DARK_TEXT if _bar_luminance(pixels, width, height - round(height * INFO_BAR_FRACTION), height) >= 128 else LIGHT_TEXT
+    for i, line in enumerate(layout.lines):
+        draw_text(pixels, width, x0, y0 + i * line_h, line, font, scale, color, atlas)
+    info = {
+        "font": font.name,
+        "scale": scale,
+        "color": list(color),
+        "lines": len(layout.lines),
+        "clipped_lines": layout.clipped_lines,
+        "overflow": layout.overflow,
+        "precomputed": precomputed,
+        "box": [x0, y0, x1, y1],
+        "text_width": layout.width,
+    }
+    return encode_png(width, height, bytes(pixels)), info
+
+
+def _compose_job(
+    out_root: Path, job: RenderJob, previous: dict, layouts: dict, atlas: GlyphAtlas, force: bool
+) -> dict | None:
+    background_path = out_root / job.target
+    output_path = out_root / job.output
+    if not background_path.is_file():
+        raise ValidationError(f"Missing background {background_path}; run render first")
+    background = background_path.read_bytes()
+    text = job.text_overlay or ""
+    entry = {
+        "background_sha256": hashlib.sha256(background).hexdigest(),
+        "text_sha256": hashlib.sha256(text.encode("utf-8")).hexdigest(),
+    }
+    if (
+        not force
+        and output_path.is_file()
+        and all(previous.get(k) == v for k, v in entry.items())
+        and previous.get("output_sha256") == hash_file(output_path)
+    ):
+        return None
+    try:
+        width, height = png_dimensions(background)
+        planned = planned_layout(layouts, job.text_source or "", entry["text_sha256"], width, height)
+        composed, layout = compose_image(background, text, atlas, layout=planned)
+    except ValueError as e:
+        raise ValidationError(f"Cannot compose {background_path}: {e}") from None
+    atomic_write_bytes(output_path, composed)
+    entry["output_sha256"] = hashlib.sha256(composed).hexdigest()
+    entry["layout"] = layout
+    return entry
+
+
+def _compose_product(
+    root: Path, product_dir: Path, atlas: GlyphAtlas, force: bool, lock_timeout: float
+) -> tuple[int, int]:
+    with file_lock(lock_path(root, product_lock_name(product_dir.name)), timeout=lock_timeout):
+        log_path = product_dir / COMPOSE_LOG
+        log = json.loads(log_path.read_text(encoding="utf-8")) if log_path.is_file() else {}
+        changed: dict[str, dict] = {}
+        layouts = load_layouts(product_dir)
+        jobs = [j for j in iter_render_jobs(product_dir) if j.text_source]
+        for job in jobs:
+            key = job.output.split("/", 1)[1]
+            entry = _compose_job(root, job, log.get(key, {}), layouts, atlas, force)
+            if entry is not None:
+                changed[key] = entry
+        if changed:
+            log.update(changed)
+            data = (json.dumps(log, indent=2, sort_keys=True) + "\n").encode("utf-8")
+            atomic_write_bytes(log_path, data)
+            sums = {k: e["output_sha256"] for k, e in changed.items()}
+            sums[COMPOSE_LOG] = hashlib.sha256(data).hexdigest()
+            update_sidecar(product_dir, sums)
+    return len(changed), len(jobs) - len(changed)
+
+
+def compose_packages(
+    out_root: str | Path,
+    product_dirs: list[Path],
+    workers: int = 4,
+    force: bool = False,
+    lock_timeout: float = DEFAULT_LOCK_TIMEOUT,
+    atlas: GlyphAtlas | None = None,
+) -> ComposeResult:
+    """Render each package's spec/how-to text sources onto its rendered backgrounds.
+
+    Products are composed in parallel (zlib releases the GIL for the PNG work); images
+    whose background and text are unchanged since the last compose are skipped.
+    """
+    root = Path(out_root)
+    atlas = atlas or GlyphAtlas()
+    result = ComposeResult()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for composed, skipped in pool.map(
+            lambda d: _compose_product(root, d, atlas, force, lock_timeout), product_dirs
+        ):
+            result.composed += composed
+            result.skipped += skipped
+    return result
@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from .checksums import hash_file
+from .font import BUILTIN_FONT, GlyphAtlas, draw_text
+from .locking import state_dir
+from .png import PNG_SIGNATURE, decode_png, encode_png
+from .renderjobs import iter_render_jobs
+from .resample import block_average
+from .sources import SOURCE_FINGERPRINTS_KEY
+from .storage import atomic_write_bytes
+from .util import ValidationError
+
+THUMBS_DIR = "thumbs"  # in the root's state folder, so thumbnails never ship with the packages
+DEFAULT_TILE = 256
+DEFAULT_PER_PAGE = 10
+COLUMNS = 7
+
+_GAP = 12
+_CAPTION_SCALE = 2
+_TITLE_SCALE = 3
+_CAPTION_H = BUILTIN_FONT.line_height * _CAPTION_SCALE + 6
+_TITLE_H = BUILTIN_FONT.line_height * _TITLE_SCALE + 10
+_PAPER = b"\xff\xff\xff"
+_PLACEHOLDER = b"\xdc\xdc\xdc"
+_INK = (24, 24, 24)
+
+
+@dataclass(frozen=True)
+class Tile:
+    caption: str
+    path: Path
+    # Content fingerprint: the thumbnail cache key; None when the file is missing.
+    sha256: str | None
+
+
+@dataclass(frozen=True)
+class SheetRow:
+    title: str
+    tiles: tuple[Tile, ...]
+
+
+def thumbnail(data: bytes, tile: int) -> bytes:
+    """Block-average a PNG down to fit a tile x tile square, centred on white; packed RGB."""
+    width, height, pixels = decode_png(data)
+    factor = max(1, math.ceil(max(width, height) / tile))
+    w, h, small = block_average(pixels, width, height, factor)
+    out = bytearray(_PAPER * (tile * tile))
+    left, top = (tile - w) // 2, (tile - h) // 2
+    for y in range(h):
+        start = ((top + y) * tile + left) * 3
+        out[start:start + w * 3] = small[y * w * 3:(y + 1) * w * 3]
+    return bytes(out)
+
+
+def _make_thumbnail(path: str, tile: int) -> bytes | None:
+    # Process-pool entry point; None for files the stdlib PNG decoder cannot read (JPEG/WebP sources).
+    data = Path(path).read_bytes()
+    if not data.startswith(PNG_SIGNATURE):
+        return None
+    try:
+        return encode_png(tile, tile, thumbnail(data, tile), level=1)
+    except ValueError:
+        return None
+
+
+class ThumbnailCache:
+    """Tile PNGs under `<root>/<aa>/<sha256>-<tile>.png`, keyed by the source file's content hash."""
+
+    def __init__(self, root: str | Path, tile: int = DEFAULT_TILE) -> None:
+        self.root = Path(root)
+        self.tile = tile
+
+    def path(self, sha256: str) -> Path:
+        return self.root / sha256[:2] / f"{sha256}-{self.tile}.png"
+
+    def get(self, sha256: str) -> bytes | None:
+        try:
+            return bytes(decode_png(self.path(sha256).read_bytes())[2])
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def put(self, sha256: str, png: bytes) -> None:
+        atomic_write_bytes(self.path(sha256), png)
+
+
+def _read_manifest(product_dir: Path) -> dict:
+    path = product_dir / "manifest.json"
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        raise ValidationError(f"Missing required file: {path}") from None
+    except json.JSONDecodeError as e:
+        raise ValidationError(f"Invalid JSON in {path}: {e}") from None
+
+
+def product_rows(root: Path, product_dir: Path, with_sources: bool = True) -> list[SheetRow]:
+    """Expected images in showcase/spec/how-to order, then the supplier images in source/."""
+    outputs = []
+    for job in iter_render_jobs(product_dir):
+        path = root / job.output
+        caption = Path(job.output).stem.removeprefix(f"{product_dir.name}_")
+        outputs.append(Tile(caption, path, hash_file(path) if path.is_file() else None))
+    rows = [SheetRow(product_dir.name, tuple(outputs))]
+    if with_sources:
+        fingerprints = _read_manifest(product_dir).get(SOURCE_FINGERPRINTS_KEY) or []
+        sources = []
+        for f in fingerprints:
+            path = product_dir / f["file"]
+            # Recorded fingerprints are trusted as long as the file is still there.
+            sources.append(Tile(f["file"], path, f["sha256"] if path.is_file() else None))
+        if sources:
+            rows.append(SheetRow(f"{product_dir.name} supplier images", tuple(sources)))
+    return rows
+
+
+def _placeholder(tile: int, label: str, atlas: GlyphAtlas) -> bytes:
+    out = bytearray(_PLACEHOLDER * (tile * tile))
+    advance = BUILTIN_FONT.advance * _CAPTION_SCALE
+    text = label[: max(1, (tile - 8) // advance)]
+    x = max(0, (tile - len(text) * advance) // 2)
+    draw_text(out, tile, x, tile // 2 - 7, text, BUILTIN_FONT, _CAPTION_SCALE, _INK, atlas)
+    return bytes(out)
+
+
+def render_sheet(rows: list[SheetRow], tiles: dict[str, bytes], tile: int, atlas: GlyphAtlas) -> bytes:
+    """Lay rows out on a white page, wrapping each row at COLUMNS tiles; returns PNG bytes."""
+    lines: list[tuple[str, tuple[Tile, ...]]] = []
+    for row in rows:
+        for i in range(0, max(len(row.tiles), 1), COLUMNS):
+            lines.append((row.title if i == 0 else "", row.tiles[i:i + COLUMNS]))
+    cell_w = tile + _GAP
+    width = _GAP + COLUMNS * cell_w
+    line_h = _TITLE_H + tile + _CAPTION_H
+    height = _GAP + len(lines) * line_h
+    page = bytearray(_PAPER * (width * height))
+    max_caption = tile // (BUILTIN_FONT.advance * _CAPTION_SCALE)
+    max_title = (width - 2 * _GAP) // (BUILTIN_FONT.advance * _TITLE_SCALE)
+    for n, (title, line) in enumerate(lines):
+        top = _GAP + n * line_h
+        if title:
+            draw_text(page, width, _GAP, top + 4, title[:max_title], BUILTIN_FONT, _TITLE_SCALE, _INK, atlas)
+        for i, t in enumerate(line):
+            left = _GAP + i * cell_w
+            if t.sha256 is None:
+                pixels = _placeholder(tile, "missing", atlas)
+            else:
+                pixels = tiles.get(t.sha256) or _placeholder(tile, t.path.suffix.lstrip(".").upper() or "?", atlas)
+            y0 = top + _TITLE_H
+            for y in range(tile):
+                start = ((y0 + y) * width + left) * 3
+                page[start:start + tile * 3] = pixels[y * tile * 3:(y + 1) * tile * 3]
+            draw_text(
+                page, width, left, y0 + tile + 4, t.caption[:max_caption], BUILTIN_FONT, _CAPTION_SCALE, _INK, atlas
+            )
+    return encode_png(width, height, bytes(page))
+
+
+@dataclass
+class ContactSheetResult:
+    sheets: int = 0
+    built: int = 0
+    cached: int = 0
+
+
+def _load_tiles(
+    rows: list[SheetRow], cache: ThumbnailCache, pool: ProcessPoolExecutor | None, result: ContactSheetResult
+) -> dict[str, bytes]:
+    tiles: dict[str, bytes] = {}
+    missing: dict[str, Path] = {}
+    for row in rows:
+        for t in row.tiles:
+            if t.sha256 is None or t.sha256 in tiles or t.sha256 in missing:
+                continue
+            pixels = cache.get(t.sha256)
+            if pixels is None:
+                missing[t.sha256] = t.path
+            else:
+                tiles[t.sha256] = pixels
+                result.cached += 1
+    keys = list(missing)
+    paths = [str(missing[k]) for k in keys]
+    if pool is None or len(paths) <= 1:
+        built = [_make_thumbnail(p, cache.tile) for p in paths]
+    else:
+        built = list(pool.map(_make_thumbnail, paths, [cache.tile] * len(paths)))
+    for sha, png in zip(keys, built):
+        if png is None:
+            continue
+        cache.put(sha, png)
+        tiles[sha] = bytes(decode_png(png)[2])
+        result.built += 1
+    return tiles
+
+
+def _write_if_changed(path: Path, data: bytes) -> None:
+    if not path.is_file() or path.read_bytes() != data:
+        atomic_write_bytes(path, data)
+
+
+def build_contact_sheets(
+    out_root: str | Path,
+    product_dirs: list[Path],
+    dest_dir: str | Path,
+    by_batch: bool = False,
+    per_page: int = DEFAULT_PER_PAGE,
+    tile: int = DEFAULT_TILE,
+    cache_dir: str | Path | None = None,
+    workers: int | None = None,
+) -> ContactSheetResult:
+    """One `<SKU>.png` review sheet per product, or with `by_batch` `<batch>_pNNN.png` pages of `per_page`
+    products each. Thumbnails are cached by content hash, so only changed images are downscaled again.
+    """
+    root = Path(out_root)
+    dest = Path(dest_dir)
+    cache = ThumbnailCache(cache_dir if cache_dir is not None else state_dir(root) / THUMBS_DIR, tile)
+    workers = workers or os.cpu_count() or 1
+    atlas = GlyphAtlas()
+    result = ContactSheetResult()
+    dest.mkdir(parents=True, exist_ok=True)
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        if not by_batch:
+            for product_dir in product_dirs:
+                rows = product_rows(root, product_dir)
+                tiles = _load_tiles(rows, cache, pool, result)
+                _write_if_changed(dest / f"{product_dir.name}.png", render_sheet(rows, tiles, tile, atlas))
+                result.sheets += 1
+            return result
+
+        batches: dict[str, list[Path]] = {}
+        for product_dir in product_dirs:
+            batch = _read_manifest(product_dir).get("batch_id") or "no_batch"
+            batches.setdefault(batch, []).append(product_dir)
+        for batch, dirs in sorted(batches.items()):
+            for page, start in enumerate(range(0, len(dirs), per_page), start=1):
+                rows = [product_rows(root, d, with_sources=False)[0] for d in dirs[start:start + per_page]]
+                tiles = _load_tiles(rows, cache, pool, result)
+                _write_if_changed(dest / f"{batch}_p{page:03d}.png", render_sheet(rows, tiles, tile, atlas))
+                result.sheets += 1
+        return result
+    finally:
+        if pool is not None:
+            pool.shutdown()
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import json
+import os
+import struct
+import tempfile
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .checksums import hash_file
+from .png import decode_png, encode_png, png_dimensions
+from .renderjobs import iter_render_jobs
+from .resample import fit_rgb
+from .util import ValidationError
+
+EXPORT_MANIFEST = "export.json"
+# Fixed entry timestamps keep re-exports of unchanged images byte-identical.
+_ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+@dataclass(frozen=True)
+class MarketplaceProfile:
+    name: str
+    sizes: tuple[tuple[int, int], ...]
+    description: str
+
+
+MARKETPLACE_PROFILES = {
+    p.name: p
+    for p in (
+        MarketplaceProfile("master", ((2000, 2000),), "full-size 1:1 canvas"),
+        MarketplaceProfile("square", ((1200, 1200), (800, 800)), "1:1 listing and thumbnail sizes"),
+        MarketplaceProfile("portrait", ((900, 1200),), "3:4 catalog cards"),
+        MarketplaceProfile("landscape", ((1920, 1080),), "16:9 banners"),
+    )
+}
+DEFAULT_PROFILES = ("master",)
+
+
+def export_name(product_id: str, category: str, index: int) -> str:
+    return f"{product_id}_{category}_{index:02d}.png"
+
+
+@dataclass
+class ExportResult:
+    products: int = 0
+    images: int = 0
+    bytes: int = 0
+    skipped: int = 0
+    errors: list[str] = field(default_factory=list)
+
+
+def _export_product(
+    dest: str, sources: list[tuple[str, str]], sizes: dict[str, list[tuple[int, int]]], manifest: bytes
+) -> tuple[int, int, str | None]:
+    # Process-pool entry point. Sources are (image path, export name); each is decoded once and
+    # resampled to every distinct target size, and the results stream into the zip as they are made.
+    dest_path = Path(dest)
+    try:
+        fd, tmp = tempfile.mkstemp(dir=dest_path.parent, prefix=f".{dest_path.name}.")
+    except OSError as e:
+        return 0, 0, f"{dest_path.name}: cannot write to {dest_path.parent}: {e}"
+    os.close(fd)
+    images = 0
+    src = tmp
+    try:
+        with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_STORED) as zf:
+            for src, name in sources:
+                data = Path(src).read_bytes()
+                width, height = png_dimensions(data)
+                pixels = None
+                encoded: dict[tuple[int, int], bytes] = {}
+                for profile, targets in sizes.items():
+                    for w, h in targets:
+                        if (w, h) not in encoded:
+                            if (w, h) == (width, height):
+                                encoded[(w, h)] = data
+                            else:
+                                if pixels is None:
+                                    _w, _h, pixels = decode_png(data)
+                                encoded[(w, h)] = encode_png(w, h, bytes(fit_rgb(pixels, width, height, w, h)))
+                        # PNGs are already deflated; storing them avoids a second, useless compression pass.
+                        zf.writestr(zipfile.ZipInfo(f"{profile}/{w}x{h}/{name}", _ZIP_DATE_TIME), encoded[(w, h)])
+                        images += 1
+            zf.writestr(zipfile.ZipInfo(EXPORT_MANIFEST, _ZIP_DATE_TIME), manifest)
+        os.replace(tmp, dest_path)
+    except (ValueError, OSError, struct.error, zlib.error) as e:
+        # A truncated or corrupt image, or an unreadable file, fails this product only.
+        return 0, 0, f"{dest_path.name}: cannot export {src}: {e}"
+    finally:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+    return images, dest_path.stat().st_size, None
+
+
+def _existing_manifest(path: Path) -> bytes | None:
+    try:
+        with zipfile.ZipFile(path) as zf:
+            return zf.read(EXPORT_MANIFEST)
+    except (FileNotFoundError, KeyError, zipfile.BadZipFile):
+        return None
+
+
+def export_packages(
+    out_root: str | Path,
+    product_dirs: list[Path],
+    dest_dir: str | Path,
+    profiles: tuple[str, ...] = DEFAULT_PROFILES,
+    workers: int | None = None,
+    force: bool = False,
+) -> ExportResult:
+    """Write one `<product>.zip` per package with every expected image in each profile's sizes.
+
+    Images are named `<SKU>_<category>_<index>.png` under `<profile>/<W>x<H>/`. A zip whose recorded
+    source hashes and profiles still match is left alone. Products are exported in a process pool.
+    """
+    unknown = [p for p in profiles if p not in MARKETPLACE_PROFILES]
+    if unknown:
+        raise ValidationError(
+            f"Unknown export profile(s): {', '.join(unknown)}; choose from {', '.join(MARKETPLACE_PROFILES)}"
+        )
+    root = Path(out_root)
+    dest = Path(dest_dir)
+    dest.mkdir(parents=True, exist_ok=True)
+    sizes = {name: list(MARKETPLACE_PROFILES[name].sizes) for name in sorted(set(profiles))}
+    result = ExportResult()
+    tasks: list[tuple[str, list[tuple[str, str]], dict, bytes]] = []
+    for product_dir in product_dirs:
+        sources: list[tuple[str, str]] = []
+        position: dict[str, int] = {}
+        missing: list[str] = []
+        for job in iter_render_jobs(product_dir):
+            position[job.category] = position.get(job.category, 0) + 1
+            image = root / job.output
+            if not image.is_file():
+                missing.append(str(image))
+            sources.append((str(image), export_name(product_dir.name, job.category, position[job.category])))
+        result.products += 1
+        if missing:
+            result.errors.append(
+                f"{product_dir.name}.zip: missing image(s) {', '.join(missing)}; run render (and compose) first"
+            )
+            continue
+        try:
+            hashes = {name: hash_file(Path(src)) for src, name in sources}
+        except OSError as e:
+            result.errors.append(f"{product_dir.name}.zip: cannot read sources: {e}")
+            continue
+        manifest = (
+            json.dumps({"product_id": product_dir.name, "profiles": sizes, "sources": hashes}, indent=2, sort_keys=True)
+            + "\n"
+        ).encode("utf-8")
+        zip_path = dest / f"{product_dir.name}.zip"
+        if not force and _existing_manifest(zip_path) == manifest:
+            result.skipped += 1
+            continue
+        tasks.append((str(zip_path), sources, sizes, manifest))
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) <= 1:
+        outcomes = [_export_product(*t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            outcomes = list(pool.map(_export_product, *zip(*tasks)))
+    for images, size, error in outcomes:
+        if error:
+            result.errors.append(error)
+        result.images += images
+        result.bytes += size
+    return result
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+
+# Classic 5x7 ASCII bitmap font (0x20..0x7E): five column bytes per glyph, bit 0 = top row.
+_FONT_5X7 = bytes.fromhex(
+    "0000000000" "00005f0000" "0007000700" "147f147f14" "242a7f2a12" "2313086462" "3649552250" "0005030000"
+    "001c224100" "0041221c00" "082a1c2a08" "08083e0808" "0050300000" "0808080808" "0060600000" "2010080402"
+    "3e5149453e" "00427f4000" "4261514946" "2141454b31" "1814127f10" "2745454539" "3c4a494930" "0171090503"
+    "3649494936" "064949291e" "0036360000" "0056360000" "0008142241" "1414141414" "4122140800" "0201510906"
+    "324979413e" "7e1111117e" "7f49494936" "3e41414122" "7f4141221c" "7f49494941" "7f09090101" "3e41415132"
+    "7f0808087f" "00417f4100" "2040413f01" "7f08142241" "7f40404040" "7f0204027f" "7f0408107f" "3e4141413e"
+    "7f09090906" "3e4151215e" "7f09192946" "4649494931" "01017f0101" "3f4040403f" "1f2040201f" "7f2018207f"
+    "6314081463" "0304780403" "6151494543" "00007f4141" "0204081020" "41417f0000" "0402010204" "4040404040"
+    "0001020400" "2054545478" "7f48444438" "3844444420" "384444487f" "3854545418" "087e090102" "081454543c"
+    "7f08040478" "00447d4000" "2040443d00" "007f102844" "00417f4000" "7c04180478" "7c08040478" "3844444438"
+    "7c14141408" "081414187c" "7c08040408" "4854545420" "043f444020" "3c4040207c" "1c2040201c" "3c4030403c"
+    "4428102844" "0c5050503c" "4464544c44" "0008364100" "00007f0000" "0041360800" "0804081008"
+)
+_FIRST, _LAST = 0x20, 0x7E
+
+
+@dataclass(frozen=True)
+class BitmapFont:
+    """Fixed-width bitmap font, scaled by whole pixels."""
+
+    name: str
+    columns: bytes
+    glyph_width: int = 5
+    glyph_height: int = 7
+    advance: int = 6
+    line_height: int = 9
+
+    def glyph_columns(self, ch: str) -> bytes:
+        code = ord(ch)
+        if not _FIRST <= code <= _LAST:
+            code = ord("?")
+        i = (code - _FIRST) * self.glyph_width
+        return self.columns[i:i + self.glyph_width]
+
+    def advance_widths(self) -> dict[str, int]:
+        # Unscaled advance per printable ASCII character; every cell is the same width in this format.
+        return {chr(code): self.advance for code in range(_FIRST, _LAST + 1)}
+
+
+BUILTIN_FONT = BitmapFont("builtin-5x7", _FONT_5X7)
+
+
+@dataclass(frozen=True)
+class Glyph:
+    width: int
+    # Per pixel row: (x offset, ready-to-copy RGB bytes) runs of ink.
+    rows: tuple[tuple[tuple[int, bytes], ...], ...]
+
+
+class GlyphAtlas:
+    """Rasterized glyphs per (font, scale, colour), built once and shared by a whole batch."""
+
+    def __init__(self) -> None:
+        self._glyphs: dict[tuple[str, int, tuple[int, int, int], str], Glyph] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._glyphs)
+
+    def glyph(self, font: BitmapFont, scale: int, color: tuple[int, int, int], ch: str) -> Glyph:
+        key = (font.name, scale, color, ch)
+        glyph = self._glyphs.get(key)
+        if glyph is None:
+            glyph = _rasterize(font, scale, bytes(color), ch)
+            with self._lock:
+                self._glyphs.setdefault(key, glyph)
+        return glyph
+
+
+def _rasterize(font: BitmapFont, scale: int, color: bytes, ch: str) -> Glyph:
+    cols = font.glyph_columns(ch)
+    rows: list[tuple[tuple[int, bytes], ...]] = []
+    for r in range(font.glyph_height):
+        runs: list[tuple[int, bytes]] = []
+        c = 0
+        while c < len(cols):
+            if not (cols[c] >> r) & 1:
+                c += 1
+                continue
+            start = c
+            while c < len(cols) and (cols[c] >> r) & 1:
+                c += 1
+            runs.append((start * scale, color * ((c - start) * scale)))
+        rows.extend([tuple(runs)] * scale)
+    return Glyph(width=font.advance * scale, rows=tuple(rows))
+
+
+def text_width(font: BitmapFont, scale: int, text: str) -> int:
+    return len(text) * font.advance * scale
+
+
+def draw_text(
+    pixels: bytearray,
+    width: int,
+    x: int,
+    y: int,
+    text: str,
+    font: BitmapFont,
+    scale: int,
+    color: tuple[int, int, int],
+    atlas: GlyphAtlas,
+) -> None:
+    """Blit text into packed RGB pixels; each ink run is a single slice assignment."""
+    stride = width * 3
+    for ch in text:
+        glyph = atlas.glyph(font, scale, color, ch)
+        base = y * stride + x * 3
+        for dy, runs in enumerate(glyph.rows):
+            row = base + dy * stride
+            for dx, run in runs:
+                start = row + dx * 3
+                pixels[start:start + len(run)] = run
+        x += glyph.width
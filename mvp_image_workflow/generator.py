@@ -1,12 +1,16 @@
 from __future__ import annotations
 
 import json
-import os
-import tempfile
-from pathlib import Path
+from pathlib import Path, PurePosixPath
 
 from .batch import ProductRow
-from .util import ValidationError, now_utc_iso, safe_id
+from .checksums import ChecksumSink
+from .locking import product_lock_name
+from .outputsets import TEXT_BUILDERS, output_plan
+from .sources import SOURCE_FINGERPRINTS_KEY
+from .storage import LocalSink, Sink
+from .util import ValidationError, now_utc_iso, safe_id, utc_iso_from_epoch
+from .variants import VARIANTS_FILE, VARIANTS_KEY, PersonalizationVariant, variants_jsonl
 
 
 QC_FAIL_FAST = [
@@ -28,56 +32,13 @@ QC_REJECT_TAGS = [
 ]
 
 
-def _write_text(path: Path, content: str) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-
-    tmp_path: str | None = None
-    try:
-        with tempfile.NamedTemporaryFile(
-            "w",
-            encoding="utf-8",
-            newline="\n",
-            dir=path.parent,
-            delete=False,
-        ) as f:
-            tmp_path = f.name
-            f.write(content.rstrip() + "\n")
-        os.replace(tmp_path, path)
-    finally:
-        if tmp_path is not None and os.path.exists(tmp_path):
-            try:
-                os.unlink(tmp_path)
-            except OSError:
-                pass
-
-
-def _write_json(path: Path, obj: object) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-
-    tmp_path: str | None = None
-    try:
-        with tempfile.NamedTemporaryFile(
-            "w",
-            encoding="utf-8",
-            newline="\n",
-            dir=path.parent,
-            delete=False,
-        ) as f:
-            tmp_path = f.name
-            f.write(json.dumps(obj, ensure_ascii=False, indent=2) + "\n")
-        os.replace(tmp_path, path)
-    finally:
-        if tmp_path is not None and os.path.exists(tmp_path):
-            try:
-                os.unlink(tmp_path)
-            except OSError:
-                pass
+def _write_text(sink: Sink, path: PurePosixPath, content: str) -> None:
+    sink.write_bytes(path.as_posix(), (content.rstrip() + "\n").encode("utf-8"))
 
 
-def _dimensions_line(product: ProductRow) -> str | None:
-    if not (product.dimensions_l and product.dimensions_w and product.dimensions_h):
-        return None
-    return f"Dimensions: {product.dimensions_l} x {product.dimensions_w} x {product.dimensions_h} {product.units}"
+def _write_json(sink: Sink, path: PurePosixPath, obj: object, sort_keys: bool = False) -> None:
+    text = json.dumps(obj, ensure_ascii=False, indent=2, sort_keys=sort_keys) + "\n"
+    sink.write_bytes(path.as_posix(), text.encode("utf-8"))
 
 
 def _validate_batch_id(batch_id: str | None) -> str | None:
@@ -94,17 +55,22 @@ def _validate_batch_id(batch_id: str | None) -> str | None:
     return safe
 
 
-def _read_existing_manifest_product_id(product_dir: Path) -> str | None:
+def _read_existing_manifest(sink: Sink, product_dir: PurePosixPath) -> dict | None:
     manifest_path = product_dir / "manifest.json"
-    if not manifest_path.exists():
+    raw = sink.read_bytes(manifest_path.as_posix())
+    if raw is None:
         return None
     try:
-        data = json.loads(manifest_path.read_text(encoding="utf-8"))
+        data = json.loads(raw.decode("utf-8"))
     except json.JSONDecodeError as e:
         raise ValidationError(f"Invalid JSON in existing {manifest_path}: {e}") from None
 
     if not isinstance(data, dict):
         raise ValidationError(f"Invalid existing {manifest_path}: expected JSON object")
+    return data
+
+
+def _existing_manifest_product_id(data: dict, manifest_path: PurePosixPath) -> str | None:
     product = data.get("product")
     if not isinstance(product, dict):
         raise ValidationError(f"Invalid existing {manifest_path}: missing 'product' object")
@@ -116,86 +82,40 @@ def _read_existing_manifest_product_id(product_dir: Path) -> str | None:
     return pid
 
 
-def generate_product_package(product: ProductRow, out_root: str | Path, batch_id: str | None) -> Path:
-    root = Path(out_root)
-    if root.exists() and not root.is_dir():
-        raise ValidationError(f"Output root must be a directory: {root}")
-    safe_product_id = safe_id(product.product_id)
-    if not safe_product_id:
-        raise ValidationError(
-            f"product_id '{product.product_id}' cannot be converted to a safe folder name."
-        )
-    if safe_product_id != product.product_id:
-        raise ValidationError(
-            "product_id contains unsafe characters; allowed: letters, numbers, '-' and '_'"
-        )
-
-    safe_batch_id = _validate_batch_id(batch_id)
-
-    product_dir = root / safe_product_id
-    existing_pid = _read_existing_manifest_product_id(product_dir)
+def _write_package(
+    sink: Sink,
+    product: ProductRow,
+    safe_product_id: str,
+    safe_batch_id: str | None,
+    generated_at: str,
+    deterministic: bool,
+    variants: list[PersonalizationVariant] | None,
+) -> None:
+    # Paths below are relative to the output root; the sink decides where the bytes land.
+    product_dir = PurePosixPath(safe_product_id)
+    sink = recorder = ChecksumSink(sink, product_dir)
+    existing_manifest = _read_existing_manifest(sink, product_dir)
+    existing_pid = None
+    if existing_manifest is not None:
+        existing_pid = _existing_manifest_product_id(existing_manifest, product_dir / "manifest.json")
     if existing_pid is not None and existing_pid != product.product_id:
         raise ValidationError(
             "product_id collision after normalization: "
             f"existing '{existing_pid}' vs new '{product.product_id}' map to '{safe_product_id}'"
         )
-    showcase_dir = product_dir / "showcase"
-    spec_dir = product_dir / "spec"
-    howto_dir = product_dir / "howto"
+    plan = output_plan(product.output_set)
+    category_dirs = {category: product_dir / category for category in plan.categories}
     source_dir = product_dir / "source"
     prompts_dir = product_dir / "prompts"
     texts_dir = product_dir / "texts"
     meta_dir = product_dir / "meta"
 
-    for d in [showcase_dir, spec_dir, howto_dir, source_dir, prompts_dir, texts_dir, meta_dir]:
-        d.mkdir(parents=True, exist_ok=True)
+    for d in [*category_dirs.values(), source_dir, prompts_dir, texts_dir, meta_dir]:
+        sink.ensure_dir(d.as_posix())
 
-    prefix = safe_product_id
     suffix = f"_{safe_batch_id}" if safe_batch_id else ""
+    expected = plan.expected_outputs(safe_product_id, suffix)
 
-    expected = {
-        "showcase": [
-            f"{prefix}_showcase_01{suffix}.png",
-            f"{prefix}_showcase_02{suffix}.png",
-            f"{prefix}_showcase_03{suffix}.png",
-        ],
-        "spec": [
-            f"{prefix}_spec_01{suffix}.png",
-            f"{prefix}_spec_02{suffix}.png",
-        ],
-        "howto": [
-            f"{prefix}_howto_01{suffix}.png",
-            f"{prefix}_howto_02{suffix}.png",
-        ],
-    }
-
-    # Text sources (English-only; intended to be template-rendered onto generated backgrounds).
-    dims = _dimensions_line(product)
-    spec_01_lines = [product.product_name_en]
-    if dims:
-        spec_01_lines.append(dims)
-    spec_01_lines.extend(f"- {s}" for s in product.specs)
-    _write_text(texts_dir / "spec_01.txt", "\n".join(spec_01_lines))
-
-    spec_02_lines = ["Key Specs", ""]
-    spec_02_lines.extend(f"- {s}" for s in product.specs)
-    _write_text(texts_dir / "spec_02.txt", "\n".join(spec_02_lines))
-
-    howto_01_lines = [product.howto_title, ""]
-    howto_01_lines.extend(f"Step {i+1}: {s}" for i, s in enumerate(product.steps))
-    _write_text(texts_dir / "howto_01.txt", "\n".join(howto_01_lines))
-
-    howto_02_lines = ["Tips", ""]
-    if product.tips:
-        howto_02_lines.extend(f"- {t}" for t in product.tips)
-    else:
-        howto_02_lines.append("- (Optional) Add 2-4 short English tips.")
-    _write_text(texts_dir / "howto_02.txt", "\n".join(howto_02_lines))
-
-    if product.personalization_text_en:
-        _write_text(texts_dir / "personalization_text.txt", product.personalization_text_en)
-
-    # Prompts.
     global_constraints = [
         "NON-NEGOTIABLES:",
         "- Product Lock: product must be 100% identical to supplier product (shape/structure/color/ratio).",
@@ -212,79 +132,26 @@ def generate_product_package(product: ProductRow, out_root: str | Path, batch_id
     if product.manager_notes:
         global_constraints.append(f"Manager notes (may be EN/RU): {product.manager_notes}")
 
-    showcase_01 = [
-        *global_constraints,
-        "",
-        "SHOT TYPE: Clean main e-commerce image (1:1).",
-        "- Simple, clean background suitable for marketplaces.",
-        "- Product centered, uncluttered, soft shadow.",
-        "- No extra props that could alter perception of the product.",
-    ]
-    _write_text(prompts_dir / "showcase_01_clean_main.txt", "\n".join(showcase_01))
-
-    showcase_02 = [
-        *global_constraints,
-        "",
-        "SHOT TYPE: Lifestyle scene (variation A).",
-        "- Clearly different background and composition vs supplier images.",
-        "- Keep product identity locked.",
-        "- Add context props appropriate to the category, but do not occlude key product parts.",
-    ]
-    _write_text(prompts_dir / "showcase_02_lifestyle_A.txt", "\n".join(showcase_02))
+    # One pass over the plan: each shot's prompt, plus its text source (English-only, rendered onto
+    # the generated background later) the first time a shot needs it.
+    written_texts: set[str] = set()
+    for shot in plan.shots:
+        if shot.text_source and shot.text_source not in written_texts:
+            text = TEXT_BUILDERS[shot.text_builder](product)
+            _write_text(sink, product_dir / shot.text_source, "\n".join(text))
+            written_texts.add(shot.text_source)
+        _write_text(sink, prompts_dir / shot.prompt_file, "\n".join([*global_constraints, "", *shot.prompt_body]))
 
-    showcase_03 = [
-        *global_constraints,
-        "",
-        "SHOT TYPE: Lifestyle scene (variation B).",
-        "- Different scene/lighting/composition vs variation A.",
-        "- Keep product identity locked.",
-    ]
-    _write_text(prompts_dir / "showcase_03_lifestyle_B.txt", "\n".join(showcase_03))
-
-    spec_common = [
-        *global_constraints,
-        "",
-        "TYPE: Specs image background + product (text will be template-rendered).",
-        "- Do NOT render any text inside the image.",
-        "- Reserve a clean info bar area (~30% of canvas) at the bottom or side.",
-        "- Keep safe margins >= 120px.",
-        "- Ensure the info area has enough contrast for later text overlay.",
-    ]
-    _write_text(prompts_dir / "spec_01_dimensions_background.txt", "\n".join(spec_common + [
-        "",
-        "TEXT SOURCE (for later overlay): texts/spec_01.txt",
-        "CONTENT: dimensions/structure emphasis.",
-    ]))
-    _write_text(prompts_dir / "spec_02_specs_background.txt", "\n".join(spec_common + [
-        "",
-        "TEXT SOURCE (for later overlay): texts/spec_02.txt",
-        "CONTENT: key specs list emphasis.",
-    ]))
-
-    howto_common = [
-        *global_constraints,
-        "",
-        "TYPE: How-to image background + product (text will be template-rendered).",
-        "- Do NOT render any text inside the image.",
-        "- Reserve a clean info area (~30% of canvas) for steps/tips.",
-        "- Keep safe margins >= 120px.",
-        "- Ensure the info area has enough contrast for later text overlay.",
-    ]
-    _write_text(prompts_dir / "howto_01_steps_background.txt", "\n".join(howto_common + [
-        "",
-        "TEXT SOURCE (for later overlay): texts/howto_01.txt",
-        "CONTENT: steps/instructions.",
-    ]))
-    _write_text(prompts_dir / "howto_02_tips_background.txt", "\n".join(howto_common + [
-        "",
-        "TEXT SOURCE (for later overlay): texts/howto_02.txt",
-        "CONTENT: tips/notice.",
-    ]))
+    if product.personalization_text_en:
+        _write_text(sink, texts_dir / "personalization_text.txt", product.personalization_text_en)
+    if variants:
+        # Per-order overlays: one JSONL line each instead of a package copy per order.
+        sink.write_bytes((product_dir / VARIANTS_FILE).as_posix(), variants_jsonl(variants))
 
     # Meta.
     manifest = {
         "version": "0.1.0",
-        "generated_at_utc": now_utc_iso(),
+        "generated_at_utc": generated_at,
         "batch_id": safe_batch_id,
         "product": {
             "product_id": product.product_id,
@@ -295,26 +162,31 @@ def generate_product_package(product: ProductRow, out_root: str | Path, batch_id
         },
         "expected_outputs": expected,
         "paths": {
-            "showcase_dir": str(showcase_dir.relative_to(product_dir)),
-            "spec_dir": str(spec_dir.relative_to(product_dir)),
-            "howto_dir": str(howto_dir.relative_to(product_dir)),
+            **{f"{c}_dir": str(d.relative_to(product_dir)) for c, d in category_dirs.items()},
             "source_dir": str(source_dir.relative_to(product_dir)),
             "prompts_dir": str(prompts_dir.relative_to(product_dir)),
             "texts_dir": str(texts_dir.relative_to(product_dir)),
             "meta_dir": str(meta_dir.relative_to(product_dir)),
         },
     }
-    _write_json(product_dir / "manifest.json", manifest)
+    # Source fingerprints are owned by ingest-sources; keep them across regenerations.
+    if existing_manifest is not None and SOURCE_FINGERPRINTS_KEY in existing_manifest:
+        manifest[SOURCE_FINGERPRINTS_KEY] = existing_manifest[SOURCE_FINGERPRINTS_KEY]
+    if variants:
+        manifest[VARIANTS_KEY] = {"file": VARIANTS_FILE, "count": len(variants)}
+    elif existing_manifest is not None and VARIANTS_KEY in existing_manifest:
+        manifest[VARIANTS_KEY] = existing_manifest[VARIANTS_KEY]
+    _write_json(sink, product_dir / "manifest.json", manifest, sort_keys=deterministic)
 
     qc = {
         "fail_fast": QC_FAIL_FAST,
         "reject_tags": QC_REJECT_TAGS,
         "notes": "If any fail_fast item fails, reject immediately.",
     }
-    _write_json(meta_dir / "qc_checklist.json", qc)
+    _write_json(sink, meta_dir / "qc_checklist.json", qc, sort_keys=deterministic)
 
     product_meta = {
-        "generated_at_utc": now_utc_iso(),
+        "generated_at_utc": generated_at,
         "product_id": product.product_id,
         "style_pack": product.style_pack,
         "units": product.units,
@@ -325,6 +197,42 @@ def generate_product_package(product: ProductRow, out_root: str | Path, batch_id
         },
         "has_personalization_text": bool(product.personalization_text_en),
     }
-    _write_json(meta_dir / "product.json", product_meta)
+    _write_json(sink, meta_dir / "product.json", product_meta, sort_keys=deterministic)
+    recorder.write_sidecar()
+
+
+def generate_product_package(
+    product: ProductRow,
+    out_root: str | Path,
+    batch_id: str | None,
+    sink: Sink | None = None,
+    source_date_epoch: int | None = None,
+    variants: list[PersonalizationVariant] | None = None,
+) -> Path:
+    root = Path(out_root)
+    if sink is None:
+        if root.exists() and not root.is_dir():
+            raise ValidationError(f"Output root must be a directory: {root}")
+        sink = LocalSink(root)
+    safe_product_id = safe_id(product.product_id)
+    if not safe_product_id:
+        raise ValidationError(
+            f"product_id '{product.product_id}' cannot be converted to a safe folder name."
+        )
+    if safe_product_id != product.product_id:
+        raise ValidationError(
+            "product_id contains unsafe characters; allowed: letters, numbers, '-' and '_'"
+        )
+
+    safe_batch_id = _validate_batch_id(batch_id)
+    if variants and any(v.product_id != product.product_id for v in variants):
+        raise ValidationError(f"Personalization variants passed for another product than '{product.product_id}'")
+    # Deterministic mode: a pinned timestamp and sorted JSON keys make reruns byte-identical.
+    deterministic = source_date_epoch is not None
+    generated_at = utc_iso_from_epoch(source_date_epoch) if source_date_epoch is not None else now_utc_iso()
+
+    # The collision check and the writes must not interleave with another run on this product.
+    with sink.lock(product_lock_name(safe_product_id)):
+        _write_package(sink, product, safe_product_id, safe_batch_id, generated_at, deterministic, variants)
 
-    return product_dir
+    return root / safe_product_id
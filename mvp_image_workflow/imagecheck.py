@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import repeat
+from operator import add, mul, rshift, sub
+from pathlib import Path
+
+from .checksums import hash_file, update_sidecar
+from .compose import DARK_TEXT, LIGHT_TEXT
+from .layout import INFO_BAR_FRACTION, SAFE_MARGIN
+from .locking import DEFAULT_LOCK_TIMEOUT, file_lock, lock_path, product_lock_name
+from .png import iter_png_rows, png_dimensions
+from .renderjobs import iter_render_jobs
+from .storage import atomic_write_bytes
+from .util import ValidationError
+
+IMAGE_QC_FILE = "meta/image_qc.json"
+ROW_CHUNK = 64
+# Every 2nd pixel of every 2nd row: a quarter of the work, same verdicts on flat backgrounds.
+SAMPLE_STEP = 2
+
+MIN_CONTRAST = 4.5
+MAX_LOW_CONTRAST_SHARE = 0.05
+LOW_CONTRAST = 3.0
+MAX_LOCAL_VARIANCE = 100.0
+MAX_MARGIN_INTRUSION = 0.02
+INTRUSION_DELTA = 32
+
+THRESHOLDS = {
+    "min_contrast": MIN_CONTRAST,
+    "max_low_contrast_share": MAX_LOW_CONTRAST_SHARE,
+    "max_local_variance": MAX_LOCAL_VARIANCE,
+    "max_margin_intrusion": MAX_MARGIN_INTRUSION,
+    "margin_px": SAFE_MARGIN,
+}
+
+# Rec. 709 luma in 8.8 fixed point, one lookup table per channel.
+_LUMA_R = [54 * v for v in range(256)]
+_LUMA_G = [183 * v for v in range(256)]
+_LUMA_B = [19 * v for v in range(256)]
+
+
+def _linear(v: int) -> float:
+    c = v / 255
+    return c / 12.92 if c <= 0.04045 else ((c + 0.055) / 1.055) ** 2.4
+
+
+_RELATIVE_LUMINANCE = [_linear(v) for v in range(256)]
+
+
+def _text_luminance(color: tuple[int, int, int]) -> float:
+    r, g, b = (_RELATIVE_LUMINANCE[c] for c in color)
+    return 0.2126 * r + 0.7152 * g + 0.0722 * b
+
+
+def _contrast(a: float, b: float) -> float:
+    hi, lo = max(a, b), min(a, b)
+    return (hi + 0.05) / (lo + 0.05)
+
+
+def _luma(row: bytearray, x0: int, x1: int, step: int) -> list[int]:
+    start, end, stride = x0 * 3, x1 * 3, step * 3
+    mixed = map(
+        add,
+        map(add, map(_LUMA_R.__getitem__, row[start:end:stride]), map(_LUMA_G.__getitem__, row[start + 1:end:stride])),
+        map(_LUMA_B.__getitem__, row[start + 2:end:stride]),
+    )
+    return list(map(rshift, mixed, repeat(8)))
+
+
+def _hist_mean_std(hist: Counter) -> tuple[float, float]:
+    n = sum(hist.values())
+    if not n:
+        return 0.0, 0.0
+    mean = sum(v * c for v, c in hist.items()) / n
+    var = sum((v - mean) ** 2 * c for v, c in hist.items()) / n
+    return mean, var ** 0.5
+
+
+def _hist_median(hist: Counter) -> int:
+    half = sum(hist.values()) / 2
+    seen = 0
+    for v in sorted(hist):
+        seen += hist[v]
+        if seen >= half:
+            return v
+    return 0
+
+
+def analyze_image(
+    data: bytes, margin: int = SAFE_MARGIN, step: int = SAMPLE_STEP, chunk_rows: int = ROW_CHUNK
+) -> tuple[list[str], dict]:
+    """(problems, metrics) for the info bar and safe margins of one spec/how-to background."""
+    width, height = png_dimensions(data)
+    bar_top = height - round(height * INFO_BAR_FRACTION)
+    if width <= 2 * margin or height - margin <= bar_top:
+        return [f"{width}x{height} image leaves no room inside {margin}px margins"], {"size": [width, height]}
+
+    bar = Counter()
+    diff_sq = diff_n = 0
+    # Margin zones are split at the bar top so a light info bar does not read as an intrusion.
+    zones: dict[str, Counter] = {
+        name: Counter() for name in ("top", "bottom", "left", "right", "left_bar", "right_bar")
+    }
+    for first, rows in iter_png_rows(data, chunk_rows):
+        stride = width * 3
+        for y in range(first + (-first) % step, first + len(rows) // stride, step):
+            row = rows[(y - first) * stride:(y - first + 1) * stride]
+            if y < margin or y >= height - margin:
+                zones["top" if y < margin else "bottom"].update(_luma(row, 0, width, step))
+                continue
+            in_bar = y >= bar_top
+            zones["left_bar" if in_bar else "left"].update(_luma(row, 0, margin, step))
+            zones["right_bar" if in_bar else "right"].update(_luma(row, width - margin, width, step))
+            if in_bar:
+                luma = _luma(row, margin, width - margin, step)
+                bar.update(luma)
+                d = list(map(sub, luma[1:], luma[:-1]))
+                diff_sq += sum(map(mul, d, d))
+                diff_n += len(d)
+
+    problems: list[str] = []
+    mean, std = _hist_mean_std(bar)
+    text = DARK_TEXT if mean >= 128 else LIGHT_TEXT
+    text_lum = _text_luminance(text)
+    bar_n = sum(bar.values()) or 1
+    contrast = _contrast(_RELATIVE_LUMINANCE[round(mean)], text_lum)
+    low = sum(c for v, c in bar.items() if _contrast(_RELATIVE_LUMINANCE[v], text_lum) < LOW_CONTRAST)
+    # Half the mean squared neighbour difference estimates the variance of small-scale texture.
+    local_variance = diff_sq / (2 * diff_n) if diff_n else 0.0
+
+    intrusion: dict[str, float] = {}
+    for name, hist in zones.items():
+        n = sum(hist.values())
+        if not n:
+            continue
+        median = _hist_median(hist)
+        off = sum(c for v, c in hist.items() if abs(v - median) > INTRUSION_DELTA)
+        intrusion[name] = round(off / n, 4)
+    worst = max(intrusion, key=intrusion.__getitem__, default=None)
+
+    metrics = {
+        "size": [width, height],
+        "info_area": [margin, bar_top, width - margin, height - margin],
+        "luminance_mean": round(mean, 2),
+        "luminance_std": round(std, 2),
+        "local_variance": round(local_variance, 2),
+        "text_color": list(text),
+        "contrast": round(contrast, 2),
+        "low_contrast_share": round(low / bar_n, 4),
+        "margin_intrusion": intrusion,
+    }
+    if contrast < MIN_CONTRAST:
+        problems.append(f"info area contrast {contrast:.1f}:1 against the text colour is below {MIN_CONTRAST}:1")
+    if low / bar_n > MAX_LOW_CONTRAST_SHARE:
+        problems.append(f"{low / bar_n:.0%} of the info area is too close to the text colour")
+    if local_variance > MAX_LOCAL_VARIANCE:
+        problems.append(f"info area is not clean (local variance {local_variance:.0f} > {MAX_LOCAL_VARIANCE:.0f})")
+    if worst is not None and intrusion[worst] > MAX_MARGIN_INTRUSION:
+        problems.append(f"content intrudes into the {worst.replace('_', ' ')} margin ({intrusion[worst]:.1%} of pixels)")
+    return problems, metrics
+
+
+def _check_file(path: str) -> tuple[list[str], dict]:
+    # Process-pool entry point: workers read the file themselves instead of receiving pixels.
+    try:
+        return analyze_image(Path(path).read_bytes())
+    except ValueError as e:
+        return [f"cannot decode image: {e}"], {}
+
+
+@dataclass
+class ImageCheckResult:
+    checked: int = 0
+    reused: int = 0
+    # "<product>/<image>: <problem>; ..." per failed image.
+    failures: list[str] = field(default_factory=list)
+
+
+def check_images(
+    out_root: str | Path,
+    product_dirs: list[Path],
+    workers: int | None = None,
+    force: bool = False,
+    lock_timeout: float = DEFAULT_LOCK_TIMEOUT,
+) -> ImageCheckResult:
+    """Check info-area contrast/cleanliness and margin intrusion of every spec/how-to background.
+
+    Results go to meta/image_qc.json per product; images whose hash matches the last report are reused.
+    Decoding and statistics run in a process pool, one image per task.
+    """
+    root = Path(out_root)
+    workers = workers or os.cpu_count() or 1
+    result = ImageCheckResult()
+    reports: dict[Path, dict] = {}
+    todo: list[tuple[Path, str, str]] = []
+    for product_dir in product_dirs:
+        path = product_dir / IMAGE_QC_FILE
+        try:
+            previous = json.loads(path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            previous = {}
+        if not isinstance(previous, dict):
+            previous = {}
+        old = previous.get("images") if previous.get("thresholds") == THRESHOLDS else None
+        if not isinstance(old, dict):
+            old = {}
+        images: dict[str, dict] = {}
+        for job in iter_render_jobs(product_dir):
+            if not job.text_source:
+                continue
+            image = root / job.target
+            if not image.is_file():
+                raise ValidationError(f"Missing background {image}; run render first")
+            key = job.target.split("/", 1)[1]
+            digest = hash_file(image)
+            prev = old.get(key)
+            if not force and isinstance(prev, dict) and prev.get("sha256") == digest:
+                images[key] = old[key]
+                result.reused += 1
+            else:
+                images[key] = {"sha256": digest}
+                todo.append((product_dir, key, str(image)))
+        reports[product_dir] = images
+
+    paths = [image for _dir, _key, image in todo]
+    if workers == 1 or len(paths) <= 1:
+        outcomes = [_check_file(p) for p in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+            outcomes = list(pool.map(_check_file, paths, chunksize=4))
+    for (product_dir, key, _image), (problems, metrics) in zip(todo, outcomes):
+        reports[product_dir][key].update(passed=not problems, problems=problems, metrics=metrics)
+        result.checked += 1
+
+    for product_dir, images in reports.items():
+        for key, entry in images.items():
+            if not entry["passed"]:
+                result.failures.append(f"{product_dir.name}/{key}: {'; '.join(entry['problems'])}")
+        doc = {"thresholds": THRESHOLDS, "passed": all(e["passed"] for e in images.values()), "images": images}
+        data = (json.dumps(doc, indent=2, sort_keys=True) + "\n").encode("utf-8")
+        path = product_dir / IMAGE_QC_FILE
+        with file_lock(lock_path(root, product_lock_name(product_dir.name)), timeout=lock_timeout):
+            if not path.is_file() or path.read_bytes() != data:
+                atomic_write_bytes(path, data)
+                update_sidecar(product_dir, {IMAGE_QC_FILE: hashlib.sha256(data).hexdigest()})
+    return result
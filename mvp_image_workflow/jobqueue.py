@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import json
+import os
+import socket
+import sqlite3
+import time
+from contextlib import AbstractContextManager
+from dataclasses import dataclass
+from pathlib import Path
+
+from .batch import ProductRow, product_from_dict, product_to_dict
+from .generator import generate_product_package
+from .storage import LocalSink, Sink
+from .util import ValidationError
+
+# batch_id '' stands for "no batch id": NULLs never collide in a primary key.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    batch_id TEXT NOT NULL DEFAULT '',
+    product_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    out_root TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    started_at REAL,
+    finished_at REAL,
+    finished_by TEXT,
+    last_error TEXT,
+    enqueued_at REAL NOT NULL,
+    PRIMARY KEY (batch_id, product_id)
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (state, lease_expires);
+CREATE INDEX IF NOT EXISTS jobs_finished_by ON jobs (finished_by);
+"""
+
+JOB_STATES = ("pending", "leased", "done", "failed")
+
+
+class LeaseLost(RuntimeError):
+    """The job's lease expired and another worker claimed it while this one was still writing."""
+
+
+@dataclass(frozen=True)
+class Job:
+    product: ProductRow
+    out_root: str
+    batch_id: str | None
+    attempts: int
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobQueue:
+    """Product generation jobs in a SQLite table, claimed by workers under time-limited leases.
+
+    A worker that crashes simply lets its lease expire; the job becomes claimable again
+    until it has used up its attempts. Several processes (or hosts sharing the database
+    file on a filesystem with working POSIX locks) can drain one queue.
+    """
+
+    def __init__(self, path: str | Path, busy_timeout: float = 30.0) -> None:
+        self.path = Path(path)
+        self._conn = sqlite3.connect(str(self.path), timeout=busy_timeout, isolation_level=None)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> JobQueue:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def enqueue(self, products: list[ProductRow], out_root: str | Path, batch_id: str | None) -> int:
+        now = time.time()
+        rows = [
+            (batch_id or "", p.product_id, json.dumps(product_to_dict(p), sort_keys=True), str(out_root), now)
+            for p in products
+        ]
+        before = self._conn.total_changes
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Re-enqueueing is idempotent: finished jobs with identical input stay done.
+            self._conn.executemany(
+                """
+                INSERT INTO jobs (batch_id, product_id, payload, out_root, enqueued_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (batch_id, product_id) DO UPDATE SET
+                    payload = excluded.payload,
+                    out_root = excluded.out_root,
+                    state = 'pending',
+                    attempts = 0,
+                    lease_owner = NULL,
+                    lease_expires = NULL,
+                    last_error = NULL,
+                    enqueued_at = excluded.enqueued_at
+                WHERE jobs.state != 'done'
+                    OR jobs.payload != excluded.payload
+                    OR jobs.out_root != excluded.out_root
+                """,
+                rows,
+            )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        return self._conn.total_changes - before
+
+    def claim(self, worker_id: str, lease_seconds: float, max_attempts: int) -> Job | None:
+        now = time.time()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Expired leases that have no attempts left are failed rather than retried forever.
+            self._conn.execute(
+                """
+                UPDATE jobs SET state = 'failed', lease_owner = NULL,
+                    last_error = COALESCE(last_error, 'lease expired')
+                WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?
+                """,
+                (now, max_attempts),
+            )
+            row = self._conn.execute(
+                """
+                SELECT batch_id, product_id, payload, out_root, attempts FROM jobs
+                WHERE (state = 'pending' OR (state = 'leased' AND lease_expires < ?))
+                    AND attempts < ?
+                ORDER BY enqueued_at, rowid
+                LIMIT 1
+                """,
+                (now, max_attempts),
+            ).fetchone()
+            if row is None:
+                self._conn.execute("COMMIT")
+                return None
+            self._conn.execute(
+                """
+                UPDATE jobs SET state = 'leased', lease_owner = ?, lease_expires = ?,
+                    attempts = attempts + 1, started_at = ?
+                WHERE batch_id = ? AND product_id = ?
+                """,
+                (worker_id, now + lease_seconds, now, row[0], row[1]),
+            )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        return Job(
+            product=product_from_dict(json.loads(row[2])),
+            out_root=row[3],
+            batch_id=row[0] or None,
+            attempts=row[4] + 1,
+        )
+
+    def renew(self, job: Job, worker_id: str, lease_seconds: float) -> bool:
+        """Extend a lease this worker still holds; False if it has been lost."""
+        cur = self._conn.execute(
+            """
+            UPDATE jobs SET lease_expires = ?
+            WHERE batch_id = ? AND product_id = ? AND state = 'leased' AND lease_owner = ?
+            """,
+            (time.time() + lease_seconds, job.batch_id or "", job.product.product_id, worker_id),
+        )
+        return cur.rowcount == 1
+
+    def complete(self, job: Job, worker_id: str) -> bool:
+        cur = self._conn.execute(
+            """
+            UPDATE jobs SET state = 'done', lease_owner = NULL, lease_expires = NULL,
+                finished_at = ?, finished_by = ?, last_error = NULL
+            WHERE batch_id = ? AND product_id = ? AND state = 'leased' AND lease_owner = ?
+            """,
+            (time.time(), worker_id, job.batch_id or "", job.product.product_id, worker_id),
+        )
+        return cur.rowcount == 1
+
+    def fail(self, job: Job, worker_id: str, error: str, max_attempts: int) -> bool:
+        state = "failed" if job.attempts >= max_attempts else "pending"
+        cur = self._conn.execute(
+            """
+            UPDATE jobs SET state = ?, lease_owner = NULL, lease_expires = NULL, last_error = ?
+            WHERE batch_id = ? AND product_id = ? AND state = 'leased' AND lease_owner = ?
+            """,
+            (state, error, job.batch_id or "", job.product.product_id, worker_id),
+        )
+        return cur.rowcount == 1
+
+    def status(self) -> dict:
+        now = time.time()
+        counts = {state: 0 for state in JOB_STATES}
+        for state, n in self._conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state"):
+            counts[state] = n
+        expired = self._conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE state = 'leased' AND lease_expires < ?", (now,)
+        ).fetchone()[0]
+
+        workers = []
+        for worker, done, first_start, last_finish in self._conn.execute(
+            """
+            SELECT finished_by, COUNT(*), MIN(started_at), MAX(finished_at) FROM jobs
+            WHERE state = 'done' AND finished_by IS NOT NULL
+            GROUP BY finished_by ORDER BY finished_by
+            """
+        ):
+            elapsed = max(last_finish - first_start, 1e-9)
+            workers.append(
+                {"worker": worker, "done": done, "products_per_sec": round(done / elapsed, 3)}
+            )
+        return {
+            "depth": counts["pending"] + counts["leased"],
+            "states": counts,
+            "expired_leases": expired,
+            "workers": workers,
+        }
+
+
+class _LeaseSink(Sink):
+    """Renews the job's lease as files are written, so a slow product is not claimed twice."""
+
+    name = "lease"
+
+    def __init__(self, inner: Sink, queue: JobQueue, job: Job, worker_id: str, lease_seconds: float) -> None:
+        self.inner = inner
+        self.queue = queue
+        self.job = job
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self._renewed = time.monotonic()
+
+    def _heartbeat(self) -> None:
+        if time.monotonic() - self._renewed < self.lease_seconds / 3:
+            return
+        if not self.queue.renew(self.job, self.worker_id, self.lease_seconds):
+            raise LeaseLost(f"lease on '{self.job.product.product_id}' was lost to another worker")
+        self._renewed = time.monotonic()
+
+    def ensure_dir(self, rel: str) -> None:
+        self._heartbeat()
+        self.inner.ensure_dir(rel)
+
+    def write_bytes(self, rel: str, data: bytes) -> None:
+        self._heartbeat()
+        self.inner.write_bytes(rel, data)
+
+    def read_bytes(self, rel: str) -> bytes | None:
+        return self.inner.read_bytes(rel)
+
+    def exists(self, rel: str) -> bool:
+        return self.inner.exists(rel)
+
+    def lock(self, name: str) -> AbstractContextManager[None]:
+        return self.inner.lock(name)
+
+    def close(self) -> None:
+        self.inner.close()
+
+    def abort(self) -> None:
+        self.inner.abort()
+
+
+def run_worker(
+    queue: JobQueue,
+    worker_id: str,
+    lease_seconds: float = 300.0,
+    max_attempts: int = 3,
+    max_jobs: int | None = None,
+) -> tuple[int, int]:
+    done = failed = 0
+    while max_jobs is None or done + failed < max_jobs:
+        job = queue.claim(worker_id, lease_seconds, max_attempts)
+        if job is None:
+            break
+        root = Path(job.out_root)
+        sink = _LeaseSink(LocalSink(root), queue, job, worker_id, lease_seconds)
+        try:
+            if root.exists() and not root.is_dir():
+                raise ValidationError(f"Output root must be a directory: {root}")
+            generate_product_package(job.product, root, batch_id=job.batch_id, sink=sink)
+            sink.close()
+        except LeaseLost:
+            # The job now belongs to another worker; it reports the outcome.
+            failed += 1
+            continue
+        except Exception as e:
+            # One bad product must not stop the worker draining the rest of the queue.
+            queue.fail(job, worker_id, f"{type(e).__name__}: {e}", max_attempts)
+            failed += 1
+            continue
+        queue.complete(job, worker_id)
+        done += 1
+    return done, failed
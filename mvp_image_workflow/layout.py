@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+
+from .checksums import update_sidecar
+from .font import BUILTIN_FONT, BitmapFont
+from .locking import DEFAULT_LOCK_TIMEOUT, file_lock, lock_path, product_lock_name
+from .outputsets import manifest_plan
+from .storage import atomic_write_bytes
+from .util import ValidationError
+
+LAYOUT_FILE = "meta/layout.json"
+CANVAS_SIZE = 2000
+SAFE_MARGIN = 120
+INFO_BAR_FRACTION = 0.3
+BAR_PADDING = 40
+MAX_SCALE = 8
+# Below 3x the 5x7 cell (21px caps on a 2000px canvas) text stops being readable in listings.
+MIN_SCALE = 3
+
+_WORD_CACHE_LIMIT = 65536
+
+
+class FontMetrics:
+    """Advance widths of one font at one scale, with a memo of measured words."""
+
+    def __init__(self, font: BitmapFont, scale: int) -> None:
+        self.font = font
+        self.scale = scale
+        self.line_height = font.line_height * scale
+        self.glyph_height = font.glyph_height * scale
+        self._advances = {ch: w * scale for ch, w in font.advance_widths().items()}
+        # Characters outside the table are drawn as '?'.
+        self._fallback = self._advances["?"]
+        self._words: dict[str, int] = {}
+
+    def width(self, text: str) -> int:
+        width = self._words.get(text)
+        if width is None:
+            get, fallback = self._advances.get, self._fallback
+            width = sum(get(ch, fallback) for ch in text)
+            if len(self._words) >= _WORD_CACHE_LIMIT:
+                self._words.clear()
+            self._words[text] = width
+        return width
+
+
+@lru_cache(maxsize=None)
+def font_metrics(font: BitmapFont, scale: int) -> FontMetrics:
+    return FontMetrics(font, scale)
+
+
+@dataclass(frozen=True)
+class TextLayout:
+    font: str
+    scale: int
+    lines: tuple[str, ...]
+    overflow: bool = False
+    clipped_lines: int = 0
+    width: int = 0
+    height: int = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "font": self.font,
+            "scale": self.scale,
+            "lines": list(self.lines),
+            "overflow": self.overflow,
+            "clipped_lines": self.clipped_lines,
+            "width": self.width,
+            "height": self.height,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> TextLayout:
+        return cls(
+            font=data["font"],
+            scale=int(data["scale"]),
+            lines=tuple(data["lines"]),
+            overflow=bool(data.get("overflow", False)),
+            clipped_lines=int(data.get("clipped_lines", 0)),
+            width=int(data.get("width", 0)),
+            height=int(data.get("height", 0)),
+        )
+
+
+def info_box(width: int, height: int, margin: int = SAFE_MARGIN) -> tuple[int, int, int, int]:
+    """Text area of the bottom info bar, kept inside the safe margins: (x0, y0, x1, y1)."""
+    bar_top = height - round(height * INFO_BAR_FRACTION)
+    x0, x1 = margin, width - margin
+    y0, y1 = max(bar_top + BAR_PADDING, margin), height - margin
+    if x1 <= x0 or y1 <= y0:
+        raise ValidationError(f"{width}x{height} canvas leaves no room inside {margin}px margins")
+    return x0, y0, x1, y1
+
+
+def _break_word(word: str, metrics: FontMetrics, max_width: int) -> list[str]:
+    pieces: list[str] = []
+    current = ""
+    for ch in word:
+        if current and metrics.width(current + ch) > max_width:
+            pieces.append(current)
+            current = ""
+        current += ch
+    return pieces + [current]
+
+
+def _wrap(line: str, metrics: FontMetrics, max_width: int) -> list[str]:
+    if metrics.width(line) <= max_width:
+        return [line]
+    # Bullets wrap with a hanging indent so continuation lines stay under their marker.
+    indent = "  " if line.startswith("- ") else ""
+    out: list[str] = []
+    current = ""
+    for word in line.split(" "):
+        candidate = f"{current} {word}" if current else (indent + word if out else word)
+        if metrics.width(candidate) <= max_width:
+            current = candidate
+            continue
+        if current:
+            out.append(current)
+        lead = indent if out else ""
+        if metrics.width(lead + word) <= max_width:
+            current = lead + word
+        else:
+            *full, current = _break_word(lead + word, metrics, max_width)
+            out.extend(full)
+    out.append(current)
+    return out
+
+
+def _fits(lines: int, metrics: FontMetrics, box_h: int) -> bool:
+    # The last line needs only the glyph height, not the full line pitch.
+    return lines == 0 or (lines - 1) * metrics.line_height + metrics.glyph_height <= box_h
+
+
+def layout_text(text: str, box_w: int, box_h: int, font: BitmapFont = BUILTIN_FONT) -> TextLayout:
+    """Wrap `text` to the box at the largest scale that fits; clip at the minimum scale otherwise."""
+    paragraphs = text.rstrip("\n").split("\n")
+    for scale in range(MAX_SCALE, MIN_SCALE - 1, -1):
+        metrics = font_metrics(font, scale)
+        lines = [piece for p in paragraphs for piece in _wrap(p, metrics, box_w)]
+        if _fits(len(lines), metrics, box_h):
+            clipped = 0
+            break
+    else:
+        room = 0 if box_h < metrics.glyph_height else (box_h - metrics.glyph_height) // metrics.line_height + 1
+        clipped = len(lines) - room
+        lines = lines[:room]
+    return TextLayout(
+        font=font.name,
+        scale=scale,
+        lines=tuple(lines),
+        overflow=clipped > 0,
+        clipped_lines=clipped,
+        width=max((metrics.width(line) for line in lines), default=0),
+        height=(len(lines) - 1) * metrics.line_height + metrics.glyph_height if lines else 0,
+    )
+
+
+def layout_package(product_dir: Path, canvas: int = CANVAS_SIZE, font: BitmapFont = BUILTIN_FONT) -> dict:
+    """Layouts of every text overlay source of a package on a square canvas."""
+    x0, y0, x1, y1 = info_box(canvas, canvas)
+    manifest_path = product_dir / "manifest.json"
+    try:
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        raise ValidationError(f"Missing required file: {manifest_path}") from None
+    except json.JSONDecodeError as e:
+        raise ValidationError(f"Invalid JSON in {manifest_path}: {e}") from None
+    texts: dict[str, dict] = {}
+    for text_source, _builder in manifest_plan(manifest).texts:
+        path = product_dir / text_source
+        try:
+            raw = path.read_bytes()
+        except FileNotFoundError:
+            raise ValidationError(f"Missing required file: {path}") from None
+        layout = layout_text(raw.decode("utf-8"), x1 - x0, y1 - y0, font)
+        texts[text_source] = {"text_sha256": hashlib.sha256(raw).hexdigest(), **layout.to_dict()}
+    return {"canvas": [canvas, canvas], "margin": SAFE_MARGIN, "box": [x0, y0, x1, y1], "texts": texts}
+
+
+@dataclass
+class LayoutResult:
+    products: int = 0
+    texts: int = 0
+    written: int = 0
+    # "<product>/<text source>" entries that do not fit even at the minimum scale.
+    overflows: list[str] = field(default_factory=list)
+
+
+def layout_packages(
+    out_root: str | Path,
+    product_dirs: list[Path],
+    canvas: int = CANVAS_SIZE,
+    lock_timeout: float = DEFAULT_LOCK_TIMEOUT,
+) -> LayoutResult:
+    """Write meta/layout.json for each package; unchanged layouts are not rewritten."""
+    root = Path(out_root)
+    result = LayoutResult()
+    for product_dir in product_dirs:
+        with file_lock(lock_path(root, product_lock_name(product_dir.name)), timeout=lock_timeout):
+            doc = layout_package(product_dir, canvas)
+            data = (json.dumps(doc, indent=2, sort_keys=True) + "\n").encode("utf-8")
+            path = product_dir / LAYOUT_FILE
+            if not path.is_file() or path.read_bytes() != data:
+                atomic_write_bytes(path, data)
+                update_sidecar(product_dir, {LAYOUT_FILE: hashlib.sha256(data).hexdigest()})
+                result.written += 1
+        result.products += 1
+        result.texts += len(doc["texts"])
+        result.overflows.extend(
+            f"{product_dir.name}/{source} ({entry['clipped_lines']} line(s) clipped)"
+            for source, entry in doc["texts"].items()
+            if entry["overflow"]
+        )
+    return result
+
+
+def planned_layout(
+    doc: dict, text_source: str, text_sha256: str, width: int, height: int, font: BitmapFont = BUILTIN_FONT
+) -> TextLayout | None:
+    """The precomputed layout for this text and canvas, if meta/layout.json still matches them."""
+    entry = (doc.get("texts") or {}).get(text_source)
+    if (
+        not isinstance(entry, dict)
+        or doc.get("canvas") != [width, height]
+        or doc.get("margin") != SAFE_MARGIN
+        or entry.get("text_sha256") != text_sha256
+        or entry.get("font") != font.name
+    ):
+        return None
+    try:
+        return TextLayout.from_dict(entry)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def load_layouts(product_dir: Path) -> dict:
+    """meta/layout.json of a package, or an empty document when none was written."""
+    path = product_dir / LAYOUT_FILE
+    try:
+        doc = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+    except json.JSONDecodeError as e:
+        raise ValidationError(f"Invalid JSON in {path}: {e}") from None
+    return doc if isinstance(doc, dict) else {}
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import errno
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms only get in-process locking
+    fcntl = None  # type: ignore[assignment]
+
+LOCK_DIR_ENV = "MVP_LOCK_DIR"
+ROOT_LOCK = "root"
+DEFAULT_LOCK_TIMEOUT = 60.0
+
+# POSIX record locks are per process, so threads of one process also need a local lock.
+_process_locks: dict[str, threading.Lock] = {}
+_process_locks_guard = threading.Lock()
+
+
+def state_dir(out_root: str | Path) -> Path:
+    """Run state of an output root (locks, journals, caches): the sibling `<root>.state/`.
+
+    Kept next to the root rather than in it, so it never ships with the packages, and on the same
+    filesystem, so runs on several hosts sharing the root see the same state whatever path the
+    root is mounted at.
+    """
+    root = Path(os.path.realpath(out_root))
+    return root.with_name(f"{root.name}.state")
+
+
+def locks_dir(out_root: str | Path) -> Path:
+    """Lock folder for an output root, under its state folder unless MVP_LOCK_DIR moves it.
+
+    MVP_LOCK_DIR (keyed by the root's real path) is for roots whose parent is not writable.
+    """
+    base = os.environ.get(LOCK_DIR_ENV)
+    if base:
+        root = os.path.realpath(out_root)
+        return Path(base) / hashlib.sha256(root.encode("utf-8")).hexdigest()[:16]
+    return state_dir(out_root) / "locks"
+
+
+def lock_path(out_root: str | Path, name: str) -> Path:
+    return locks_dir(out_root) / f"{name}.lock"
+
+
+def product_lock_name(safe_product_id: str) -> str:
+    return f"product-{safe_product_id}"
+
+
+@contextmanager
+def file_lock(path: Path, timeout: float = DEFAULT_LOCK_TIMEOUT, poll_interval: float = 0.05) -> Iterator[None]:
+    """Exclusive advisory lock (fcntl.lockf, so it also works on NFS with lockd) with a timeout."""
+    key = os.path.abspath(path)
+    with _process_locks_guard:
+        local = _process_locks.setdefault(key, threading.Lock())
+    deadline = time.monotonic() + timeout
+    if not local.acquire(timeout=max(timeout, 0.0)):
+        raise TimeoutError(f"Timed out after {timeout}s waiting for lock: {path}")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                while True:
+                    try:
+                        fcntl.lockf(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except OSError as e:
+                        if e.errno not in (errno.EACCES, errno.EAGAIN):
+                            raise
+                        if time.monotonic() >= deadline:
+                            raise TimeoutError(f"Timed out after {timeout}s waiting for lock: {path}") from None
+                        time.sleep(poll_interval)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.lockf(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+    finally:
+        local.release()
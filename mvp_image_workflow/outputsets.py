@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable
+
+from .batch import DEFAULT_OUTPUT_SET, ProductRow
+from .util import ValidationError, safe_id
+
+OUTPUT_SETS_FILE = Path(__file__).with_name("output_sets.json")
+PACKAGE_DIRS = ("source", "prompts", "texts", "meta")
+
+_CM_PER_INCH = 2.54
+
+
+def dimensions_line(product: ProductRow) -> str | None:
+    if not (product.dimensions_l and product.dimensions_w and product.dimensions_h):
+        return None
+    return f"Dimensions: {product.dimensions_l} x {product.dimensions_w} x {product.dimensions_h} {product.units}"
+
+
+def _spec_dimensions(product: ProductRow) -> list[str]:
+    lines = [product.product_name_en]
+    dims = dimensions_line(product)
+    if dims:
+        lines.append(dims)
+    lines.extend(f"- {s}" for s in product.specs)
+    return lines
+
+
+def _spec_list(product: ProductRow) -> list[str]:
+    return ["Key Specs", "", *(f"- {s}" for s in product.specs)]
+
+
+def _howto_steps(product: ProductRow) -> list[str]:
+    return [product.howto_title, "", *(f"Step {i+1}: {s}" for i, s in enumerate(product.steps))]
+
+
+def _howto_tips(product: ProductRow) -> list[str]:
+    lines = ["Tips", ""]
+    if product.tips:
+        lines.extend(f"- {t}" for t in product.tips)
+    else:
+        lines.append("- (Optional) Add 2-4 short English tips.")
+    return lines
+
+
+def _size_chart(product: ProductRow) -> list[str]:
+    lines = ["Size Chart", ""]
+    measures = [
+        (label, value)
+        for label, value in (
+            ("Length", product.dimensions_l),
+            ("Width", product.dimensions_w),
+            ("Height", product.dimensions_h),
+        )
+        if value
+    ]
+    if not measures:
+        lines.append("- (Required) Add dimensions_l/w/h to the catalog row.")
+        return lines
+    other = "in" if product.units == "cm" else "cm"
+    factor = 1 / _CM_PER_INCH if product.units == "cm" else _CM_PER_INCH
+    for label, value in measures:
+        try:
+            converted = f" ({float(value) * factor:.1f} {other})"
+        except ValueError:
+            converted = ""
+        lines.append(f"- {label}: {value} {product.units}{converted}")
+    return lines
+
+
+# Text builders turn catalog fields into overlay text; output sets refer to them by name.
+TEXT_BUILDERS: dict[str, Callable[[ProductRow], list[str]]] = {
+    "spec_dimensions": _spec_dimensions,
+    "spec_list": _spec_list,
+    "howto_steps": _howto_steps,
+    "howto_tips": _howto_tips,
+    "size_chart": _size_chart,
+}
+
+
+@dataclass(frozen=True)
+class Shot:
+    category: str
+    index: int  # 1-based position within the category
+    prompt_file: str  # file name under prompts/
+    text_source: str | None  # path relative to the package, e.g. "texts/spec_01.txt"
+    text_builder: str | None
+    # Everything after the per-product constraints: category preamble, text source note, shot lines.
+    prompt_body: tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class OutputPlan:
+    name: str
+    description: str
+    shots: tuple[Shot, ...]
+    categories: tuple[str, ...]
+    counts: tuple[tuple[str, int], ...]
+    # (text source, builder) pairs, each written once even when several shots share it.
+    texts: tuple[tuple[str, str], ...]
+
+    def expected_outputs(self, prefix: str, suffix: str = "") -> dict[str, list[str]]:
+        expected: dict[str, list[str]] = {c: [] for c in self.categories}
+        for shot in self.shots:
+            expected[shot.category].append(f"{prefix}_{shot.category}_{shot.index:02d}{suffix}.png")
+        return expected
+
+    def required_files(self) -> list[str]:
+        """Prompt and text files every package of this set carries, relative to the package."""
+        return [f"prompts/{s.prompt_file}" for s in self.shots] + [source for source, _b in self.texts]
+
+
+def _compile(name: str, spec: dict, categories: dict) -> OutputPlan:
+    where = f"{OUTPUT_SETS_FILE.name}: output set '{name}'"
+    raw_shots = spec.get("shots")
+    if not isinstance(raw_shots, list) or not raw_shots:
+        raise ValidationError(f"{where} needs a non-empty 'shots' list")
+    shots: list[Shot] = []
+    position: dict[str, int] = {}
+    prompts: set[str] = set()
+    texts: dict[str, str] = {}
+    for n, raw in enumerate(raw_shots, start=1):
+        category = raw.get("category")
+        if category not in categories:
+            raise ValidationError(f"{where}, shot {n}: unknown category '{category}'")
+        prompt = raw.get("prompt")
+        if not isinstance(prompt, str) or safe_id(prompt.removesuffix(".txt")) + ".txt" != prompt:
+            raise ValidationError(f"{where}, shot {n}: 'prompt' must be a safe '<name>.txt' file name")
+        if prompt in prompts:
+            raise ValidationError(f"{where}, shot {n}: prompt file '{prompt}' is used twice")
+        prompts.add(prompt)
+        body = list(categories[category].get("preamble") or [])
+        text_source = builder = None
+        if raw.get("text") is not None:
+            text = raw["text"]
+            builder = raw.get("text_builder")
+            if not isinstance(text, str) or safe_id(text.removesuffix(".txt")) + ".txt" != text:
+                raise ValidationError(f"{where}, shot {n}: 'text' must be a safe '<name>.txt' file name")
+            if builder not in TEXT_BUILDERS:
+                raise ValidationError(
+                    f"{where}, shot {n}: unknown text_builder '{builder}'; choose from {', '.join(TEXT_BUILDERS)}"
+                )
+            text_source = f"texts/{text}"
+            if texts.setdefault(text_source, builder) != builder:
+                raise ValidationError(f"{where}, shot {n}: '{text}' is built by two different text builders")
+            body += ["", f"TEXT SOURCE (for later overlay): {text_source}"]
+        body += list(raw.get("lines") or [])
+        position[category] = position.get(category, 0) + 1
+        shots.append(Shot(category, position[category], prompt, text_source, builder, tuple(body)))
+    return OutputPlan(
+        name=name,
+        description=spec.get("description", ""),
+        shots=tuple(shots),
+        categories=tuple(position),
+        counts=tuple(position.items()),
+        texts=tuple(texts.items()),
+    )
+
+
+@lru_cache(maxsize=None)
+def _load(path: Path) -> dict[str, OutputPlan]:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        raise ValidationError(f"Missing output set definitions: {path}") from None
+    except json.JSONDecodeError as e:
+        raise ValidationError(f"Invalid JSON in {path}: {e}") from None
+    categories = data.get("categories") or {}
+    for category in categories:
+        # Categories become package folders next to the fixed ones.
+        if safe_id(category) != category or category in PACKAGE_DIRS:
+            raise ValidationError(f"{path.name}: '{category}' cannot be used as a category folder")
+    return {name: _compile(name, spec, categories) for name, spec in (data.get("output_sets") or {}).items()}
+
+
+def output_set_names() -> tuple[str, ...]:
+    return tuple(_load(OUTPUT_SETS_FILE))
+
+
+def output_plan(name: str | None = None) -> OutputPlan:
+    """The compiled plan of an output set (the default set when `name` is None)."""
+    plans = _load(OUTPUT_SETS_FILE)
+    key = name or DEFAULT_OUTPUT_SET
+    try:
+        return plans[key]
+    except KeyError:
+        raise ValidationError(f"Unsupported output_set '{key}' (supported: {', '.join(plans)})") from None
+
+
+def manifest_plan(manifest: dict) -> OutputPlan:
+    """The plan a generated package was written with, from its manifest.json."""
+    product = manifest.get("product")
+    return output_plan(product.get("output_set") if isinstance(product, dict) else None)
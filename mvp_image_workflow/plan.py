@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+from contextlib import AbstractContextManager, nullcontext
+from pathlib import Path
+
+from .changes import CHANGE_LOG_NAME, load_change_index
+from .storage import LocalSink, Sink
+from .util import ValidationError
+
+PLAN_STATUSES = ("create", "update", "unchanged", "conflict")
+
+
+class ArchiveReader(Sink):
+    """Read-only view of an existing .zip output, for comparing a plan against it."""
+
+    name = "archive-reader"
+
+    def __init__(self, path: str | Path) -> None:
+        import zipfile
+
+        self._zip = zipfile.ZipFile(path) if Path(path).is_file() else None
+        self._names = set(self._zip.namelist()) if self._zip is not None else set()
+
+    def names(self) -> set[str]:
+        return self._names
+
+    def read_bytes(self, rel: str) -> bytes | None:
+        return self._zip.read(rel) if rel in self._names else None
+
+    def close(self) -> None:
+        if self._zip is not None:
+            self._zip.close()
+
+
+class PlanSink(Sink):
+    """Takes a run's writes in memory and classifies each against what the output root already holds.
+
+    Nothing reaches the output root: reads see this run's own writes first, then the existing
+    files. With an `index` (the root's changes.json) files are compared by size and sha256
+    from the index instead of being read back, which is what makes remote roots affordable;
+    files the index does not list are still read from the root.
+    """
+
+    name = "plan"
+
+    def __init__(self, base: Sink, index: dict[str, dict[str, dict]] | None = None) -> None:
+        self.base = base
+        self.index = index
+        self._pending: dict[str, bytes] = {}
+        self._files: dict[str, dict[str, dict]] = {}
+        self._lock = threading.Lock()
+
+    def ensure_dir(self, rel: str) -> None:
+        pass
+
+    def lock(self, name: str) -> AbstractContextManager[None]:
+        return nullcontext()
+
+    def read_bytes(self, rel: str) -> bytes | None:
+        with self._lock:
+            data = self._pending.get(rel)
+        return data if data is not None else self.base.read_bytes(rel)
+
+    def exists(self, rel: str) -> bool:
+        with self._lock:
+            if rel in self._pending:
+                return True
+        return self.base.exists(rel)
+
+    def _existing(self, product: str, file_rel: str) -> tuple[int, str] | None:
+        if self.index is not None:
+            info = self.index.get(product, {}).get(file_rel)
+            if info:
+                return info["size"], info["sha256"]
+            # Unlisted files (written before the change log, or by other tools) may still exist.
+        data = self.base.read_bytes(f"{product}/{file_rel}")
+        return (len(data), hashlib.sha256(data).hexdigest()) if data is not None else None
+
+    def write_bytes(self, rel: str, data: bytes) -> None:
+        product, _, file_rel = rel.partition("/")
+        with self._lock:
+            self._pending[rel] = data
+        if not file_rel:
+            return  # root-level bookkeeping (change log, run ledger) is not part of a package
+        existing = self._existing(product, file_rel)
+        if existing is None:
+            status = "create"
+        elif existing == (len(data), hashlib.sha256(data).hexdigest()):
+            status = "unchanged"
+        else:
+            status = "update"
+        with self._lock:
+            self._files.setdefault(product, {})[file_rel] = {"status": status, "size": len(data)}
+
+    def discard(self, product: str) -> None:
+        """Forget a product whose generation failed part-way."""
+        with self._lock:
+            self._files.pop(product, None)
+            for rel in [r for r in self._pending if r.startswith(f"{product}/")]:
+                del self._pending[rel]
+
+    def product_plan(self, product: str) -> dict:
+        files = self._files.get(product, {})
+        statuses = {f["status"] for f in files.values()}
+        if statuses <= {"create"}:
+            status = "create"
+        elif statuses == {"unchanged"}:
+            status = "unchanged"
+        else:
+            status = "update"
+        return {
+            "status": status,
+            "bytes_to_write": sum(f["size"] for f in files.values() if f["status"] != "unchanged"),
+            "files": dict(sorted(files.items())),
+        }
+
+    def close(self) -> None:
+        self.base.close()
+
+    def abort(self) -> None:
+        self.base.abort()
+
+
+def open_plan_base(out: str, endpoint_url: str | None = None) -> tuple[Sink, dict | None, set[str]]:
+    """(reader, changes.json index or None, existing top-level names) of an output root, without writing."""
+    if out.startswith("s3://"):
+        from .storage import open_sink
+
+        sink = open_sink(out, endpoint_url=endpoint_url)
+        # One GET for the index instead of one per file; without an index every file is fetched.
+        index = load_change_index(sink) if sink.read_bytes(CHANGE_LOG_NAME) is not None else None
+        return sink, index, set(index or ())
+    path = Path(out)
+    if path.suffix.lower() == ".zip":
+        if path.exists() and not path.is_file():
+            raise ValidationError(f"Archive output must be a file: {path}")
+        reader = ArchiveReader(path)
+        return reader, None, {name.split("/", 1)[0] for name in reader.names()}
+    if path.exists() and not path.is_dir():
+        raise ValidationError(f"Output root must be a directory: {path}")
+    names = {p.name for p in path.iterdir()} if path.is_dir() else set()
+    return LocalSink(path), None, names
+
+
+def case_conflicts(product_ids: list[str], existing: set[str]) -> dict[str, str]:
+    """Product ids that share a folder on case-insensitive filesystems (SMB/NTFS/APFS shares)."""
+    by_key: dict[str, list[str]] = {}
+    for name in [*product_ids, *sorted(existing)]:
+        group = by_key.setdefault(name.casefold(), [])
+        if name not in group:
+            group.append(name)
+    conflicts = {}
+    for pid in product_ids:
+        others = [n for n in by_key[pid.casefold()] if n != pid]
+        if others:
+            conflicts[pid] = f"folder name differs only in case from {', '.join(repr(o) for o in others)}"
+    return conflicts
+
+
+def summarize_plan(products: dict[str, dict]) -> dict:
+    summary = {
+        "products": {status: 0 for status in PLAN_STATUSES},
+        "files": {status: 0 for status in PLAN_STATUSES[:3]},
+        "bytes_to_write": 0,
+        "bytes_unchanged": 0,
+    }
+    for entry in products.values():
+        summary["products"][entry["status"]] += 1
+        for info in entry.get("files", {}).values():
+            summary["files"][info["status"]] += 1
+            key = "bytes_unchanged" if info["status"] == "unchanged" else "bytes_to_write"
+            summary[key] += info["size"]
+    return summary
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import struct
+import zlib
+from collections.abc import Iterator
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_INFLATE_INPUT = 64 * 1024
+
+
+def _chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+
+def encode_png(width: int, height: int, pixels: bytes, level: int = 6) -> bytes:
+    """Encode 8-bit RGB pixels (row-major, no padding) as a PNG without row filters."""
+    stride = width * 3
+    if len(pixels) != stride * height:
+        raise ValueError(f"expected {stride * height} bytes of RGB pixels, got {len(pixels)}")
+    view = memoryview(pixels)
+    raw = b"".join(b"\x00" + view[y * stride:(y + 1) * stride] for y in range(height))
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (
+        PNG_SIGNATURE
+        + _chunk(b"IHDR", header)
+        + _chunk(b"IDAT", zlib.compress(raw, level))
+        + _chunk(b"IEND", b"")
+    )
+
+
+def png_dimensions(data: bytes) -> tuple[int, int]:
+    """(width, height) from the IHDR chunk, without decoding pixels."""
+    if not data.startswith(PNG_SIGNATURE) or data[12:16] != b"IHDR":
+        raise ValueError("not a PNG file")
+    width, height = struct.unpack(">II", data[16:24])
+    return width, height
+
+
+def _add_bytes(x: int, y: int, low: int, high: int) -> int:
+    """Bytewise (x + y) mod 256 of two byte strings held as little-endian ints, without carries."""
+    return ((x & low) + (y & low)) ^ ((x ^ y) & high)
+
+
+def _unfilter_row(ftype: int, line: bytearray, prev: bytes, bpp: int) -> bytearray:
+    """None, Sub and Up for a whole row at once, as big-int arithmetic."""
+    if ftype == 0:
+        return line
+    size = len(line)
+    low = int.from_bytes(b"\x7f" * size, "little")
+    high = int.from_bytes(b"\x80" * size, "little")
+    x = int.from_bytes(line, "little")
+    if ftype == 2:
+        x = _add_bytes(x, int.from_bytes(prev, "little"), low, high)
+    else:
+        # Sub is a running sum per channel: add the row to itself shifted by 1, 2, 4, ... pixels.
+        shift = 8 * bpp
+        while shift < 8 * size:
+            x = _add_bytes(x, x << shift, low, high)
+            shift <<= 1
+    return bytearray(x.to_bytes(size, "little"))
+
+
+def _absdiff_lanes(x: int, y: int, one: int, bias: int) -> int:
+    # Per 16-bit lane: max(x, y) - min(x, y), which never borrows from the next lane.
+    swap = (x ^ y) & (((x + bias - y) >> 10) & one) * 0xFFFF
+    return (y ^ swap) - (x ^ swap)
+
+
+def _paeth_lanes(a: int, b: int, c: int, one: int, bias: int) -> int:
+    """The Paeth predictor of every 16-bit lane of a (left), b (up) and c (up-left) at once."""
+    pa = _absdiff_lanes(b, c, one, bias)
+    pb = _absdiff_lanes(a, c, one, bias)
+    pc = _absdiff_lanes(a + b, c + c, one, bias)
+    pick_a = ((pb + bias - pa) >> 10) & ((pc + bias - pa) >> 10) & one
+    pick_b = ((pc + bias - pb) >> 10) & ~pick_a & one
+    return c ^ ((a ^ c) & pick_a * 0xFFFF) ^ ((b ^ c) & pick_b * 0xFFFF)
+
+
+def _unfilter_diagonals(prev: bytes, lines: list[bytearray], ftypes: bytes, bpp: int) -> list[bytearray]:
+    """Unfilter rows that include Average or Paeth, which depend on the byte to their left.
+
+    Pixel (x, y) only needs (x-1, y), (x, y-1) and (x-1, y-1), all on the previous
+    anti-diagonal. The rows are copied into a buffer where every anti-diagonal is contiguous,
+    one byte per 16-bit lane, so a whole diagonal is unfiltered at once as one big int.
+    """
+    stride = len(prev)
+    width = stride // bpp
+    rows = len(lines) + 1  # row 0 is the previous, already unfiltered row
+    diag = 2 * rows * bpp
+    up = 2 * bpp
+    # Pixel (x, y) sits on diagonal x + y + 1. Diagonal 0 and the x == -1 slots are never
+    # written, so they read as the zero neighbours left of column 0.
+    buf = bytearray(diag * (width + rows))
+    for y, line in enumerate((prev, *lines)):
+        origin = diag * (y + 1) + up * y
+        for ch in range(bpp):
+            buf[origin + 2 * ch:origin + 2 * ch + diag * (width - 1) + 1:diag] = line[ch::bpp]
+    one = int.from_bytes(b"\x01\x00" * rows * bpp, "little")
+    low = one * 0xFF
+    bias = one * 0x400
+    types = set(ftypes)
+    masks = {
+        t: b"\x00\x00" * bpp + b"".join((b"\xff\xff" if f == t else b"\x00\x00") * bpp for f in ftypes)
+        for t in types
+    }
+    for k in range(2, width + rows):
+        lo = up * max(1, k - width)
+        hi = up * min(rows, k)
+        start, end = diag * k + lo, diag * k + hi
+        a = int.from_bytes(buf[start - diag:end - diag], "little")
+        b = int.from_bytes(buf[start - diag - up:end - diag - up], "little")
+        c = int.from_bytes(buf[start - 2 * diag - up:end - 2 * diag - up], "little")
+        preds = {0: 0, 1: a, 2: b}
+        if 3 in types:
+            preds[3] = ((a + b) >> 1) & low
+        if 4 in types:
+            preds[4] = _paeth_lanes(a, b, c, one, bias)
+        if len(types) == 1:
+            pred = preds[ftypes[0]]
+        else:
+            pred = 0
+            for t in types:
+                pred |= preds[t] & int.from_bytes(masks[t][lo:hi], "little")
+        r = int.from_bytes(buf[start:end], "little")
+        buf[start:end] = ((r + pred) & low).to_bytes(end - start, "little")
+    out = []
+    for y in range(1, rows):
+        origin = diag * (y + 1) + up * y
+        line = bytearray(stride)
+        for ch in range(bpp):
+            line[ch::bpp] = buf[origin + 2 * ch:origin + 2 * ch + diag * (width - 1) + 1:diag]
+        out.append(line)
+    return out
+
+
+def _unfilter_rows(prev: bytes, lines: list[bytearray], ftypes: bytes, bpp: int) -> list[bytearray]:
+    if max(ftypes) > 2 and prev:
+        return _unfilter_diagonals(prev, lines, ftypes, bpp)
+    out = []
+    for ftype, line in zip(ftypes, lines):
+        prev = _unfilter_row(ftype, line, prev, bpp)
+        out.append(prev)
+    return out
+
+
+def _to_rgb(pixels: bytearray, bpp: int) -> bytearray:
+    if bpp == 3:
+        return pixels
+    rgb = bytearray(len(pixels) // bpp * 3)
+    if bpp in (1, 2):
+        grey = pixels[::bpp]
+        rgb[0::3] = grey
+        rgb[1::3] = grey
+        rgb[2::3] = grey
+    else:
+        # Alpha is dropped; backgrounds are expected to be opaque.
+        rgb[0::3] = pixels[0::4]
+        rgb[1::3] = pixels[1::4]
+        rgb[2::3] = pixels[2::4]
+    return rgb
+
+
+def iter_png_rows(data: bytes, chunk_rows: int = 64) -> Iterator[tuple[int, bytearray]]:
+    """Yield (first row, packed RGB rows) chunks of a non-interlaced 8-bit grey/RGB/RGBA PNG.
+
+    Only one chunk of rows is unpacked at a time, so memory stays bounded for large images.
+    """
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError("not a PNG file")
+    view = memoryview(data)
+    pos = len(PNG_SIGNATURE)
+    width = height = color_type = 0
+    idat: list[memoryview] = []
+    while pos < len(data):
+        (length,) = struct.unpack(">I", view[pos:pos + 4])
+        kind = bytes(view[pos + 4:pos + 8])
+        body = view[pos + 8:pos + 8 + length]
+        pos += 12 + length
+        if kind == b"IHDR":
+            width, height, depth, color_type, _comp, _filt, interlace = struct.unpack(">IIBBBBB", body)
+            if depth != 8 or interlace or color_type not in (0, 2, 4, 6):
+                raise ValueError("only non-interlaced 8-bit grey/RGB/RGBA PNGs are supported")
+        elif kind == b"IDAT":
+            # Feed zlib bounded pieces: each call copies its unconsumed input into a new tail.
+            idat.extend(body[i:i + _INFLATE_INPUT] for i in range(0, len(body), _INFLATE_INPUT))
+        elif kind == b"IEND":
+            break
+    bpp = {0: 1, 2: 3, 4: 2, 6: 4}[color_type]
+    stride = width * bpp
+    inflater = zlib.decompressobj()
+    parts = iter(idat)
+    tail: bytes | memoryview = b""
+    prev = bytes(stride)
+    lines: list[bytearray] = []
+    ftypes = bytearray()
+    first = 0
+    for y in range(height):
+        pending = bytearray()
+        # Inflate exactly one filtered row at a time instead of the whole image.
+        while len(pending) < stride + 1:
+            if not tail:
+                # zlib may still hold output for input it has already consumed.
+                out = inflater.decompress(b"", stride + 1 - len(pending))
+                if out:
+                    pending += out
+                    continue
+                tail = next(parts, b"")
+                if not tail or inflater.eof:
+                    raise ValueError("truncated PNG image data")
+            pending += inflater.decompress(tail, stride + 1 - len(pending))
+            tail = inflater.unconsumed_tail
+        if pending[0] > 4:
+            raise ValueError(f"unsupported PNG filter type {pending[0]}")
+        ftypes.append(pending[0])
+        lines.append(pending[1:])
+        if len(lines) == chunk_rows or y + 1 == height:
+            # Rows are unfiltered a chunk at a time, which lets Average/Paeth work across rows.
+            lines = _unfilter_rows(prev, lines, ftypes, bpp)
+            prev = lines[-1]
+            yield first, _to_rgb(bytearray().join(lines), bpp)
+            lines = []
+            ftypes = bytearray()
+            first = y + 1
+
+
+def decode_png(data: bytes) -> tuple[int, int, bytearray]:
+    """Decode a non-interlaced 8-bit grey/RGB/RGBA PNG to (width, height, packed RGB pixels)."""
+    pixels = bytearray()
+    for _first, rows in iter_png_rows(data):
+        pixels += rows
+    width, height = png_dimensions(data)
+    return width, height, pixels
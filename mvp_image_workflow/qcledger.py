@@ -0,0 +1,406 @@
+from __future__ import annotations
+
+import csv
+import json
+import os
+import sqlite3
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from .generator import QC_REJECT_TAGS
+from .io_csv import PRODUCT_CSV_FIELDS, iter_products_csv, product_to_csv_row
+from .util import ValidationError, safe_id
+
+VERDICTS = ("pass", "reject")
+GROUP_BY = ("style_pack", "batch_id", "product_id", "tag", "reviewer")
+REVIEW_CSV_FIELDS = ("product_id", "verdict", "tags", "reviewer", "note", "reviewed_at")
+
+# Tags are copied next to the review's dimensions so "rejects with tag X in batch Y" is a
+# single index range scan instead of a join over every review of the batch.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reviews (
+    id INTEGER PRIMARY KEY,
+    product_id TEXT NOT NULL,
+    batch_id TEXT,
+    style_pack TEXT NOT NULL,
+    verdict TEXT NOT NULL CHECK (verdict IN ('pass', 'reject')),
+    reviewer TEXT,
+    note TEXT,
+    reviewed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS review_tags (
+    review_id INTEGER NOT NULL REFERENCES reviews (id),
+    tag TEXT NOT NULL,
+    product_id TEXT NOT NULL,
+    batch_id TEXT,
+    style_pack TEXT NOT NULL,
+    reviewed_at REAL NOT NULL,
+    PRIMARY KEY (review_id, tag)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS product_status (
+    product_id TEXT PRIMARY KEY,
+    review_id INTEGER NOT NULL,
+    batch_id TEXT,
+    style_pack TEXT NOT NULL,
+    verdict TEXT NOT NULL,
+    reviewed_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS reviews_style_pack ON reviews (style_pack, reviewed_at, verdict);
+CREATE INDEX IF NOT EXISTS reviews_batch ON reviews (batch_id, reviewed_at, verdict);
+CREATE INDEX IF NOT EXISTS product_status_verdict ON product_status (verdict, batch_id, style_pack);
+CREATE INDEX IF NOT EXISTS review_tags_tag ON review_tags (tag, batch_id, reviewed_at);
+CREATE INDEX IF NOT EXISTS review_tags_style_pack ON review_tags (style_pack, tag, reviewed_at);
+"""
+
+
+@dataclass(frozen=True)
+class Review:
+    product_id: str
+    batch_id: str | None
+    style_pack: str
+    verdict: str
+    tags: tuple[str, ...] = ()
+    reviewer: str | None = None
+    note: str | None = None
+    reviewed_at: float = 0.0
+
+
+@dataclass(frozen=True)
+class RejectRate:
+    key: str | None
+    reviews: int
+    rejects: int
+
+    @property
+    def rate(self) -> float:
+        return self.rejects / self.reviews if self.reviews else 0.0
+
+
+@dataclass(frozen=True)
+class RejectRecord:
+    product_id: str
+    batch_id: str | None
+    style_pack: str
+    tags: tuple[str, ...]
+    reviewer: str | None
+    note: str | None
+    reviewed_at: float
+
+
+def parse_review_time(raw: str) -> float:
+    """ISO date or datetime (naive values are UTC) as epoch seconds."""
+    try:
+        value = datetime.fromisoformat(raw.strip())
+    except ValueError:
+        raise ValidationError(f"Invalid date/time '{raw}'; use YYYY-MM-DD or an ISO 8601 timestamp") from None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class _PackageInfo:
+    """batch_id, style_pack and allowed reject tags per package, read once per product."""
+
+    def __init__(self, out_root: Path) -> None:
+        self.out_root = out_root
+        self._seen: dict[str, tuple[str | None, str, frozenset[str]]] = {}
+
+    def get(self, product_id: str) -> tuple[str | None, str, frozenset[str]]:
+        info = self._seen.get(product_id)
+        if info is not None:
+            return info
+        sid = safe_id(product_id)
+        if not sid or sid != product_id:
+            raise ValidationError("product_id contains unsafe characters; allowed: letters, numbers, '-' and '_'")
+        product_dir = self.out_root / sid
+        path = product_dir / "manifest.json"
+        try:
+            manifest = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            raise ValidationError(f"No generated package for '{product_id}' under {self.out_root}") from None
+        except json.JSONDecodeError as e:
+            raise ValidationError(f"Invalid JSON in {path}: {e}") from None
+        try:
+            checklist = json.loads((product_dir / "meta" / "qc_checklist.json").read_text(encoding="utf-8"))
+            tags = frozenset(checklist.get("reject_tags") or QC_REJECT_TAGS)
+        except (FileNotFoundError, json.JSONDecodeError):
+            tags = frozenset(QC_REJECT_TAGS)
+        info = (manifest.get("batch_id"), manifest["product"]["style_pack"], tags)
+        self._seen[product_id] = info
+        return info
+
+
+def _review(
+    packages: _PackageInfo,
+    product_id: str,
+    verdict: str,
+    tags: Iterable[str],
+    reviewer: str | None,
+    note: str | None,
+    reviewed_at: float,
+) -> Review:
+    verdict = verdict.strip().lower()
+    if verdict not in VERDICTS:
+        raise ValidationError(f"Verdict must be one of {', '.join(VERDICTS)}, got '{verdict}'")
+    tags = tuple(sorted({t.strip() for t in tags if t.strip()}))
+    batch_id, style_pack, allowed = packages.get(product_id.strip())
+    if verdict == "reject" and not tags:
+        raise ValidationError(f"Reject of '{product_id}' needs at least one reject tag")
+    if verdict == "pass" and tags:
+        raise ValidationError(f"Pass of '{product_id}' cannot carry reject tags")
+    unknown = [t for t in tags if t not in allowed]
+    if unknown:
+        raise ValidationError(
+            f"Unknown reject tag(s) for '{product_id}': {', '.join(unknown)}; "
+            f"qc_checklist.json allows {', '.join(sorted(allowed))}"
+        )
+    return Review(product_id.strip(), batch_id, style_pack, verdict, tags, reviewer or None, note or None, reviewed_at)
+
+
+def package_review(
+    out_root: str | Path,
+    product_id: str,
+    verdict: str,
+    tags: Iterable[str] = (),
+    reviewer: str | None = None,
+    note: str | None = None,
+    reviewed_at: float | None = None,
+) -> Review:
+    """A review of one generated package; batch and style pack come from its manifest."""
+    packages = _PackageInfo(Path(out_root))
+    when = time.time() if reviewed_at is None else reviewed_at
+    return _review(packages, product_id, verdict, tags, reviewer, note, when)
+
+
+def iter_reviews_csv(path: str | Path, out_root: str | Path) -> Iterator[Review]:
+    """Reviews from a CSV with REVIEW_CSV_FIELDS columns; tags are separated by ';'."""
+    p = Path(path)
+    if not p.exists():
+        raise ValidationError(f"Review CSV not found: {p}")
+    packages = _PackageInfo(Path(out_root))
+    now = time.time()
+    with p.open("r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.DictReader(f)
+        if reader.fieldnames is None:
+            raise ValidationError("Review CSV has no header row.")
+        missing = [c for c in ("product_id", "verdict") if c not in reader.fieldnames]
+        if missing:
+            raise ValidationError(f"Review CSV is missing column(s): {', '.join(missing)}")
+        for idx, row in enumerate(reader, start=2):
+            try:
+                raw_time = (row.get("reviewed_at") or "").strip()
+                yield _review(
+                    packages,
+                    row.get("product_id") or "",
+                    row.get("verdict") or "",
+                    (row.get("tags") or "").split(";"),
+                    (row.get("reviewer") or "").strip(),
+                    (row.get("note") or "").strip(),
+                    parse_review_time(raw_time) if raw_time else now,
+                )
+            except ValidationError as e:
+                raise ValidationError(f"Review CSV line {idx}: {e}") from None
+
+
+def _filters(
+    alias: str,
+    since: float | None = None,
+    until: float | None = None,
+    batch_id: str | None = None,
+    style_pack: str | None = None,
+) -> tuple[list[str], list[object]]:
+    where: list[str] = []
+    params: list[object] = []
+    for column, op, value in (
+        ("reviewed_at", ">=", since),
+        ("reviewed_at", "<", until),
+        ("batch_id", "=", batch_id),
+        ("style_pack", "=", style_pack),
+    ):
+        if value is not None:
+            where.append(f"{alias}.{column} {op} ?")
+            params.append(value)
+    return where, params
+
+
+def _clause(where: list[str]) -> str:
+    return f"WHERE {' AND '.join(where)}" if where else ""
+
+
+class QCLedger:
+    """Manual QC verdicts in a SQLite file, indexed for reject-rate and reject-tag queries.
+
+    Every review is kept. product_status holds each product's most recent review, so
+    "currently rejected" is an index lookup however long the history grows.
+    """
+
+    def __init__(self, path: str | Path, busy_timeout: float = 30.0) -> None:
+        self.path = Path(path)
+        self._conn = sqlite3.connect(str(self.path), timeout=busy_timeout, isolation_level=None)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> QCLedger:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def record(self, reviews: Iterable[Review]) -> int:
+        """Append reviews in one transaction; returns how many were written."""
+        count = 0
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            for r in reviews:
+                cur = self._conn.execute(
+                    """
+                    INSERT INTO reviews (product_id, batch_id, style_pack, verdict, reviewer, note, reviewed_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (r.product_id, r.batch_id, r.style_pack, r.verdict, r.reviewer, r.note, r.reviewed_at),
+                )
+                self._conn.executemany(
+                    """
+                    INSERT INTO review_tags (review_id, tag, product_id, batch_id, style_pack, reviewed_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    [(cur.lastrowid, t, r.product_id, r.batch_id, r.style_pack, r.reviewed_at) for t in r.tags],
+                )
+                # Imports can arrive out of order: an older review never replaces a newer status.
+                self._conn.execute(
+                    """
+                    INSERT INTO product_status (product_id, review_id, batch_id, style_pack, verdict, reviewed_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (product_id) DO UPDATE SET
+                        review_id = excluded.review_id,
+                        batch_id = excluded.batch_id,
+                        style_pack = excluded.style_pack,
+                        verdict = excluded.verdict,
+                        reviewed_at = excluded.reviewed_at
+                    WHERE excluded.reviewed_at >= product_status.reviewed_at
+                    """,
+                    (r.product_id, cur.lastrowid, r.batch_id, r.style_pack, r.verdict, r.reviewed_at),
+                )
+                count += 1
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        return count
+
+    def reject_rates(
+        self,
+        by: str = "style_pack",
+        since: float | None = None,
+        until: float | None = None,
+        batch_id: str | None = None,
+        style_pack: str | None = None,
+    ) -> list[RejectRate]:
+        """Reviews and rejects per `by` value, worst reject rate first.
+
+        Grouped by tag, `reviews` is the total under the filters and `rejects` those carrying the tag.
+        """
+        if by not in GROUP_BY:
+            raise ValidationError(f"Cannot group by '{by}'; choose from {', '.join(GROUP_BY)}")
+        where, params = _filters("r", since, until, batch_id, style_pack)
+        if by == "tag":
+            total = self._conn.execute(f"SELECT COUNT(*) FROM reviews r {_clause(where)}", params).fetchone()[0]
+            where, params = _filters("t", since, until, batch_id, style_pack)
+            rows = [
+                (tag, total, n)
+                for tag, n in self._conn.execute(
+                    f"SELECT t.tag, COUNT(*) FROM review_tags t {_clause(where)} GROUP BY t.tag", params
+                )
+            ]
+        else:
+            rows = self._conn.execute(
+                f"""
+                SELECT r.{by}, COUNT(*), SUM(r.verdict = 'reject') FROM reviews r
+                {_clause(where)} GROUP BY r.{by}
+                """,
+                params,
+            ).fetchall()
+        rates = [RejectRate(key, reviews, rejects) for key, reviews, rejects in rows]
+        return sorted(rates, key=lambda r: (-r.rate, -r.rejects, r.key or ""))
+
+    def rejects(
+        self,
+        tag: str | None = None,
+        since: float | None = None,
+        until: float | None = None,
+        batch_id: str | None = None,
+        style_pack: str | None = None,
+        open_only: bool = False,
+    ) -> list[RejectRecord]:
+        """Reject reviews matching the filters, newest first; `open_only` keeps each product's latest only."""
+        where, params = _filters("r", since, until, batch_id, style_pack)
+        where.append("r.verdict = 'reject'")
+        if open_only:
+            where.append(
+                "EXISTS (SELECT 1 FROM product_status s WHERE s.product_id = r.product_id AND s.review_id = r.id)"
+            )
+        if tag is not None:
+            # The same filters on review_tags let the (tag, batch_id, reviewed_at) index do the work.
+            tag_where, tag_params = _filters("t", since, until, batch_id, style_pack)
+            where.append(f"r.id IN (SELECT t.review_id FROM review_tags t {_clause(['t.tag = ?', *tag_where])})")
+            params.extend([tag, *tag_params])
+        rows = self._conn.execute(
+            f"""
+            SELECT r.product_id, r.batch_id, r.style_pack,
+                (SELECT group_concat(t.tag, ';') FROM review_tags t WHERE t.review_id = r.id),
+                r.reviewer, r.note, r.reviewed_at
+            FROM reviews r {_clause(where)}
+            ORDER BY r.reviewed_at DESC, r.id DESC
+            """,
+            params,
+        )
+        return [
+            RejectRecord(pid, batch, style, tuple(sorted(tags.split(";"))) if tags else (), reviewer, note, at)
+            for pid, batch, style, tags, reviewer, note, at in rows
+        ]
+
+    def rejected_products(
+        self,
+        tag: str | None = None,
+        since: float | None = None,
+        until: float | None = None,
+        batch_id: str | None = None,
+        style_pack: str | None = None,
+    ) -> list[str]:
+        """Products whose latest review is a reject: the input for a regeneration run."""
+        where, params = _filters("s", since, until, batch_id, style_pack)
+        where.append("s.verdict = 'reject'")
+        if tag is not None:
+            where.append("EXISTS (SELECT 1 FROM review_tags t WHERE t.review_id = s.review_id AND t.tag = ?)")
+            params.append(tag)
+        rows = self._conn.execute(f"SELECT s.product_id FROM product_status s {_clause(where)}", params)
+        return sorted(pid for (pid,) in rows)
+
+
+def write_catalog_subset(catalog_csv: str | Path, product_ids: Iterable[str], out_csv: str | Path) -> int:
+    """Copy the catalog rows of `product_ids` to `out_csv` (a valid generate/enqueue input)."""
+    wanted = set(product_ids)
+    out_path = Path(out_csv)
+    count = 0
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", newline="", dir=out_path.parent, prefix=f".{out_path.name}.", delete=False
+    ) as f:
+        try:
+            writer = csv.DictWriter(f, fieldnames=PRODUCT_CSV_FIELDS)
+            writer.writeheader()
+            for product in iter_products_csv(catalog_csv):
+                if product.product_id in wanted:
+                    writer.writerow(product_to_csv_row(product))
+                    count += 1
+        except BaseException:
+            f.close()
+            Path(f.name).unlink(missing_ok=True)
+            raise
+    os.replace(f.name, out_path)
+    return count
@@ -0,0 +1,352 @@
+from __future__ import annotations
+
+import hashlib
+import http.client
+import importlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Iterator
+from urllib.parse import urlsplit
+
+from .checksums import update_sidecar
+from .locking import DEFAULT_LOCK_TIMEOUT, file_lock, lock_path, product_lock_name, state_dir
+from .rendercache import RenderCache, cache_key
+from .renderjobs import RenderJob
+from .storage import ConnectionPool
+from .stubserver import stub_png
+from .util import ValidationError
+
+RENDER_JOURNAL = "render-journal.jsonl"  # in the root's state folder
+_CHUNK = 256 * 1024
+
+
+class RenderError(Exception):
+    """A render request the backend rejected outright; retrying will not help."""
+
+
+class RenderBackend:
+    """Turns a render job into PNG bytes, streamed as chunks.
+
+    Raise RenderError for permanent failures; OSError / http.client.HTTPException
+    are treated as transient and retried by the runner. Any other exception fails
+    that job only.
+    """
+
+    name = "backend"
+
+    def render(self, job: RenderJob) -> Iterator[bytes]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class HttpBackend(RenderBackend):
+    """POSTs each job as JSON to `<endpoint>/render` and streams the PNG response body."""
+
+    name = "http"
+
+    def __init__(self, endpoint_url: str, pool_size: int = 8, timeout: float = 120.0) -> None:
+        parts = urlsplit(endpoint_url)
+        if parts.scheme not in {"http", "https"} or not parts.hostname:
+            raise ValidationError(f"Invalid render endpoint URL: {endpoint_url}")
+        self._path = parts.path.rstrip("/") + "/render"
+        self._host_header = parts.netloc
+        self._pool = ConnectionPool(parts.scheme, parts.hostname, parts.port, pool_size, timeout)
+
+    def render(self, job: RenderJob) -> Iterator[bytes]:
+        body = json.dumps(job.to_dict(), ensure_ascii=False).encode("utf-8")
+        headers = {"Host": self._host_header, "Content-Type": "application/json", "Content-Length": str(len(body))}
+        conn = self._pool.acquire()
+        reusable = False
+        try:
+            conn.request("POST", self._path, body=body, headers=headers)
+            resp = conn.getresponse()
+            if resp.status != 200:
+                detail = resp.read(200).decode("utf-8", "replace")
+                if resp.status == 429 or resp.status >= 500:
+                    raise OSError(f"render backend: HTTP {resp.status} {detail}")
+                raise RenderError(f"render backend rejected {job.target}: HTTP {resp.status} {detail}")
+            while True:
+                chunk = resp.read(_CHUNK)
+                if not chunk:
+                    break
+                yield chunk
+            reusable = not resp.will_close
+        finally:
+            # An abandoned or failed response leaves the connection mid-stream; drop it.
+            self._pool.release(conn, reusable=reusable)
+
+    def close(self) -> None:
+        self._pool.close()
+
+
+class StubBackend(RenderBackend):
+    """In-process placeholder renders (see stubserver), for dry runs without a server."""
+
+    name = "stub"
+
+    def __init__(self, size: int = 2000) -> None:
+        self.size = size
+
+    def render(self, job: RenderJob) -> Iterator[bytes]:
+        yield stub_png(job.category, job.prompt, self.size)
+
+
+def make_backend(spec: str, endpoint_url: str | None, pool_size: int, timeout: float) -> RenderBackend:
+    """`http`, `stub`, or `package.module:factory` called with endpoint_url/pool_size/timeout."""
+    if spec == "http":
+        if not endpoint_url:
+            raise ValidationError("--endpoint-url is required for the http render backend")
+        return HttpBackend(endpoint_url, pool_size=pool_size, timeout=timeout)
+    if spec == "stub":
+        return StubBackend()
+    module_name, sep, attr = spec.partition(":")
+    if not sep:
+        raise ValidationError(f"Unknown render backend '{spec}' (use http, stub or package.module:factory)")
+    try:
+        factory = getattr(importlib.import_module(module_name), attr)
+    except (ImportError, AttributeError) as e:
+        raise ValidationError(f"Cannot load render backend '{spec}': {e}") from None
+    backend = factory(endpoint_url=endpoint_url, pool_size=pool_size, timeout=timeout)
+    if not isinstance(backend, RenderBackend):
+        raise ValidationError(f"Render backend '{spec}' did not return a RenderBackend")
+    return backend
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, with bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.capacity = float(max(burst, 1))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def job_fingerprint(job: RenderJob) -> str:
+    parts: list = [job.category, job.style_pack, job.prompt]
+    # A replaced supplier image changes the render; jobs without sources keep their old fingerprint.
+    if job.source_sha256:
+        parts.append(sorted(job.source_sha256))
+    key = json.dumps(parts, ensure_ascii=False)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def load_journal(path: Path) -> dict[str, dict]:
+    """Completed renders by target; a torn last line from a crash is ignored."""
+    done: dict[str, dict] = {}
+    if not path.is_file():
+        return done
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(entry, dict) and isinstance(entry.get("target"), str):
+                done[entry["target"]] = entry
+    return done
+
+
+@dataclass
+class RenderResult:
+    rendered: int = 0
+    skipped: int = 0
+    retries: int = 0
+    cached: int = 0
+    bytes: int = 0
+    errors: list[str] = field(default_factory=list)
+
+
+class _Runner:
+    def __init__(
+        self,
+        out_root: Path,
+        backend: RenderBackend,
+        bucket: TokenBucket | None,
+        max_retries: int,
+        retry_backoff: float,
+        journal: Path,
+        cache: RenderCache | None,
+        style_pack_version: str,
+    ) -> None:
+        self.out_root = out_root
+        self.cache = cache
+        self.style_pack_version = style_pack_version
+        self.backend = backend
+        self.bucket = bucket
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.result = RenderResult()
+        self.completed: dict[str, dict[str, str]] = {}
+        self._lock = threading.Lock()
+        self._journal = journal.open("a", encoding="utf-8")
+
+    def close(self) -> None:
+        self._journal.close()
+
+    def run(self, job: RenderJob) -> None:
+        target = self.out_root / job.target
+        key = ""
+        if self.cache is not None:
+            key = cache_key(job, self.style_pack_version)
+            hit = self.cache.materialize(key, target)
+            if hit is not None:
+                self._record(job, hit[0], hit[1], cached=True)
+                return
+
+        digest: str | None = None
+        size = 0
+        error: BaseException | None = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                with self._lock:
+                    self.result.retries += 1
+                time.sleep(self.retry_backoff * (2 ** (attempt - 1)))
+            if self.bucket is not None:
+                self.bucket.acquire()
+            chunks: Iterable[bytes] | None = None
+            try:
+                # Plugin backends may do the whole request in render() rather than in a generator.
+                chunks = self.backend.render(job)
+                digest, size = self._stream_to(target, chunks)
+                break
+            except (OSError, http.client.HTTPException) as e:
+                error = e
+            except Exception as e:
+                # RenderError and unexpected backend errors fail this job only, without retries.
+                error = e
+                break
+            finally:
+                close = getattr(chunks, "close", None)
+                if close is not None:
+                    close()
+        if digest is None:
+            with self._lock:
+                self.result.errors.append(f"{job.target}: {error}")
+            return
+        if self.cache is not None:
+            self.cache.put(key, target, digest, size)
+        self._record(job, digest, size, cached=False)
+
+    def _record(self, job: RenderJob, digest: str, size: int, cached: bool) -> None:
+        entry = {"target": job.target, "fingerprint": job_fingerprint(job), "sha256": digest, "size": size}
+        with self._lock:
+            # The image is already in place, so a journaled target always exists on disk.
+            self._journal.write(json.dumps(entry, sort_keys=True) + "\n")
+            self._journal.flush()
+            if cached:
+                self.result.cached += 1
+            else:
+                self.result.rendered += 1
+                self.result.bytes += size
+            product, _, rel = job.target.partition("/")
+            self.completed.setdefault(product, {})[rel] = digest
+
+    @staticmethod
+    def _stream_to(target: Path, chunks: Iterable[bytes]) -> tuple[str, int]:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f".{target.name}.part")
+        h = hashlib.sha256()
+        size = 0
+        try:
+            with tmp.open("wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    h.update(chunk)
+                    size += len(chunk)
+            if size == 0:
+                raise OSError(f"render backend returned an empty image for {target.name}")
+            os.replace(tmp, target)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        return h.hexdigest(), size
+
+
+def render_jobs(
+    out_root: str | Path,
+    jobs: Iterable[RenderJob],
+    backend: RenderBackend,
+    concurrency: int = 4,
+    rate: float | None = None,
+    burst: int | None = None,
+    max_retries: int = 4,
+    retry_backoff: float = 0.5,
+    force: bool = False,
+    lock_timeout: float = DEFAULT_LOCK_TIMEOUT,
+    cache: RenderCache | None = None,
+    style_pack_version: str = "1",
+) -> RenderResult:
+    """Render jobs into their expected filenames, journaling each finished image.
+
+    A rerun skips targets whose journal entry matches the current prompt and whose file
+    is still present, so an interrupted batch resumes where it stopped. With a cache,
+    renders whose inputs were seen before are hardlinked from it instead of requested.
+    """
+    if concurrency < 1:
+        raise ValidationError("concurrency must be >= 1")
+    root = Path(out_root)
+    journal_path = state_dir(root) / RENDER_JOURNAL
+    journal_path.parent.mkdir(parents=True, exist_ok=True)
+    done = {} if force else load_journal(journal_path)
+    bucket = TokenBucket(rate, burst or concurrency) if rate else None
+    runner = _Runner(root, backend, bucket, max_retries, retry_backoff, journal_path, cache, style_pack_version)
+
+    pending = iter(jobs)
+    pending_lock = threading.Lock()
+
+    def next_job() -> RenderJob | None:
+        with pending_lock:
+            for job in pending:
+                entry = done.get(job.target)
+                target = root / job.target
+                if (
+                    entry is not None
+                    and entry.get("fingerprint") == job_fingerprint(job)
+                    and target.is_file()
+                    and target.stat().st_size == entry.get("size")
+                ):
+                    runner.result.skipped += 1
+                    continue
+                return job
+        return None
+
+    def worker() -> None:
+        while True:
+            job = next_job()
+            if job is None:
+                return
+            runner.run(job)
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for f in [pool.submit(worker) for _ in range(concurrency)]:
+                f.result()
+    finally:
+        runner.close()
+
+    # Record the new images in each package's checksums.sha256.
+    for product, entries in sorted(runner.completed.items()):
+        with file_lock(lock_path(root, product_lock_name(product)), timeout=lock_timeout):
+            update_sidecar(root / product, entries)
+    return runner.result
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from .renderjobs import RenderJob
+
+DEFAULT_CACHE_MAX_BYTES = 10 * 1024**3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    sha256 TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS objects_lru ON objects (last_used);
+CREATE INDEX IF NOT EXISTS entries_sha256 ON entries (sha256);
+CREATE TABLE IF NOT EXISTS totals (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    bytes INTEGER NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS objects_added AFTER INSERT ON objects
+BEGIN UPDATE totals SET bytes = bytes + NEW.size WHERE id = 0; END;
+CREATE TRIGGER IF NOT EXISTS objects_removed AFTER DELETE ON objects
+BEGIN UPDATE totals SET bytes = bytes - OLD.size WHERE id = 0; END;
+-- Seeded last, so rows added by another process before the triggers existed are counted.
+INSERT OR IGNORE INTO totals (id, bytes) SELECT 0, COALESCE(SUM(size), 0) FROM objects;
+"""
+
+
+def cache_key(job: RenderJob, style_pack_version: str) -> str:
+    inputs = {
+        "prompt": job.prompt,
+        "style_pack": job.style_pack,
+        "style_pack_version": style_pack_version,
+        "shot": job.prompt_file.rsplit("/", 1)[-1],
+        "sources": sorted(job.source_sha256),
+    }
+    # Prompts are shared across SKUs of a style pack; without supplier images to tell the
+    # products apart, the product itself has to be part of the key.
+    if not job.source_sha256:
+        inputs["product_id"] = job.product_id
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def _link_or_copy(src: Path, dst: Path) -> str:
+    tmp = dst.with_name(f".{dst.name}.part")
+    tmp.unlink(missing_ok=True)
+    try:
+        os.link(src, tmp)
+        method = "hardlink"
+    except OSError:
+        shutil.copyfile(src, tmp)
+        method = "copy"
+    os.replace(tmp, dst)
+    return method
+
+
+class RenderCache:
+    """Content-addressed store of rendered images, keyed by everything that determines a render.
+
+    Objects live under `objects/<aa>/<sha256>.png` and hits are hardlinked into packages, so
+    their mode is left alone. The index keeps a running total of object sizes; when it exceeds
+    `max_bytes` the least recently used objects are evicted.
+    """
+
+    def __init__(self, root: str | Path, max_bytes: int = DEFAULT_CACHE_MAX_BYTES) -> None:
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            str(self.root / "index.sqlite"), timeout=30.0, isolation_level=None, check_same_thread=False
+        )
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> RenderCache:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def object_path(self, sha256: str) -> Path:
+        return self.root / "objects" / sha256[:2] / f"{sha256}.png"
+
+    def get(self, key: str) -> tuple[Path, str, int] | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT o.sha256, o.size FROM entries e JOIN objects o ON o.sha256 = e.sha256 WHERE e.key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            path = self.object_path(row[0])
+            if not path.is_file():
+                self._forget(row[0])
+                return None
+            self._conn.execute("UPDATE objects SET last_used = ? WHERE sha256 = ?", (time.time(), row[0]))
+        return path, row[0], row[1]
+
+    def materialize(self, key: str, target: Path) -> tuple[str, int, str] | None:
+        """Place a cached render at `target`; returns (sha256, size, method) or None on a miss."""
+        hit = self.get(key)
+        if hit is None:
+            return None
+        path, sha256, size = hit
+        target.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            method = _link_or_copy(path, target)
+        except OSError:
+            # Another process sharing the cache evicted the object after get(): treat it as a miss.
+            with self._lock:
+                self._forget(sha256)
+            return None
+        return sha256, size, method
+
+    def put(self, key: str, source: Path, sha256: str, size: int) -> None:
+        obj = self.object_path(sha256)
+        if not obj.is_file():
+            obj.parent.mkdir(parents=True, exist_ok=True)
+            _link_or_copy(source, obj)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    """
+                    INSERT INTO objects (sha256, size, last_used) VALUES (?, ?, ?)
+                    ON CONFLICT (sha256) DO UPDATE SET last_used = excluded.last_used
+                    """,
+                    (sha256, size, time.time()),
+                )
+                self._conn.execute(
+                    "INSERT INTO entries (key, sha256) VALUES (?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET sha256 = excluded.sha256",
+                    (key, sha256),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._evict()
+
+    def total_bytes(self) -> int:
+        return self._conn.execute("SELECT bytes FROM totals WHERE id = 0").fetchone()[0]
+
+    def _evict(self) -> None:
+        total = self.total_bytes()
+        while total > self.max_bytes:
+            row = self._conn.execute("SELECT sha256, size FROM objects ORDER BY last_used LIMIT 1").fetchone()
+            if row is None:
+                return
+            self._forget(row[0])
+            total -= row[1]
+
+    def _forget(self, sha256: str) -> None:
+        self._conn.execute("DELETE FROM entries WHERE sha256 = ?", (sha256,))
+        self._conn.execute("DELETE FROM objects WHERE sha256 = ?", (sha256,))
+        # Packages that received a hardlink keep their copy; only the cache's name goes away.
+        self.object_path(sha256).unlink(missing_ok=True)
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import json
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import IO, Iterator
+
+from .outputsets import manifest_plan
+from .sources import SOURCE_FINGERPRINTS_KEY
+from .util import ValidationError
+from .validator import inside_package, validate_expected_filename
+
+# Shots with a text overlay are rendered as backgrounds here; compose writes the final image.
+BACKGROUNDS_DIR = "backgrounds"
+
+
+@dataclass(frozen=True)
+class RenderJob:
+    product_id: str
+    batch_id: str | None
+    style_pack: str
+    category: str
+    filename: str
+    target: str  # where the backend's image goes, relative to the output root
+    output: str  # final image path, relative to the output root
+    prompt_file: str
+    prompt: str
+    text_source: str | None
+    text_overlay: str | None
+    source_sha256: tuple[str, ...] = ()
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def iter_render_jobs(product_dir: Path) -> Iterator[RenderJob]:
+    """One job per expected image of a generated package."""
+    manifest_path = product_dir / "manifest.json"
+    try:
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        raise ValidationError(f"Missing required file: {manifest_path}") from None
+    except json.JSONDecodeError as e:
+        raise ValidationError(f"Invalid JSON in {manifest_path}: {e}") from None
+
+    product = manifest.get("product") or {}
+    expected = manifest.get("expected_outputs") or {}
+    paths = manifest.get("paths") or {}
+    fingerprints = manifest.get(SOURCE_FINGERPRINTS_KEY) or []
+    sources = tuple(sorted(f["sha256"] for f in fingerprints if isinstance(f, dict) and "sha256" in f))
+    for shot in manifest_plan(manifest).shots:
+        category, text_source = shot.category, shot.text_source
+        files = expected.get(category)
+        if not isinstance(files, list) or shot.index > len(files):
+            raise ValidationError(f"{manifest_path}: expected_outputs.{category} has no entry #{shot.index}")
+        filename = files[shot.index - 1]
+        if not isinstance(filename, str):
+            raise ValidationError(f"{manifest_path}: expected_outputs.{category} entries must be filenames")
+        validate_expected_filename(filename)
+        category_dir = paths.get(f"{category}_dir", category)
+        prompts_dir = paths.get("prompts_dir", "prompts")
+        # Targets are written to, so manifest paths must not lead out of the package.
+        for key, rel in ((f"{category}_dir", category_dir), ("prompts_dir", prompts_dir)):
+            if not isinstance(rel, str) or not inside_package(product_dir, rel):
+                raise ValidationError(f"{manifest_path}: paths.{key} points outside the package: {rel}")
+        output = f"{product_dir.name}/{category_dir}/{filename}"
+        prompt_file = f"{prompts_dir}/{shot.prompt_file}"
+        try:
+            prompt = (product_dir / prompt_file).read_text(encoding="utf-8")
+            overlay = (product_dir / text_source).read_text(encoding="utf-8") if text_source else None
+        except FileNotFoundError as e:
+            raise ValidationError(f"Missing required file: {e.filename}") from None
+        yield RenderJob(
+            product_id=product.get("product_id", product_dir.name),
+            batch_id=manifest.get("batch_id"),
+            style_pack=product.get("style_pack", ""),
+            category=category,
+            filename=filename,
+            target=f"{product_dir.name}/{category_dir}/{BACKGROUNDS_DIR}/{filename}" if text_source else output,
+            output=output,
+            prompt_file=prompt_file,
+            prompt=prompt,
+            text_source=text_source,
+            text_overlay=overlay,
+            source_sha256=sources,
+        )
+
+
+def write_render_jobs(product_dirs: list[Path], out: IO[str]) -> int:
+    count = 0
+    for product_dir in product_dirs:
+        for job in iter_render_jobs(product_dir):
+            out.write(json.dumps(job.to_dict(), ensure_ascii=False, sort_keys=True) + "\n")
+            count += 1
+    return count
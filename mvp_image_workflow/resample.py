@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+from functools import lru_cache
+
+_PRECISION = 14
+_ONE = 1 << _PRECISION
+_HALF = 1 << (_PRECISION - 1)
+
+
+# Lines are packed into one big int with a 32-bit lane per sample, so a weighted sum of whole
+# lines is a handful of big-int multiply/adds running in C. Lanes never carry into each other:
+# 255 * (1 << 14) plus rounding stays below 1 << 23.
+def _lanes(data: bytes) -> int:
+    wide = bytearray(len(data) * 4)
+    wide[0::4] = data
+    return int.from_bytes(wide, "little")
+
+
+@lru_cache(maxsize=64)
+def _rounding(n: int) -> int:
+    return int.from_bytes(_HALF.to_bytes(4, "little") * n, "little")
+
+
+def _blend(lines: list[int], weights: tuple[int, ...], n: int) -> bytes:
+    acc = _rounding(n)
+    for line, w in zip(lines, weights):
+        acc += line * w
+    return (acc >> _PRECISION).to_bytes(n * 4, "little")[0::4]
+
+
+def _contributions(src: int, dst: int) -> list[tuple[int, tuple[int, ...]]]:
+    """Per output coordinate: (first source index, fixed-point weights summing to exactly 1.0).
+
+    Triangle (bilinear) filter whose support widens with the reduction factor, so downscaling
+    averages every source pixel instead of skipping some (the usual "antialiased bilinear").
+    """
+    scale = src / dst
+    support = max(scale, 1.0)
+    out = []
+    for i in range(dst):
+        center = (i + 0.5) * scale
+        lo = max(int(center - support), 0)
+        hi = min(int(center + support) + 1, src)
+        raw = [max(0.0, 1.0 - abs((j + 0.5 - center) / support)) for j in range(lo, hi)]
+        total = sum(raw) or 1.0
+        weights = [round(w / total * _ONE) for w in raw]
+        # Put the rounding remainder on the heaviest tap so the weights sum to exactly 1.0.
+        heaviest = weights.index(max(weights))
+        weights[heaviest] += _ONE - sum(weights)
+        while weights and weights[-1] == 0:
+            weights.pop()
+        start = 0
+        while start < len(weights) - 1 and weights[start] == 0:
+            start += 1
+        out.append((lo + start, tuple(weights[start:])))
+    return out
+
+
+def _box_contributions(src: int, factor: int) -> list[tuple[int, tuple[int, ...]]]:
+    out = []
+    for i in range(max(1, src // factor)):
+        lo, hi = i * factor, min((i + 1) * factor, src)
+        weights = [_ONE // (hi - lo)] * (hi - lo)
+        weights[0] += _ONE - sum(weights)
+        out.append((lo, tuple(weights)))
+    return out
+
+
+def _separable(
+    src: bytes, width: int, height: int, xs: list[tuple[int, tuple[int, ...]]], ys: list[tuple[int, tuple[int, ...]]]
+) -> bytearray:
+    new_width, new_height = len(xs), len(ys)
+    # Horizontal pass: each output column/channel blends whole source columns (strided slices).
+    stride = width * 3
+    mid_stride = new_width * 3
+    if new_width == width:
+        mid = bytearray(src)
+    else:
+        mid = bytearray(mid_stride * height)
+        columns = [_lanes(src[i::stride]) for i in range(stride)]
+        for x, (first, weights) in enumerate(xs):
+            for c in range(3):
+                taps = [columns[(first + k) * 3 + c] for k in range(len(weights))]
+                mid[x * 3 + c::mid_stride] = _blend(taps, weights, height)
+
+    # Vertical pass: each output row blends whole intermediate rows.
+    if new_height == height:
+        return mid
+    rows = [_lanes(mid[y * mid_stride:(y + 1) * mid_stride]) for y in range(height)]
+    out = bytearray(mid_stride * new_height)
+    for y, (first, weights) in enumerate(ys):
+        out[y * mid_stride:(y + 1) * mid_stride] = _blend(rows[first:first + len(weights)], weights, mid_stride)
+    return out
+
+
+def resize_rgb(pixels: bytes, width: int, height: int, new_width: int, new_height: int) -> bytearray:
+    """Resample packed RGB pixels with a separable triangle filter (antialiased when shrinking)."""
+    if new_width < 1 or new_height < 1:
+        raise ValueError(f"invalid target size {new_width}x{new_height}")
+    if (new_width, new_height) == (width, height):
+        return bytearray(pixels)
+    xs = _contributions(width, new_width) if new_width != width else [(x, (_ONE,)) for x in range(width)]
+    ys = _contributions(height, new_height) if new_height != height else [(y, (_ONE,)) for y in range(height)]
+    return _separable(bytes(pixels), width, height, xs, ys)
+
+
+def block_average(pixels: bytes, width: int, height: int, factor: int) -> tuple[int, int, bytearray]:
+    """Shrink by an integer factor, each output pixel the mean of a factor x factor block.
+
+    Returns (width, height, pixels); a partial block at the right/bottom edge is dropped.
+    """
+    if factor < 1:
+        raise ValueError(f"invalid block size {factor}")
+    if factor == 1:
+        return width, height, bytearray(pixels)
+    xs, ys = _box_contributions(width, factor), _box_contributions(height, factor)
+    return len(xs), len(ys), _separable(bytes(pixels), width, height, xs, ys)
+
+
+def fit_rgb(
+    pixels: bytes, width: int, height: int, box_width: int, box_height: int, pad: bytes | None = None
+) -> bytearray:
+    """Scale to fit inside the box, keeping the aspect ratio, and pad the rest.
+
+    The padding colour defaults to the top-left pixel, which on a clean background blends in.
+    """
+    scale = min(box_width / width, box_height / height)
+    w = min(box_width, max(1, round(width * scale)))
+    h = min(box_height, max(1, round(height * scale)))
+    scaled = resize_rgb(pixels, width, height, w, h)
+    if (w, h) == (box_width, box_height):
+        return scaled
+    fill = bytes(pad if pad is not None else pixels[:3])
+    out = bytearray(fill * (box_width * box_height))
+    left, top = (box_width - w) // 2, (box_height - h) // 2
+    stride, row = box_width * 3, w * 3
+    for y in range(h):
+        start = (top + y) * stride + left * 3
+        out[start:start + row] = scaled[y * row:(y + 1) * row]
+    return out
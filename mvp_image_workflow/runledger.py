@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import json
+import os
+import socket
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from .locking import DEFAULT_LOCK_TIMEOUT, ROOT_LOCK, file_lock
+from .storage import Sink, atomic_write_bytes
+from .util import ValidationError, now_utc_iso
+
+RUN_LEDGER_NAME = "runs.jsonl"
+METRIC_PREFIX = "mvp_image_workflow_run"
+
+
+def input_fingerprint(path: str | Path) -> dict:
+    from .checksums import hash_file  # only generate fingerprints; validate starts without it
+
+    p = Path(path)
+    return {"path": str(p), "sha256": hash_file(p), "bytes": p.stat().st_size}
+
+
+class RunRecorder:
+    """Collects stage timings and counts of one generate/validate run into a ledger record."""
+
+    def __init__(self, command: str, batch_id: str | None = None, shard: str | None = None) -> None:
+        self.command = command
+        self.batch_id = batch_id
+        self.shard = shard
+        self.input: dict | None = None
+        self.products = 0
+        self.files_written = 0
+        self.bytes_written = 0
+        self.failures: list[str] = []
+        self.stages: dict[str, float] = {}
+        self._started_at = now_utc_iso()
+        self._t0 = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - t0
+
+    def record(self) -> dict:
+        duration = time.perf_counter() - self._t0
+        ok = max(self.products - len(self.failures), 0)
+        return {
+            "command": self.command,
+            "batch_id": self.batch_id,
+            "shard": self.shard,
+            "started_at_utc": self._started_at,
+            "finished_at_utc": now_utc_iso(),
+            "host": socket.gethostname(),
+            "pid": os.getpid(),
+            "input": self.input,
+            "products": {"total": self.products, "ok": ok, "failed": len(self.failures)},
+            "stages_s": {name: round(s, 4) for name, s in self.stages.items()},
+            "duration_s": round(duration, 4),
+            "products_per_sec": round(ok / duration, 3) if duration > 0 else 0.0,
+            "files_written": self.files_written,
+            "bytes_written": self.bytes_written,
+            "failures": self.failures,
+            "status": "failed" if self.failures else "ok",
+        }
+
+
+def _record_line(record: dict) -> bytes:
+    return (json.dumps(record, ensure_ascii=False, sort_keys=True) + "\n").encode("utf-8")
+
+
+def append_run_record(sink: Sink, record: dict, create: bool = True) -> None:
+    """Append to the root's runs.jsonl; with create=False only a root that already keeps one."""
+    # Root-level files are read-modify-write; concurrent runs on one root take turns.
+    with sink.lock(ROOT_LOCK):
+        previous = sink.read_bytes(RUN_LEDGER_NAME)
+        if previous is None and not create:
+            return
+        previous = previous or b""
+        if previous and not previous.endswith(b"\n"):
+            previous += b"\n"
+        sink.write_bytes(RUN_LEDGER_NAME, previous + _record_line(record))
+
+
+def append_run_ledger_file(path: str | Path, record: dict, lock_timeout: float = DEFAULT_LOCK_TIMEOUT) -> None:
+    """Append to a ledger kept outside any output root (--run-ledger)."""
+    p = Path(path)
+    if p.exists() and not p.is_file():
+        raise ValidationError(f"Run ledger must be a file: {p}")
+    p.parent.mkdir(parents=True, exist_ok=True)
+    with file_lock(p.with_name(f".{p.name}.lock"), timeout=lock_timeout):
+        with p.open("ab") as f:
+            if f.tell() and not _ends_with_newline(p):
+                f.write(b"\n")
+            f.write(_record_line(record))
+
+
+def _ends_with_newline(path: Path) -> bool:
+    with path.open("rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def read_run_ledger(sink: Sink) -> list[dict]:
+    raw = sink.read_bytes(RUN_LEDGER_NAME)
+    if raw is None:
+        return []
+    records = []
+    for lineno, line in enumerate(raw.decode("utf-8").splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError as e:
+            raise ValidationError(f"Invalid JSON on line {lineno} of {RUN_LEDGER_NAME}: {e}") from None
+    return records
+
+
+def _label(value: object) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def prometheus_text(record: dict) -> str:
+    """Prometheus text exposition of one run, for node_exporter's textfile collector.
+
+    Series are labelled by command only so they stay continuous across batches; the batch,
+    input and host go on an info series instead.
+    """
+    cmd = f'command="{_label(record["command"])}"'
+    info = ",".join(
+        f'{k}="{_label(v)}"'
+        for k, v in (
+            ("command", record["command"]),
+            ("batch_id", record["batch_id"] or ""),
+            ("shard", record["shard"] or ""),
+            ("host", record["host"]),
+            ("input_sha256", (record["input"] or {}).get("sha256", "")),
+        )
+    )
+    finished = time.time()
+    metrics = [
+        ("info", "Labels of the last run.", [(info, 1)]),
+        ("duration_seconds", "Wall time of the last run.", [(cmd, record["duration_s"])]),
+        (
+            "stage_duration_seconds",
+            "Wall time per stage of the last run.",
+            [(f'{cmd},stage="{_label(stage)}"', s) for stage, s in record["stages_s"].items()],
+        ),
+        (
+            "products",
+            "Products handled by the last run.",
+            [(f'{cmd},result="ok"', record["products"]["ok"]), (f'{cmd},result="failed"', record["products"]["failed"])],
+        ),
+        ("products_per_second", "Successful products per second of wall time.", [(cmd, record["products_per_sec"])]),
+        ("bytes_written", "Package bytes written by the last run.", [(cmd, record["bytes_written"])]),
+        ("files_written", "Package files written by the last run.", [(cmd, record["files_written"])]),
+        ("success", "1 if the last run had no failures.", [(cmd, int(record["status"] == "ok"))]),
+        ("finished_timestamp_seconds", "Unix time the last run finished.", [(cmd, round(finished, 3))]),
+    ]
+    lines: list[str] = []
+    for name, help_text, samples in metrics:
+        lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+        lines.append(f"# TYPE {METRIC_PREFIX}_{name} gauge")
+        lines.extend(f"{METRIC_PREFIX}_{name}{{{labels}}} {value}" for labels, value in samples)
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics_file(path: str | Path, record: dict) -> None:
+    # Atomic replace: the collector must never scrape a half-written file. Temp files are
+    # created 0600, and node_exporter usually runs as another user.
+    atomic_write_bytes(Path(path), prometheus_text(record).encode("utf-8"))
+    os.chmod(path, 0o644)
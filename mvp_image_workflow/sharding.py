@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+from pathlib import Path
+
+from .util import ValidationError
+
+
+@dataclass(frozen=True)
+class Shard:
+    index: int  # 1-based, as written on the command line
+    count: int
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.count}"
+
+    def owns(self, product_id: str) -> bool:
+        return shard_index(product_id, self.count) == self.index
+
+
+def parse_shard(raw: str | None) -> Shard | None:
+    if raw is None:
+        return None
+    left, sep, right = raw.strip().partition("/")
+    if not sep or not left.isdigit() or not right.isdigit():
+        raise ValidationError(f"--shard must look like i/N (e.g. 1/4), got '{raw}'")
+    index, count = int(left), int(right)
+    if count < 1 or not 1 <= index <= count:
+        raise ValidationError(f"--shard index must be between 1 and N, got '{raw}'")
+    return Shard(index, count)
+
+
+def shard_index(product_id: str, count: int) -> int:
+    # Stable across hosts and Python versions (unlike hash()), so every node agrees on the split.
+    digest = hashlib.sha256(product_id.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+
+def packaged_product_ids(out_root: Path) -> list[str]:
+    return sorted(m.parent.name for m in out_root.glob("*/manifest.json"))
+
+
+@dataclass(frozen=True)
+class ShardCoverage:
+    missing: tuple[str, ...]
+    duplicated: dict[str, tuple[str, ...]]
+    unexpected: dict[str, tuple[str, ...]]
+
+    @property
+    def ok(self) -> bool:
+        return not (self.missing or self.duplicated or self.unexpected)
+
+
+def verify_shard_coverage(catalog_ids: list[str], shard_roots: list[Path]) -> ShardCoverage:
+    expected = set(catalog_ids)
+    owners: dict[str, list[str]] = {}
+    unexpected: dict[str, tuple[str, ...]] = {}
+    for root in shard_roots:
+        if not root.is_dir():
+            raise ValidationError(f"Shard output root not found: {root}")
+        ids = packaged_product_ids(root)
+        extra = tuple(pid for pid in ids if pid not in expected)
+        if extra:
+            unexpected[str(root)] = extra
+        for pid in ids:
+            if pid in expected:
+                owners.setdefault(pid, []).append(str(root))
+
+    return ShardCoverage(
+        missing=tuple(sorted(expected - set(owners))),
+        duplicated={pid: tuple(roots) for pid, roots in sorted(owners.items()) if len(roots) > 1},
+        unexpected=unexpected,
+    )
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import csv
+import errno
+import json
+import os
+import shutil
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .checksums import hash_file, update_sidecar
+from .locking import DEFAULT_LOCK_TIMEOUT, file_lock, lock_path, product_lock_name
+from .storage import atomic_write_bytes
+from .util import ValidationError, safe_id
+
+SOURCE_FINGERPRINTS_KEY = "source_fingerprints"
+SOURCE_IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp"}
+PLACE_MODES = ("auto", "reflink", "hardlink", "copy")
+
+_FICLONE = 0x40049409  # Linux ioctl: share extents with another file (btrfs, XFS, ...).
+
+
+@dataclass
+class IngestResult:
+    products: int = 0
+    files: int = 0
+    bytes: int = 0
+    unchanged: int = 0
+    deduplicated: int = 0
+    methods: dict[str, int] = field(default_factory=dict)
+
+
+def _reflink(src: Path, dst: Path) -> None:
+    if not sys.platform.startswith("linux"):
+        raise OSError(errno.EOPNOTSUPP, "reflink not supported on this platform")
+    import fcntl
+
+    with src.open("rb") as fs, dst.open("wb") as fd:
+        fcntl.ioctl(fd.fileno(), _FICLONE, fs.fileno())
+
+
+def _place(src: Path, dst: Path, mode: str) -> str:
+    if mode == "auto":
+        methods = ("reflink", "hardlink", "copy")
+    else:
+        methods = (mode,)
+
+    tmp = dst.with_name(f".{dst.name}.ingest.tmp")
+    last_error: OSError | None = None
+    for method in methods:
+        try:
+            tmp.unlink()
+        except FileNotFoundError:
+            pass
+        try:
+            if method == "reflink":
+                _reflink(src, tmp)
+            elif method == "hardlink":
+                os.link(src, tmp)
+            else:
+                shutil.copyfile(src, tmp)
+            os.replace(tmp, dst)
+            return method
+        except OSError as e:
+            last_error = e
+    try:
+        tmp.unlink()
+    except FileNotFoundError:
+        pass
+    raise OSError(f"Cannot place {src} -> {dst} using {'/'.join(methods)}: {last_error}")
+
+
+def _list_images(folder: Path) -> list[Path]:
+    return sorted(
+        p for p in folder.iterdir() if p.is_file() and p.suffix.lower() in SOURCE_IMAGE_SUFFIXES
+    )
+
+
+def discover_source_folders(sources_root: str | Path) -> dict[str, Path]:
+    root = Path(sources_root)
+    if not root.is_dir():
+        raise ValidationError(f"Supplier sources folder not found: {root}")
+    return {d.name: d for d in sorted(root.iterdir()) if d.is_dir() and safe_id(d.name) == d.name}
+
+
+def read_source_map_csv(path: str | Path) -> dict[str, Path]:
+    p = Path(path)
+    if not p.exists():
+        raise ValidationError(f"Source map CSV not found: {p}")
+    mapping: dict[str, Path] = {}
+    with p.open("r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.DictReader(f)
+        if reader.fieldnames is None or not {"product_id", "source_dir"} <= set(reader.fieldnames):
+            raise ValidationError("Source map CSV needs 'product_id' and 'source_dir' columns.")
+        for idx, row in enumerate(reader, start=2):
+            pid = (row.get("product_id") or "").strip()
+            folder = (row.get("source_dir") or "").strip()
+            if not pid or not folder:
+                raise ValidationError(f"Source map CSV line {idx}: product_id and source_dir are required")
+            if pid in mapping:
+                raise ValidationError(f"Source map CSV line {idx}: duplicate product_id '{pid}'")
+            mapping[pid] = (p.parent / folder) if not Path(folder).is_absolute() else Path(folder)
+    return mapping
+
+
+def ingest_sources(
+    out_root: str | Path,
+    mapping: dict[str, Path],
+    mode: str = "auto",
+    workers: int = 8,
+    lock_timeout: float = DEFAULT_LOCK_TIMEOUT,
+    deterministic: bool = False,
+) -> IngestResult:
+    root = Path(out_root)
+    if mode not in PLACE_MODES:
+        raise ValidationError(f"Unsupported placement mode '{mode}' (use: {', '.join(PLACE_MODES)})")
+    if workers < 1:
+        raise ValidationError("workers must be >= 1")
+
+    plan: list[tuple[str, Path, list[Path]]] = []
+    for pid, folder in mapping.items():
+        if safe_id(pid) != pid:
+            raise ValidationError(
+                f"product_id '{pid}' contains unsafe characters; allowed: letters, numbers, '-' and '_'"
+            )
+        if not (root / pid / "manifest.json").is_file():
+            raise ValidationError(f"No generated package for product_id '{pid}' under {root}")
+        if not folder.is_dir():
+            raise ValidationError(f"Supplier folder for '{pid}' not found: {folder}")
+        plan.append((pid, folder, _list_images(folder)))
+
+    all_files = [src for _pid, _folder, files in plan for src in files]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        digests = dict(zip(all_files, pool.map(hash_file, all_files)))
+
+    result = IngestResult()
+    # First placed copy of each content hash; identical images of other SKUs link to it.
+    placed_by_hash: dict[str, Path] = {}
+    for pid, _folder, files in plan:
+        # Same per-product lock as generate, so the manifest update cannot race a regeneration.
+        with file_lock(lock_path(root, product_lock_name(pid)), timeout=lock_timeout):
+            product_dir = root / pid
+            source_dir = product_dir / "source"
+            source_dir.mkdir(parents=True, exist_ok=True)
+            fingerprints = []
+            for src in files:
+                digest = digests[src]
+                size = src.stat().st_size
+                dst = source_dir / src.name
+                fingerprints.append(
+                    {"file": f"source/{src.name}", "sha256": digest, "size": size, "origin": str(src)}
+                )
+                result.files += 1
+                result.bytes += size
+
+                if dst.is_file() and (
+                    os.path.samefile(src, dst) or (dst.stat().st_size == size and hash_file(dst) == digest)
+                ):
+                    result.unchanged += 1
+                    placed_by_hash.setdefault(digest, dst)
+                    continue
+
+                link_from = placed_by_hash.get(digest)
+                if link_from is not None:
+                    result.deduplicated += 1
+                    method = _place(link_from, dst, mode)
+                else:
+                    method = _place(src, dst, mode)
+                    placed_by_hash[digest] = dst
+                result.methods[method] = result.methods.get(method, 0) + 1
+
+            _record_fingerprints(product_dir / "manifest.json", fingerprints, sort_keys=deterministic)
+            entries = {f["file"]: f["sha256"] for f in fingerprints}
+            entries["manifest.json"] = hash_file(product_dir / "manifest.json")
+            update_sidecar(product_dir, entries)
+        result.products += 1
+    return result
+
+
+def _record_fingerprints(manifest_path: Path, fingerprints: list[dict], sort_keys: bool = False) -> None:
+    try:
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    except json.JSONDecodeError as e:
+        raise ValidationError(f"Invalid JSON in {manifest_path}: {e}") from None
+    if not isinstance(manifest, dict):
+        raise ValidationError(f"Invalid JSON in {manifest_path}: expected an object")
+    manifest[SOURCE_FINGERPRINTS_KEY] = fingerprints
+    text = json.dumps(manifest, ensure_ascii=False, indent=2, sort_keys=sort_keys) + "\n"
+    atomic_write_bytes(manifest_path, text.encode("utf-8"))
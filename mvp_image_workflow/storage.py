@@ -0,0 +1,699 @@
+from __future__ import annotations
+
+import hashlib
+import hmac
+import os
+import queue
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator
+from urllib.parse import quote, urlsplit
+
+from .locking import DEFAULT_LOCK_TIMEOUT, file_lock, lock_path
+from .util import ValidationError
+
+# http.client and zipfile are imported where they are used: only S3 and archive outputs need them,
+# and every CLI start would otherwise pay for both. Annotations only see them when type checking.
+if TYPE_CHECKING:
+    import http.client
+    import zipfile
+
+MULTIPART_THRESHOLD = 8 * 1024 * 1024
+MULTIPART_PART_SIZE = 8 * 1024 * 1024
+
+# none: rely on the OS; batch: fsync everything at checkpoints; file: fsync every file and its folder.
+DURABILITY_LEVELS = ("none", "batch", "file")
+DEFAULT_CHECKPOINT_EVERY = 2000
+
+
+def fsync_file(path: str | Path) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def fsync_dir(path: str | Path) -> None:
+    # Makes renames/creations inside the folder durable; not supported on Windows.
+    try:
+        fd = os.open(path, os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write_bytes(path: Path, data: bytes, mtime: float | None = None, fsync: bool = False) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    tmp_path: str | None = None
+    try:
+        with tempfile.NamedTemporaryFile("wb", dir=path.parent, delete=False) as f:
+            tmp_path = f.name
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        if mtime is not None:
+            os.utime(tmp_path, (mtime, mtime))
+        os.replace(tmp_path, path)
+        if fsync:
+            fsync_dir(path.parent)
+    finally:
+        if tmp_path is not None and os.path.exists(tmp_path):
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+
+class Sink:
+    """Destination for generated package files, addressed by posix paths relative to the output root."""
+
+    name = "sink"
+
+    def ensure_dir(self, rel: str) -> None:
+        raise NotImplementedError
+
+    def write_bytes(self, rel: str, data: bytes) -> None:
+        raise NotImplementedError
+
+    def read_bytes(self, rel: str) -> bytes | None:
+        raise NotImplementedError
+
+    def exists(self, rel: str) -> bool:
+        return self.read_bytes(rel) is not None
+
+    def lock(self, name: str) -> AbstractContextManager[None]:
+        # Only shared filesystems need cross-process locking; other sinks own their output.
+        return nullcontext()
+
+    def close(self) -> None:
+        pass
+
+    def abort(self) -> None:
+        self.close()
+
+    def __enter__(self) -> Sink:
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class LocalSink(Sink):
+    name = "local"
+
+    def __init__(
+        self,
+        root: str | Path,
+        mtime: float | None = None,
+        lock_timeout: float = DEFAULT_LOCK_TIMEOUT,
+        durability: str = "none",
+        checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY,
+    ) -> None:
+        if durability not in DURABILITY_LEVELS:
+            raise ValidationError(f"Unsupported durability '{durability}' (use: {', '.join(DURABILITY_LEVELS)})")
+        self.root = Path(root)
+        # Pinned file mtimes let rsync-style quick checks treat reproduced files as unchanged.
+        self.mtime = mtime
+        self.lock_timeout = lock_timeout
+        self.durability = durability
+        self.checkpoint_every = max(checkpoint_every, 1)
+        self._unsynced_files: set[Path] = set()
+        self._unsynced_dirs: set[Path] = set()
+        self._unsynced_lock = threading.Lock()
+
+    def ensure_dir(self, rel: str) -> None:
+        path = self.root / rel
+        path.mkdir(parents=True, exist_ok=True)
+        if self.durability == "file":
+            fsync_dir(path)
+            fsync_dir(path.parent)
+        elif self.durability == "batch":
+            with self._unsynced_lock:
+                self._unsynced_dirs.update((path, path.parent))
+
+    def write_bytes(self, rel: str, data: bytes) -> None:
+        path = self.root / rel
+        atomic_write_bytes(path, data, mtime=self.mtime, fsync=self.durability == "file")
+        if self.durability != "batch":
+            return
+        with self._unsynced_lock:
+            self._unsynced_files.add(path)
+            self._unsynced_dirs.add(path.parent)
+            due = len(self._unsynced_files) >= self.checkpoint_every
+        if due:
+            self.checkpoint()
+
+    def checkpoint(self) -> None:
+        """Bulk-fsync everything written since the last checkpoint: file data first, then folders."""
+        with self._unsynced_lock:
+            files, self._unsynced_files = self._unsynced_files, set()
+            dirs, self._unsynced_dirs = self._unsynced_dirs, set()
+        for path in sorted(files):
+            try:
+                fsync_file(path)
+            except FileNotFoundError:
+                pass
+        # Deepest folders first so each new entry is durable before its parent's entry for it.
+        for path in sorted(dirs, key=lambda d: len(d.parts), reverse=True):
+            fsync_dir(path)
+
+    def close(self) -> None:
+        if self.durability == "batch":
+            self.checkpoint()
+
+    def read_bytes(self, rel: str) -> bytes | None:
+        try:
+            return (self.root / rel).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def exists(self, rel: str) -> bool:
+        return (self.root / rel).is_file()
+
+    def lock(self, name: str) -> AbstractContextManager[None]:
+        return file_lock(lock_path(self.root, name), timeout=self.lock_timeout)
+
+
+class PipelinedSink(Sink):
+    """Hands writes to a pool of I/O threads through a bounded queue.
+
+    On high-latency filesystems (NFS/SMB) each atomic write costs several round trips;
+    keeping many in flight hides that latency while rendering continues. Every file is
+    still written with the inner sink's atomic replace. Reads see queued writes, and pending
+    writes are drained before a lock is released, so locked read-check-write sections stay
+    consistent.
+    """
+
+    name = "pipelined"
+
+    def __init__(self, inner: Sink, workers: int = 8, max_pending: int | None = None) -> None:
+        if workers < 1:
+            raise ValidationError("I/O workers must be >= 1")
+        self.inner = inner
+        self._queue: queue.Queue[tuple[str, bytes | None] | None] = queue.Queue(
+            maxsize=max_pending or workers * 16
+        )
+        self._error: BaseException | None = None
+        self._discard = False
+        # Latest queued data per path, until its writer finishes.
+        self._pending: dict[str, bytes] = {}
+        self._pending_lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self._drain, name=f"io-writer-{i}", daemon=True) for i in range(workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def _drain(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                if self._error is not None or self._discard:
+                    continue
+                rel, data = item
+                try:
+                    if data is None:
+                        self.inner.ensure_dir(rel)
+                    else:
+                        self.inner.write_bytes(rel, data)
+                except BaseException as e:
+                    if self._error is None:
+                        self._error = e
+            finally:
+                if item is not None and item[1] is not None:
+                    with self._pending_lock:
+                        if self._pending.get(item[0]) is item[1]:
+                            del self._pending[item[0]]
+                self._queue.task_done()
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def ensure_dir(self, rel: str) -> None:
+        self._raise_error()
+        self._queue.put((rel, None))
+
+    def write_bytes(self, rel: str, data: bytes) -> None:
+        self._raise_error()
+        with self._pending_lock:
+            self._pending[rel] = data
+        self._queue.put((rel, data))
+
+    def read_bytes(self, rel: str) -> bytes | None:
+        with self._pending_lock:
+            data = self._pending.get(rel)
+        return data if data is not None else self.inner.read_bytes(rel)
+
+    def exists(self, rel: str) -> bool:
+        with self._pending_lock:
+            if rel in self._pending:
+                return True
+        return self.inner.exists(rel)
+
+    @contextmanager
+    def _locked(self, name: str) -> Iterator[None]:
+        with self.inner.lock(name):
+            try:
+                yield
+            finally:
+                self._queue.join()
+        self._raise_error()
+
+    def lock(self, name: str) -> AbstractContextManager[None]:
+        return self._locked(name)
+
+    def flush(self) -> None:
+        self._queue.join()
+        self._raise_error()
+
+    def _stop(self) -> None:
+        for _ in self._threads:
+            self._queue.put(None)
+        for t in self._threads:
+            t.join()
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            self._stop()
+        self.inner.close()
+
+    def abort(self) -> None:
+        self._discard = True
+        self._stop()
+        self.inner.abort()
+
+
+class ArchiveSink(Sink):
+    """Streams the package tree into a single .zip, published atomically on close."""
+
+    name = "archive"
+
+    def __init__(self, path: str | Path, mtime: float | None = None, durability: str = "none") -> None:
+        if durability not in DURABILITY_LEVELS:
+            raise ValidationError(f"Unsupported durability '{durability}' (use: {', '.join(DURABILITY_LEVELS)})")
+        self.durability = durability
+        self.path = Path(path)
+        if self.path.exists() and not self.path.is_file():
+            raise ValidationError(f"Archive output must be a file: {self.path}")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, self._tmp_path = tempfile.mkstemp(prefix=f".{self.path.name}.", dir=self.path.parent)
+        os.close(fd)
+        import zipfile
+
+        self._zip = zipfile.ZipFile(self._tmp_path, "w", compression=zipfile.ZIP_DEFLATED)
+        self._entries: set[str] = set()
+        self._dirs: set[str] = set()
+        self._lock = threading.Lock()
+        self._date_time: tuple[int, int, int, int, int, int] | None = None
+        if mtime is not None:
+            # Zip timestamps cannot predate 1980-01-01.
+            ts = max(datetime.fromtimestamp(mtime, timezone.utc), datetime(1980, 1, 1, tzinfo=timezone.utc))
+            self._date_time = (ts.year, ts.month, ts.day, ts.hour, ts.minute, ts.second)
+
+    def _info(self, name: str, is_dir: bool) -> zipfile.ZipInfo:
+        import zipfile
+
+        info = zipfile.ZipInfo(name, self._date_time or time.localtime(time.time())[:6])
+        info.external_attr = ((0o40755 if is_dir else 0o100644) << 16) | (0x10 if is_dir else 0)
+        info.compress_type = zipfile.ZIP_STORED if is_dir else zipfile.ZIP_DEFLATED
+        return info
+
+    def ensure_dir(self, rel: str) -> None:
+        name = rel.strip("/") + "/"
+        with self._lock:
+            if name in self._dirs:
+                return
+            self._dirs.add(name)
+            self._zip.writestr(self._info(name, is_dir=True), b"")
+
+    def write_bytes(self, rel: str, data: bytes) -> None:
+        with self._lock:
+            if rel in self._entries:
+                raise ValidationError(f"Duplicate archive entry: {rel}")
+            self._entries.add(rel)
+            self._zip.writestr(self._info(rel, is_dir=False), data)
+
+    def read_bytes(self, rel: str) -> bytes | None:
+        # The archive is rebuilt from scratch on every run, so there is no prior state to read.
+        return None
+
+    def close(self) -> None:
+        self._zip.close()
+        if self.durability != "none":
+            fsync_file(self._tmp_path)
+        os.replace(self._tmp_path, self.path)
+        if self.durability != "none":
+            fsync_dir(self.path.parent)
+
+    def abort(self) -> None:
+        self._zip.close()
+        try:
+            os.unlink(self._tmp_path)
+        except OSError:
+            pass
+
+
+class ConnectionPool:
+    """Idle keep-alive HTTP(S) connections to one host, reused most-recently-released first."""
+
+    def __init__(self, scheme: str, host: str, port: int | None, size: int, timeout: float) -> None:
+        self._scheme = scheme
+        self._host = host
+        self._port = port
+        self._timeout = timeout
+        self._idle: queue.LifoQueue[http.client.HTTPConnection] = queue.LifoQueue(maxsize=size)
+
+    def acquire(self) -> http.client.HTTPConnection:
+        import http.client
+
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        if self._scheme == "https":
+            return http.client.HTTPSConnection(self._host, self._port, timeout=self._timeout)
+        return http.client.HTTPConnection(self._host, self._port, timeout=self._timeout)
+
+    def release(self, conn: http.client.HTTPConnection, reusable: bool) -> None:
+        if not reusable:
+            conn.close()
+            return
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class S3Sink(Sink):
+    """Uploads files to an S3-compatible bucket (AWS, MinIO, ...) using path-style addressing.
+
+    Uploads run concurrently on a thread pool sharing keep-alive connections; transient
+    failures (connection errors, 429/5xx) are retried with exponential backoff.
+    Credentials come from AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY; without them
+    requests are sent unsigned.
+    """
+
+    name = "s3"
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        endpoint_url: str | None = None,
+        region: str | None = None,
+        access_key: str | None = None,
+        secret_key: str | None = None,
+        max_workers: int = 8,
+        max_retries: int = 4,
+        retry_backoff: float = 0.2,
+        multipart_threshold: int = MULTIPART_THRESHOLD,
+        part_size: int = MULTIPART_PART_SIZE,
+        timeout: float = 30.0,
+    ) -> None:
+        if not bucket:
+            raise ValidationError("S3 bucket name is required")
+        if max_workers < 1:
+            raise ValidationError("S3 upload workers must be >= 1")
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.region = region or os.environ.get("AWS_DEFAULT_REGION") or os.environ.get("AWS_REGION") or "us-east-1"
+        endpoint_url = endpoint_url or os.environ.get("AWS_ENDPOINT_URL") or f"https://s3.{self.region}.amazonaws.com"
+        parts = urlsplit(endpoint_url)
+        if parts.scheme not in {"http", "https"} or not parts.hostname:
+            raise ValidationError(f"Invalid S3 endpoint URL: {endpoint_url}")
+        self._host_header = parts.netloc
+        self._access_key = access_key if access_key is not None else os.environ.get("AWS_ACCESS_KEY_ID")
+        self._secret_key = secret_key if secret_key is not None else os.environ.get("AWS_SECRET_ACCESS_KEY")
+        self._session_token = os.environ.get("AWS_SESSION_TOKEN") if access_key is None else None
+        self._max_retries = max_retries
+        self._retry_backoff = retry_backoff
+        self._multipart_threshold = multipart_threshold
+        self._part_size = max(part_size, 1)
+        self._pool = ConnectionPool(parts.scheme, parts.hostname, parts.port, max_workers + 1, timeout)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="s3-upload")
+        # Bounds the number of queued uploads (and the bytes they hold) ahead of the workers.
+        self._inflight = threading.BoundedSemaphore(max_workers * 4)
+        self._futures: list[Future[None]] = []
+        self._multipart: list[tuple[str, str, list[Future[str]]]] = []
+
+    def key_for(self, rel: str) -> str:
+        return f"{self.prefix}/{rel}" if self.prefix else rel
+
+    def ensure_dir(self, rel: str) -> None:
+        # Object stores have no directories; empty folders are implied by their files.
+        return None
+
+    def write_bytes(self, rel: str, data: bytes) -> None:
+        self._raise_failed()
+        key = self.key_for(rel)
+        if len(data) >= self._multipart_threshold:
+            self._start_multipart(key, data)
+            return
+        self._inflight.acquire()
+        fut = self._executor.submit(self._put_object, key, data)
+        fut.add_done_callback(lambda _f: self._inflight.release())
+        self._futures.append(fut)
+
+    def read_bytes(self, rel: str) -> bytes | None:
+        status, _headers, body = self._request("GET", self.key_for(rel))
+        if status == 404:
+            return None
+        if status != 200:
+            raise OSError(f"S3 GET {self.key_for(rel)} failed: HTTP {status}")
+        return body
+
+    def exists(self, rel: str) -> bool:
+        status, _headers, _body = self._request("HEAD", self.key_for(rel))
+        if status not in (200, 404):
+            raise OSError(f"S3 HEAD {self.key_for(rel)} failed: HTTP {status}")
+        return status == 200
+
+    def flush(self) -> None:
+        errors: list[BaseException] = []
+        for fut in self._futures:
+            exc = fut.exception()
+            if exc is not None:
+                errors.append(exc)
+        self._futures = [f for f in self._futures if not f.done()]
+        for key, upload_id, part_futures in self._multipart:
+            etags: list[str] = []
+            failed: BaseException | None = None
+            for pf in part_futures:
+                exc = pf.exception()
+                if exc is not None:
+                    failed = failed or exc
+                else:
+                    etags.append(pf.result())
+            if failed is None:
+                try:
+                    self._complete_multipart(key, upload_id, etags)
+                    continue
+                except OSError as e:
+                    failed = e
+            self._abort_multipart(key, upload_id)
+            errors.append(failed)
+        self._multipart = []
+        if errors:
+            raise errors[0]
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            self._executor.shutdown(wait=True)
+            self._pool.close()
+
+    def abort(self) -> None:
+        for fut in self._futures:
+            fut.cancel()
+        self._executor.shutdown(wait=True)
+        for key, upload_id, _parts in self._multipart:
+            self._abort_multipart(key, upload_id)
+        self._multipart = []
+        self._pool.close()
+
+    def _raise_failed(self) -> None:
+        pending: list[Future[None]] = []
+        for fut in self._futures:
+            if not fut.done():
+                pending.append(fut)
+                continue
+            exc = fut.exception()
+            if exc is not None:
+                raise exc
+        self._futures = pending
+
+    def _put_object(self, key: str, data: bytes) -> None:
+        status, _headers, _body = self._request("PUT", key, body=data)
+        if status != 200:
+            raise OSError(f"S3 PUT {key} failed: HTTP {status}")
+
+    def _start_multipart(self, key: str, data: bytes) -> None:
+        status, _headers, body = self._request("POST", key, query={"uploads": ""})
+        m = re.search(rb"<UploadId>([^<]+)</UploadId>", body)
+        if status != 200 or m is None:
+            raise OSError(f"S3 multipart init {key} failed: HTTP {status}")
+        upload_id = m.group(1).decode("utf-8")
+        part_futures: list[Future[str]] = []
+        view = memoryview(data)
+        for number, offset in enumerate(range(0, len(data), self._part_size), start=1):
+            chunk = bytes(view[offset : offset + self._part_size])
+            self._inflight.acquire()
+            fut = self._executor.submit(self._upload_part, key, upload_id, number, chunk)
+            fut.add_done_callback(lambda _f: self._inflight.release())
+            part_futures.append(fut)
+        self._multipart.append((key, upload_id, part_futures))
+
+    def _upload_part(self, key: str, upload_id: str, number: int, chunk: bytes) -> str:
+        status, headers, _body = self._request(
+            "PUT", key, query={"partNumber": str(number), "uploadId": upload_id}, body=chunk
+        )
+        if status != 200:
+            raise OSError(f"S3 upload part {number} of {key} failed: HTTP {status}")
+        return headers.get("etag", "")
+
+    def _complete_multipart(self, key: str, upload_id: str, etags: list[str]) -> None:
+        parts = "".join(
+            f"<Part><PartNumber>{i}</PartNumber><ETag>{etag}</ETag></Part>"
+            for i, etag in enumerate(etags, start=1)
+        )
+        payload = f"<CompleteMultipartUpload>{parts}</CompleteMultipartUpload>".encode("utf-8")
+        status, _headers, body = self._request("POST", key, query={"uploadId": upload_id}, body=payload)
+        if status != 200 or b"<Error>" in body:
+            raise OSError(f"S3 multipart complete {key} failed: HTTP {status}")
+
+    def _abort_multipart(self, key: str, upload_id: str) -> None:
+        try:
+            self._request("DELETE", key, query={"uploadId": upload_id})
+        except OSError:
+            pass
+
+    def _request(
+        self,
+        method: str,
+        key: str,
+        query: dict[str, str] | None = None,
+        body: bytes = b"",
+    ) -> tuple[int, dict[str, str], bytes]:
+        import http.client
+
+        query = query or {}
+        path = quote(f"/{self.bucket}/{key}", safe="/-_.~")
+        canonical_query = "&".join(
+            f"{quote(k, safe='-_.~')}={quote(v, safe='-_.~')}" for k, v in sorted(query.items())
+        )
+        url = f"{path}?{canonical_query}" if canonical_query else path
+
+        last_error: BaseException | None = None
+        for attempt in range(self._max_retries + 1):
+            if attempt:
+                time.sleep(self._retry_backoff * (2 ** (attempt - 1)))
+            headers = self._signed_headers(method, path, canonical_query, body)
+            conn = self._pool.acquire()
+            try:
+                conn.request(method, url, body=body, headers=headers)
+                resp = conn.getresponse()
+                data = resp.read()
+            except (OSError, http.client.HTTPException) as e:
+                self._pool.release(conn, reusable=False)
+                last_error = e
+                continue
+            self._pool.release(conn, reusable=not resp.will_close)
+            if resp.status == 429 or resp.status >= 500:
+                last_error = OSError(f"S3 {method} {key}: HTTP {resp.status}")
+                continue
+            return resp.status, {k.lower(): v for k, v in resp.getheaders()}, data
+        raise OSError(f"S3 {method} {key} failed after {self._max_retries + 1} attempt(s): {last_error}")
+
+    def _signed_headers(self, method: str, path: str, canonical_query: str, body: bytes) -> dict[str, str]:
+        payload_hash = hashlib.sha256(body).hexdigest()
+        now = datetime.now(timezone.utc)
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        headers = {
+            "host": self._host_header,
+            "x-amz-content-sha256": payload_hash,
+            "x-amz-date": amz_date,
+            "content-length": str(len(body)),
+        }
+        if self._session_token:
+            headers["x-amz-security-token"] = self._session_token
+        if not (self._access_key and self._secret_key):
+            return headers
+
+        signed = sorted(k for k in headers if k != "content-length")
+        canonical_headers = "".join(f"{k}:{headers[k].strip()}\n" for k in signed)
+        canonical_request = "\n".join(
+            [method, path, canonical_query, canonical_headers, ";".join(signed), payload_hash]
+        )
+        datestamp = amz_date[:8]
+        scope = f"{datestamp}/{self.region}/s3/aws4_request"
+        string_to_sign = "\n".join(
+            [
+                "AWS4-HMAC-SHA256",
+                amz_date,
+                scope,
+                hashlib.sha256(canonical_request.encode("utf-8")).hexdigest(),
+            ]
+        )
+        key = ("AWS4" + self._secret_key).encode("utf-8")
+        for part in (datestamp, self.region, "s3", "aws4_request"):
+            key = hmac.new(key, part.encode("utf-8"), hashlib.sha256).digest()
+        signature = hmac.new(key, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+        headers["authorization"] = (
+            f"AWS4-HMAC-SHA256 Credential={self._access_key}/{scope}, "
+            f"SignedHeaders={';'.join(signed)}, Signature={signature}"
+        )
+        return headers
+
+
+def open_sink(
+    out: str,
+    endpoint_url: str | None = None,
+    workers: int = 8,
+    mtime: float | None = None,
+    lock_timeout: float = DEFAULT_LOCK_TIMEOUT,
+    io_workers: int = 1,
+    durability: str = "none",
+) -> Sink:
+    if out.startswith("s3://"):
+        parts = urlsplit(out)
+        return S3Sink(parts.netloc, parts.path, endpoint_url=endpoint_url, max_workers=workers)
+    path = Path(out)
+    if path.suffix.lower() == ".zip":
+        return ArchiveSink(path, mtime=mtime, durability=durability)
+    if path.exists() and not path.is_dir():
+        raise ValidationError(f"Output root must be a directory: {path}")
+    path.mkdir(parents=True, exist_ok=True)
+    local = LocalSink(path, mtime=mtime, lock_timeout=lock_timeout, durability=durability)
+    if io_workers > 1:
+        return PipelinedSink(local, workers=io_workers)
+    return local
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .png import encode_png
+
+DEFAULT_STUB_SIZE = 2000
+INFO_BAR_FRACTION = 0.3
+
+
+@lru_cache(maxsize=64)
+def _stub_png(size: int, color: tuple[int, int, int], info_bar: bool) -> bytes:
+    bar_rows = int(size * INFO_BAR_FRACTION) if info_bar else 0
+    scene = bytes(color) * size
+    bar = bytes((245, 245, 245)) * size
+    return encode_png(size, size, scene * (size - bar_rows) + bar * bar_rows)
+
+
+def stub_png(category: str, prompt: str, size: int = DEFAULT_STUB_SIZE) -> bytes:
+    """Placeholder render: a flat scene colour derived from the prompt.
+
+    spec/howto backgrounds get a light info bar over the bottom 30%, like the prompts ask for.
+    """
+    digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+    color = (64 + digest[0] // 2, 64 + digest[1] // 2, 64 + digest[2] // 2)
+    return _stub_png(size, color, category in {"spec", "howto"})
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: StubRenderServer
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        srv = self.server
+        with srv.stats_lock:
+            srv.requests += 1
+            fail = srv.fail_first > 0
+            if fail:
+                srv.fail_first -= 1
+        if self.path != "/render":
+            self._reply(404, b"not found", "text/plain")
+            return
+        if fail:
+            self._reply(503, b"busy", "text/plain")
+            return
+        try:
+            job = json.loads(body)
+            png = stub_png(job["category"], job["prompt"], srv.size)
+        except (ValueError, KeyError, TypeError):
+            self._reply(400, b"bad request", "text/plain")
+            return
+        self._reply(200, png, "image/png")
+
+    def _reply(self, status: int, data: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+class StubRenderServer(ThreadingHTTPServer):
+    """Local stand-in for an image-generation backend: POST /render with a render job, get a PNG back.
+
+    `fail_first` makes the first N requests answer 503 to exercise retries.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, size: int = DEFAULT_STUB_SIZE, fail_first: int = 0):
+        super().__init__((host, port), _Handler)
+        self.size = size
+        self.fail_first = fail_first
+        self.requests = 0
+        self.connections = 0
+        self.stats_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def process_request(self, request, client_address) -> None:
+        with self.stats_lock:
+            self.connections += 1
+        super().process_request(request, client_address)
+
+    def __enter__(self) -> StubRenderServer:
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.shutdown()
+        self.server_close()
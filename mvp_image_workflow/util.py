@@ -6,7 +6,8 @@ from datetime import datetime, timezone
 _SAFE_FILENAME_CHARS = set("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_")
 
 
-@dataclass(frozen=True)
+# Not frozen: contextlib and traceback machinery assign __traceback__/__context__ on the way out.
+@dataclass(eq=False)
 class ValidationError(Exception):
     message: str
 
@@ -18,6 +19,20 @@ def now_utc_iso() -> str:
     return datetime.now(timezone.utc).replace(microsecond=0).isoformat()
 
 
+def utc_iso_from_epoch(epoch: int) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat()
+
+
+def parse_source_date_epoch(raw: str | None) -> int:
+    # Same contract as reproducible-builds' SOURCE_DATE_EPOCH: integer seconds since the Unix epoch.
+    v = (raw or "").strip()
+    if not v:
+        return 0
+    if not v.isdigit():
+        raise ValidationError(f"SOURCE_DATE_EPOCH must be a non-negative integer, got '{raw}'")
+    return int(v)
+
+
 def contains_disallowed_scripts(text: str) -> bool:
     # English-only policy: reject Cyrillic and CJK blocks as a practical MVP check.
     for ch in text:
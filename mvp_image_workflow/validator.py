@@ -3,7 +3,9 @@ from __future__ import annotations
 import json
 from pathlib import Path
 
-from .util import ValidationError, safe_id
+from .outputsets import PACKAGE_DIRS, manifest_plan
+from .util import ValidationError, require_english_text, safe_id
+from .variants import VARIANTS_KEY
 
 
 def _read_json(path: Path) -> dict:
@@ -19,7 +21,7 @@ def _read_json(path: Path) -> dict:
     return data
 
 
-def _validate_expected_filename(fname: str) -> None:
+def validate_expected_filename(fname: str) -> None:
     if "/" in fname or "\\" in fname:
         raise ValidationError(f"Invalid expected filename (must not contain path separators): {fname}")
     p = Path(fname)
@@ -31,37 +33,54 @@ def _validate_expected_filename(fname: str) -> None:
         raise ValidationError(f"Invalid expected filename (must end with .png): {fname}")
 
 
+def inside_package(root: Path, rel: str) -> bool:
+    """Whether a manifest-relative path stays inside the package folder, symlinks resolved."""
+    p = Path(rel)
+    if p.is_absolute() or ".." in p.parts or "\\" in rel:
+        return False
+    base = root.resolve()
+    target = (root / p).resolve()
+    return target == base or base in target.parents
+
+
+def _validate_variants(root: Path, entry: object) -> None:
+    if not isinstance(entry, dict) or not isinstance(entry.get("file"), str) or not isinstance(entry.get("count"), int):
+        raise ValidationError(f"manifest.json {VARIANTS_KEY} must be an object with 'file' and 'count'")
+    if not inside_package(root, entry["file"]):
+        raise ValidationError(f"manifest.json {VARIANTS_KEY}.file points outside the package: {entry['file']}")
+    path = root / entry["file"]
+    if not path.is_file():
+        raise ValidationError(f"Missing personalization variants file: {path}")
+    count = 0
+    with path.open("r", encoding="utf-8") as f:
+        for lineno, line in enumerate(f, start=1):
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValidationError(f"Invalid JSON on line {lineno} of {path}: {e}") from None
+            if not isinstance(row, dict) or not isinstance(row.get("order_id"), str):
+                raise ValidationError(f"Line {lineno} of {path} must be an object with an 'order_id'")
+            try:
+                require_english_text("personalization_text_en", row.get("personalization_text_en") or "")
+            except ValidationError as e:
+                raise ValidationError(f"Line {lineno} of {path}: {e}") from None
+            count += 1
+    if count != entry["count"]:
+        raise ValidationError(f"{path} has {count} variant(s), manifest.json records {entry['count']}")
+
+
 def validate_product_package(product_dir: str | Path, require_images: bool) -> None:
     root = Path(product_dir)
     manifest_path = root / "manifest.json"
     manifest = _read_json(manifest_path)
 
-    expected_layout = {
-        "showcase_dir": root / "showcase",
-        "spec_dir": root / "spec",
-        "howto_dir": root / "howto",
-        "source_dir": root / "source",
-        "prompts_dir": root / "prompts",
-        "texts_dir": root / "texts",
-        "meta_dir": root / "meta",
-    }
-    prompts_dir = expected_layout["prompts_dir"]
-    texts_dir = expected_layout["texts_dir"]
+    plan = manifest_plan(manifest)
+    expected_layout = {f"{d}_dir": root / d for d in (*plan.categories, *PACKAGE_DIRS)}
     meta_dir = expected_layout["meta_dir"]
 
     required_files = [
         manifest_path,
-        prompts_dir / "showcase_01_clean_main.txt",
-        prompts_dir / "showcase_02_lifestyle_A.txt",
-        prompts_dir / "showcase_03_lifestyle_B.txt",
-        prompts_dir / "spec_01_dimensions_background.txt",
-        prompts_dir / "spec_02_specs_background.txt",
-        prompts_dir / "howto_01_steps_background.txt",
-        prompts_dir / "howto_02_tips_background.txt",
-        texts_dir / "spec_01.txt",
-        texts_dir / "spec_02.txt",
-        texts_dir / "howto_01.txt",
-        texts_dir / "howto_02.txt",
+        *(root / rel for rel in plan.required_files()),
         meta_dir / "qc_checklist.json",
         meta_dir / "product.json",
     ]
@@ -107,6 +126,9 @@ def validate_product_package(product_dir: str | Path, require_images: bool) -> N
                 f"manifest.paths.{key} ({rel_value}) does not match the actual layout ({expected_dir.relative_to(root)})"
             )
 
+    if VARIANTS_KEY in manifest:
+        _validate_variants(root, manifest[VARIANTS_KEY])
+
     if not require_images:
         return
 
@@ -114,12 +136,7 @@ def validate_product_package(product_dir: str | Path, require_images: bool) -> N
     if not isinstance(expected_outputs, dict):
         raise ValidationError("manifest.json missing 'expected_outputs' dict")
 
-    expected_counts = {
-        "showcase": 3,
-        "spec": 2,
-        "howto": 2,
-    }
-    for category, expected_count in expected_counts.items():
+    for category, expected_count in plan.counts:
         files = expected_outputs.get(category)
         if not isinstance(files, list):
             raise ValidationError(f"manifest.json expected_outputs.{category} must be a list")
@@ -136,6 +153,6 @@ def validate_product_package(product_dir: str | Path, require_images: bool) -> N
         for fname in files:
             if not isinstance(fname, str):
                 raise ValidationError(f"manifest.json expected_outputs.{category} contains non-string")
-            _validate_expected_filename(fname)
+            validate_expected_filename(fname)
             if not (category_dir / fname).is_file():
                 raise ValidationError(f"Missing expected image: {category_dir / fname}")
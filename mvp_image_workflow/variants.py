@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import csv
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+from .util import ValidationError, require_english_text, safe_id
+
+VARIANTS_KEY = "personalization_variants"
+VARIANTS_FILE = "texts/personalization_variants.jsonl"
+
+
+@dataclass(frozen=True)
+class PersonalizationVariant:
+    order_id: str
+    product_id: str
+    personalization_text_en: str
+
+
+def read_orders_csv(path: str | Path) -> dict[str, list[PersonalizationVariant]]:
+    """Read order_id,product_id,personalization_text_en rows grouped by product_id."""
+    p = Path(path)
+    if not p.exists():
+        raise ValidationError(f"Orders CSV not found: {p}")
+
+    by_product: dict[str, list[PersonalizationVariant]] = {}
+    seen_orders: set[str] = set()
+    with p.open("r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.DictReader(f)
+        if reader.fieldnames is None:
+            raise ValidationError("Orders CSV has no header row.")
+        for idx, row in enumerate(reader, start=2):
+            try:
+                order_id = (row.get("order_id") or "").strip()
+                if not order_id:
+                    raise ValidationError("Missing required field: order_id")
+                if order_id in seen_orders:
+                    raise ValidationError(f"Duplicate order_id: '{order_id}'")
+                product_id = (row.get("product_id") or "").strip()
+                if not product_id or safe_id(product_id) != product_id:
+                    raise ValidationError(
+                        "product_id is missing or contains unsafe characters; allowed: letters, numbers, '-' and '_'"
+                    )
+                text = require_english_text("personalization_text_en", row.get("personalization_text_en", ""))
+            except ValidationError as e:
+                raise ValidationError(f"Orders CSV line {idx}: {e}") from None
+            seen_orders.add(order_id)
+            by_product.setdefault(product_id, []).append(PersonalizationVariant(order_id, product_id, text))
+
+    if not by_product:
+        raise ValidationError("Orders CSV has no order rows.")
+    return by_product
+
+
+def variants_jsonl(variants: list[PersonalizationVariant]) -> bytes:
+    # Sorted by order_id so a reshuffled orders file leaves the overlay byte-identical.
+    lines = [
+        json.dumps(
+            {"order_id": v.order_id, "personalization_text_en": v.personalization_text_en},
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+        for v in sorted(variants, key=lambda v: v.order_id)
+    ]
+    return ("\n".join(lines) + "\n").encode("utf-8")
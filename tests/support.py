@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from mvp_image_workflow.batch import ProductRow
+
+
+def make_product(product_id: str = "SKU123") -> ProductRow:
+    return ProductRow(
+        product_id=product_id,
+        product_name_en="Stainless Steel Insulated Tumbler",
+        style_pack="minimal_white",
+        output_set="minimum",
+        units="cm",
+        dimensions_l=None,
+        dimensions_w=None,
+        dimensions_h=None,
+        specs=("Capacity: 500 ml", "Double-wall insulation", "Leak-proof lid"),
+        howto_title="How to Use",
+        steps=("Fill with your drink", "Close the lid firmly", "Enjoy hot or cold beverages"),
+        tips=(),
+        manager_notes=None,
+        must_have_keywords=None,
+        must_avoid_elements=None,
+        personalization_text_en=None,
+    )
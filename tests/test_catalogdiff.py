@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import csv
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+
+from mvp_image_workflow.catalogdiff import diff_catalogs
+from mvp_image_workflow.cli import main as cli_main
+from mvp_image_workflow.io_csv import read_products_csv
+from mvp_image_workflow.util import ValidationError
+
+HEADER = ["product_id", "product_name_en", "spec_1", "spec_2", "spec_3", "step_1", "step_2", "step_3"]
+
+
+def _write_catalog(path: Path, rows: dict[str, str]) -> None:
+    with path.open("w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(HEADER)
+        for pid, name in rows.items():
+            w.writerow([pid, name, "Capacity: 500 ml", "Insulated", "Leak-proof", "Fill", "Close", "Enjoy"])
+
+
+class TestCatalogDiff(unittest.TestCase):
+    def test_diff_with_small_runs_feeds_generate(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            old_rows = {f"SKU{i:03d}": "Tumbler" for i in range(20)}
+            new_rows = dict(old_rows)
+            del new_rows["SKU003"], new_rows["SKU017"]
+            new_rows["SKU005"] = "Tumbler XL"
+            new_rows["SKU100"] = "Mug"
+            new_rows["A1"] = "Bottle"
+            _write_catalog(root / "old.csv", old_rows)
+            _write_catalog(root / "new.csv", dict(reversed(list(new_rows.items()))))
+
+            # run_rows=3 forces several on-disk runs per catalog.
+            result = diff_catalogs(
+                root / "old.csv", root / "new.csv", root / "delta.csv", removed_out=root / "removed.txt", run_rows=3
+            )
+            self.assertEqual((result.added, result.modified, result.removed, result.unchanged), (2, 1, 2, 17))
+            self.assertEqual((root / "removed.txt").read_text(encoding="utf-8").split(), ["SKU003", "SKU017"])
+
+            delta = read_products_csv(root / "delta.csv")
+            self.assertEqual([p.product_id for p in delta], ["A1", "SKU005", "SKU100"])
+            self.assertEqual(delta[1].product_name_en, "Tumbler XL")
+            with (root / "delta.csv").open(encoding="utf-8", newline="") as f:
+                self.assertEqual([r["change"] for r in csv.DictReader(f)], ["added", "modified", "added"])
+
+            with redirect_stdout(StringIO()):
+                code = cli_main(["generate", "--input", str(root / "delta.csv"), "--out", str(root / "out")])
+            self.assertEqual(code, 0)
+            generated = sorted(p.parent.name for p in (root / "out").glob("*/manifest.json"))
+            self.assertEqual(generated, ["A1", "SKU005", "SKU100"])
+
+    def test_duplicate_product_id_across_runs_is_rejected(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            _write_catalog(root / "old.csv", {"SKU1": "Tumbler"})
+            with (root / "new.csv").open("w", encoding="utf-8", newline="") as f:
+                w = csv.writer(f)
+                w.writerow(HEADER)
+                for name in ("Tumbler", "Mug", "Tumbler"):
+                    w.writerow(["SKU1", name, "Capacity: 500 ml", "Insulated", "Leak-proof", "Fill", "Close", "Enjoy"])
+            with self.assertRaisesRegex(ValidationError, "Duplicate product_id"):
+                diff_catalogs(root / "old.csv", root / "new.csv", root / "delta.csv", run_rows=1)
+            self.assertFalse((root / "delta.csv").exists())
+            self.assertEqual([p for p in root.iterdir() if p.name.startswith(".")], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
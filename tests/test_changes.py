@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import csv
+import json
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+
+from mvp_image_workflow.cli import main as cli_main
+
+HEADER = [
+    "product_id",
+    "product_name_en",
+    "spec_1",
+    "spec_2",
+    "spec_3",
+    "step_1",
+    "step_2",
+    "step_3",
+    "personalization_text_en",
+]
+
+
+def _write_csv(path: Path, rows: list[list[str]]) -> None:
+    with path.open("w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(HEADER)
+        w.writerows(rows)
+
+
+def _row(product_id: str, capacity: str = "500 ml", personalization: str = "") -> list[str]:
+    return [
+        product_id,
+        "Stainless Steel Insulated Tumbler",
+        f"Capacity: {capacity}",
+        "Double-wall insulation",
+        "Leak-proof lid",
+        "Fill with your drink",
+        "Close the lid firmly",
+        "Enjoy hot or cold beverages",
+        personalization,
+    ]
+
+
+class TestChangeLog(unittest.TestCase):
+    def _generate(self, csv_path: Path, out: Path, *extra: str) -> dict:
+        with redirect_stdout(StringIO()):
+            code = cli_main(["generate", "--input", str(csv_path), "--out", str(out), "--deterministic", *extra])
+        self.assertEqual(code, 0)
+        return json.loads((out / "changes.json").read_text(encoding="utf-8"))
+
+    def test_change_log_tracks_added_unchanged_modified_removed(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            csv_path = root / "in.csv"
+            out = root / "out"
+
+            _write_csv(csv_path, [_row("SKU1", personalization="Happy Holidays"), _row("SKU2"), _row("SKU3")])
+            log = self._generate(csv_path, out)
+            self.assertEqual(log["summary"], {"added": 3, "modified": 0, "unchanged": 0, "removed": 0})
+            info = log["products"]["SKU1"]["files"]["texts/spec_01.txt"]
+            self.assertEqual(info["status"], "added")
+            self.assertEqual(info["size"], (out / "SKU1" / "texts" / "spec_01.txt").stat().st_size)
+
+            log = self._generate(csv_path, out)
+            self.assertEqual(log["summary"], {"added": 0, "modified": 0, "unchanged": 3, "removed": 0})
+
+            _write_csv(csv_path, [_row("SKU1"), _row("SKU2", capacity="750 ml"), _row("SKU4")])
+            log = self._generate(csv_path, out, "--full-catalog")
+            self.assertEqual(log["summary"], {"added": 1, "modified": 2, "unchanged": 0, "removed": 1})
+            sku1 = log["products"]["SKU1"]["files"]
+            self.assertEqual(sku1["texts/personalization_text.txt"]["status"], "removed")
+            self.assertEqual(sku1["meta/product.json"]["status"], "modified")
+            sku2 = log["products"]["SKU2"]["files"]
+            self.assertEqual(sku2["texts/spec_01.txt"]["status"], "modified")
+            self.assertEqual(sku2["prompts/showcase_01_clean_main.txt"]["status"], "unchanged")
+            self.assertEqual(log["products"]["SKU3"]["status"], "removed")
+            self.assertEqual(log["products"]["SKU4"]["status"], "added")
+
+    def test_partial_run_carries_untouched_products_forward(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            full_csv, partial_csv = root / "full.csv", root / "partial.csv"
+            out = root / "out"
+            _write_csv(full_csv, [_row("SKU1", personalization="Happy Holidays"), _row("SKU2"), _row("SKU3")])
+            _write_csv(partial_csv, [_row("SKU3", capacity="750 ml")])
+            first = self._generate(full_csv, out)
+
+            log = self._generate(partial_csv, out)
+            self.assertEqual(log["summary"], {"added": 0, "modified": 1, "unchanged": 2, "removed": 0})
+            self.assertEqual(log["products"]["SKU1"], {
+                "status": "unchanged",
+                "files": {rel: {**info, "status": "unchanged"} for rel, info in first["products"]["SKU1"]["files"].items()},
+            })
+            self.assertEqual(log["products"]["SKU3"]["status"], "modified")
+
+            log = self._generate(full_csv, out)
+            self.assertEqual(log["summary"], {"added": 0, "modified": 1, "unchanged": 2, "removed": 0})
+            self.assertEqual(log["products"]["SKU1"]["status"], "unchanged")
+
+            # A personalization text from an earlier run stays on disk, so it stays listed too.
+            _write_csv(partial_csv, [_row("SKU1")])
+            log = self._generate(partial_csv, out)
+            sku1 = log["products"]["SKU1"]
+            self.assertEqual(sku1["files"]["texts/personalization_text.txt"]["status"], "unchanged")
+            self.assertEqual(sku1["status"], "modified")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from io import StringIO
+from pathlib import Path
+
+from mvp_image_workflow.checksums import CHECKSUM_FILE, VERIFY_CACHE_FILE, parse_checksums, verify_packages
+from mvp_image_workflow.cli import main as cli_main
+from mvp_image_workflow.generator import generate_product_package
+from mvp_image_workflow.sources import ingest_sources
+
+from support import make_product
+
+
+class TestChecksums(unittest.TestCase):
+    def test_generate_records_checksums_and_verify_uses_stat_cache(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            out = Path(td) / "out"
+            product_dir = generate_product_package(make_product("SKU1"), out, batch_id=None)
+            recorded = parse_checksums((product_dir / CHECKSUM_FILE).read_text(encoding="utf-8"))
+            self.assertEqual(len(recorded), 14)
+            self.assertIn("manifest.json", recorded)
+
+            before = sorted(p.relative_to(out) for p in out.rglob("*"))
+            first = verify_packages(out, [product_dir])
+            self.assertEqual(first.problems, [])
+            self.assertEqual((first.hashed, first.cached), (14, 0))
+            # The stat cache lives in the state folder; verifying leaves the root as it was.
+            self.assertEqual(sorted(p.relative_to(out) for p in out.rglob("*")), before)
+            self.assertTrue((Path(td) / "out.state" / VERIFY_CACHE_FILE).is_file())
+
+            second = verify_packages(out, [product_dir])
+            self.assertEqual((second.hashed, second.cached), (0, 14))
+
+            (product_dir / "texts" / "spec_01.txt").write_text("tampered\n", encoding="utf-8")
+            third = verify_packages(out, [product_dir])
+            self.assertEqual(third.hashed, 1)
+            self.assertEqual(len(third.problems), 1)
+            self.assertIn("SKU1/texts/spec_01.txt: checksum mismatch", third.problems[0])
+
+    def test_seal_adds_images_and_regenerate_keeps_them(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            out = Path(td) / "out"
+            product_dir = generate_product_package(make_product("SKU1"), out, batch_id=None)
+            (product_dir / "showcase" / "SKU1_showcase_01.png").write_bytes(b"png-bytes")
+
+            with redirect_stdout(StringIO()) as stdout:
+                self.assertEqual(cli_main(["verify", "--out", str(out)]), 0)
+            self.assertIn("1 file(s) not recorded", stdout.getvalue())
+
+            with redirect_stdout(StringIO()):
+                self.assertEqual(cli_main(["seal", "--out", str(out)]), 0)
+            generate_product_package(make_product("SKU1"), out, batch_id=None)
+            recorded = parse_checksums((product_dir / CHECKSUM_FILE).read_text(encoding="utf-8"))
+            self.assertIn("showcase/SKU1_showcase_01.png", recorded)
+
+            (product_dir / "showcase" / "SKU1_showcase_01.png").unlink()
+            with redirect_stdout(StringIO()), redirect_stderr(StringIO()) as stderr:
+                self.assertEqual(cli_main(["verify", "--out", str(out), "--no-cache"]), 2)
+            self.assertIn("SKU1/showcase/SKU1_showcase_01.png: missing", stderr.getvalue())
+
+    def test_ingest_sources_refreshes_checksums(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            out = root / "out"
+            product_dir = generate_product_package(make_product("SKU1"), out, batch_id=None)
+            supplier = root / "suppliers" / "SKU1"
+            supplier.mkdir(parents=True)
+            (supplier / "front.jpg").write_bytes(b"front")
+
+            ingest_sources(out, {"SKU1": supplier}, mode="copy")
+            result = verify_packages(out, [product_dir], use_cache=False)
+            self.assertEqual(result.problems, [])
+            self.assertEqual(result.files, 15)
+
+    def test_single_product_verify_keeps_cache_of_the_others(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            out = Path(td) / "out"
+            dirs = [generate_product_package(make_product(pid), out, batch_id=None) for pid in ("SKU1", "SKU2")]
+            self.assertEqual(verify_packages(out, dirs).hashed, 28)
+            with redirect_stdout(StringIO()):
+                self.assertEqual(cli_main(["verify", "--out", str(out), "--product-id", "SKU1"]), 0)
+            self.assertEqual(verify_packages(out, dirs).hashed, 0)
+
+    def test_regenerate_drops_deleted_files_from_sidecar(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            out = Path(td) / "out"
+            product_dir = generate_product_package(make_product("SKU1"), out, batch_id=None)
+            image = product_dir / "showcase" / "SKU1_showcase_01.png"
+            image.write_bytes(b"png-bytes")
+            with redirect_stdout(StringIO()):
+                self.assertEqual(cli_main(["seal", "--out", str(out)]), 0)
+
+            image.unlink()
+            generate_product_package(make_product("SKU1"), out, batch_id=None)
+            recorded = parse_checksums((product_dir / CHECKSUM_FILE).read_text(encoding="utf-8"))
+            self.assertNotIn("showcase/SKU1_showcase_01.png", recorded)
+            self.assertEqual(verify_packages(out, [product_dir], use_cache=False).problems, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import json
+import struct
+import tempfile
+import time
+import unittest
+import zlib
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+
+from mvp_image_workflow.cli import main as cli_main
+from mvp_image_workflow.compose import COMPOSE_LOG, SAFE_MARGIN
+from mvp_image_workflow.font import BUILTIN_FONT, GlyphAtlas
+from mvp_image_workflow.generator import generate_product_package
+from mvp_image_workflow.png import PNG_SIGNATURE, _chunk, decode_png, iter_png_rows
+from mvp_image_workflow.validator import validate_product_package
+
+from support import make_product
+
+
+class TestCompose(unittest.TestCase):
+    def test_compose_draws_text_inside_info_bar_and_margins(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            out = Path(td) / "out"
+            for pid in ("SKU1", "SKU2"):
+                generate_product_package(make_product(pid), out, batch_id=None)
+            with redirect_stdout(StringIO()):
+                self.assertEqual(cli_main(["render", "--out", str(out), "--backend", "stub"]), 0)
+                self.assertEqual(cli_main(["layout", "--out", str(out)]), 0)
+
+            start = time.monotonic()
+            with redirect_stdout(StringIO()) as stdout:
+                self.assertEqual(cli_main(["compose", "--out", str(out)]), 0)
+            self.assertIn("Composed 8 image(s)", stdout.getvalue())
+            self.assertLess(time.monotonic() - start, 30)
+            validate_product_package(out / "SKU1", require_images=True)
+
+            bg_w, bg_h, background = decode_png((out / "SKU1/spec/backgrounds/SKU1_spec_02.png").read_bytes())
+            w, h, final = decode_png((out / "SKU1/spec/SKU1_spec_02.png").read_bytes())
+            self.assertEqual((w, h), (bg_w, bg_h))
+            stride = w * 3
+            changed_rows = [y for y in range(h) if final[y * stride:(y + 1) * stride] != background[y * stride:(y + 1) * stride]]
+            self.assertTrue(changed_rows)
+            self.assertGreaterEqual(min(changed_rows), h - round(h * 0.3))
+            self.assertLess(max(changed_rows), h - SAFE_MARGIN)
+            for y in changed_rows:
+                row, bg_row = final[y * stride:(y + 1) * stride], background[y * stride:(y + 1) * stride]
+                self.assertEqual(row[:SAFE_MARGIN * 3], bg_row[:SAFE_MARGIN * 3])
+                self.assertEqual(row[-SAFE_MARGIN * 3:], bg_row[-SAFE_MARGIN * 3:])
+
+            log = json.loads((out / "SKU1" / COMPOSE_LOG).read_text(encoding="utf-8"))
+            self.assertEqual(log["spec/SKU1_spec_02.png"]["layout"]["clipped_lines"], 0)
+            self.assertTrue(log["spec/SKU1_spec_02.png"]["layout"]["precomputed"])
+            with redirect_stdout(StringIO()) as stdout:
+                self.assertEqual(cli_main(["compose", "--out", str(out)]), 0)
+            self.assertIn("Composed 0 image(s)", stdout.getvalue())
+            with redirect_stdout(StringIO()):
+                self.assertEqual(cli_main(["verify", "--out", str(out), "--no-cache"]), 0)
+
+    def test_glyph_atlas_is_reused(self) -> None:
+        atlas = GlyphAtlas()
+        a = atlas.glyph(BUILTIN_FONT, 3, (0, 0, 0), "A")
+        self.assertIs(atlas.glyph(BUILTIN_FONT, 3, (0, 0, 0), "A"), a)
+        self.assertEqual(len(atlas), 1)
+        self.assertEqual(len(a.rows), BUILTIN_FONT.glyph_height * 3)
+
+    def test_decode_png_handles_all_filter_types(self) -> None:
+        width, height = 4, 5
+        pixels = bytes((x * 40 + y * 7 + c * 3) % 256 for y in range(height) for x in range(width) for c in range(3))
+        data = _filtered_png(width, height, 3, pixels, [y % 5 for y in range(height)])
+        self.assertEqual(decode_png(data), (width, height, bytearray(pixels)))
+
+    def test_decode_png_unfilters_across_chunks(self) -> None:
+        width, height = 23, 11
+        pixels = bytes((x * x * 5 + y * 31 + c * 70) % 256 for y in range(height) for x in range(width) for c in range(4))
+        expected = bytearray()
+        for i in range(0, len(pixels), 4):
+            expected += pixels[i:i + 3]
+        for ftypes in ([4] * height, [3] * height, [1, 2] * 6, [y * 3 % 5 for y in range(height)]):
+            data = _filtered_png(width, height, 4, pixels, ftypes[:height])
+            self.assertEqual(decode_png(data), (width, height, expected))
+            chunks = list(iter_png_rows(data, chunk_rows=4))
+            self.assertEqual([first for first, _rows in chunks], [0, 4, 8])
+            self.assertEqual(b"".join(rows for _first, rows in chunks), expected)
+
+
+def _filtered_png(width: int, height: int, bpp: int, pixels: bytes, ftypes: list[int]) -> bytes:
+    """An 8-bit RGB (bpp 3) or RGBA (bpp 4) PNG whose rows use the given filter types."""
+    stride = width * bpp
+    raw = bytearray()
+    prev = bytes(stride)
+    for y in range(height):
+        line = pixels[y * stride:(y + 1) * stride]
+        ftype = ftypes[y]
+        filtered = bytearray(stride)
+        for i in range(stride):
+            left = line[i - bpp] if i >= bpp else 0
+            up = prev[i]
+            upleft = prev[i - bpp] if i >= bpp else 0
+            pred = [0, left, up, (left + up) >> 1, 0][ftype]
+            if ftype == 4:
+                p = left + up - upleft
+                pa, pb, pc = abs(p - left), abs(p - up), abs(p - upleft)
+                pred = left if pa <= pb and pa <= pc else (up if pb <= pc else upleft)
+            filtered[i] = (line[i] - pred) & 0xFF
+        raw += bytes([ftype]) + filtered
+        prev = line
+    color_type = {3: 2, 4: 6}[bpp]
+    return (
+        PNG_SIGNATURE
+        + _chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0))
+        + _chunk(b"IDAT", zlib.compress(bytes(raw)))
+        + _chunk(b"IEND", b"")
+    )
+
+if __name__ == "__main__":
+    unittest.main()
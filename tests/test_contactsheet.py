@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+
+from mvp_image_workflow.cli import main as cli_main
+from mvp_image_workflow.contactsheet import COLUMNS, THUMBS_DIR, thumbnail
+from mvp_image_workflow.generator import generate_product_package
+from mvp_image_workflow.locking import state_dir
+from mvp_image_workflow.png import decode_png, encode_png, png_dimensions
+from mvp_image_workflow.renderjobs import iter_render_jobs
+from mvp_image_workflow.sources import ingest_sources
+from mvp_image_workflow.stubserver import stub_png
+
+from support import make_product
+
+TILE = 64
+
+
+class TestContactSheet(unittest.TestCase):
+    def test_thumbnail_block_averages_into_a_centred_tile(self) -> None:
+        # 4x2 image: left half black, right half white -> 2x1 after 2x2 blocks, centred in a 4x4 tile.
+        row = b"\x00\x00\x00" * 2 + b"\xff\xff\xff" * 2
+        pixels = thumbnail(encode_png(4, 2, row * 2), 4)
+        self.assertEqual(len(pixels), 4 * 4 * 3)
+        self.assertEqual(pixels[(1 * 4 + 1) * 3:(1 * 4 + 3) * 3], b"\x00\x00\x00\xff\xff\xff")
+        self.assertEqual(pixels[:3], b"\xff\xff\xff")
+
+    def test_sheets_per_product_and_per_batch_reuse_cached_tiles(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            out = Path(td) / "out"
+            dest = Path(td) / "sheets"
+            suppliers = Path(td) / "suppliers"
+            suppliers.mkdir()
+            (suppliers / "front.png").write_bytes(stub_png("showcase", "supplier", 200))
+            (suppliers / "back.jpg").write_bytes(b"\xff\xd8\xff\xe0 not decodable here")
+            for pid, batch in (("SKU1", "B1"), ("SKU2", "B1"), ("SKU3", "B2")):
+                product_dir = generate_product_package(make_product(pid), out, batch_id=batch)
+                for job in iter_render_jobs(product_dir):
+                    (out / job.output).write_bytes(stub_png(job.category, job.output, 300))
+            (out / "SKU3" / "howto" / "SKU3_howto_02_B2.png").unlink()
+            ingest_sources(out, {"SKU1": suppliers}, mode="copy")
+
+            args = ["contact-sheet", "--out", str(out), "--dest", str(dest), "--tile", str(TILE), "--workers", "2"]
+            with redirect_stdout(StringIO()) as stdout:
+                self.assertEqual(cli_main(args), 0)
+            self.assertIn("Wrote 3 contact sheet(s) for 3 product(s)", stdout.getvalue())
+            # 20 rendered images plus the decodable supplier PNG; the JPEG gets a placeholder tile.
+            self.assertIn("(21 thumbnail(s) built, 0 from cache)", stdout.getvalue())
+            self.assertTrue(any((state_dir(out) / THUMBS_DIR).rglob("*.png")))
+            self.assertFalse((out / THUMBS_DIR).exists())
+
+            width, height = png_dimensions((dest / "SKU1.png").read_bytes())
+            self.assertEqual(width, 12 + COLUMNS * (TILE + 12))
+            single = png_dimensions((dest / "SKU2.png").read_bytes())[1]
+            self.assertGreater(height, single)  # SKU1 has a second row of supplier images.
+
+            (out / "SKU2" / "spec" / "SKU2_spec_01_B1.png").write_bytes(stub_png("spec", "regenerated", 300))
+            with redirect_stdout(StringIO()) as stdout:
+                self.assertEqual(cli_main(args + ["--by-batch", "--per-page", "1"]), 0)
+            self.assertIn("Wrote 3 contact sheet(s)", stdout.getvalue())
+            self.assertIn("(1 thumbnail(s) built, 19 from cache)", stdout.getvalue())
+            self.assertEqual(sorted(p.name for p in dest.glob("B*_p*.png")), ["B1_p001.png", "B1_p002.png", "B2_p001.png"])
+            _w, _h, page = decode_png((dest / "B1_p001.png").read_bytes())
+            self.assertNotEqual(set(page), {255})
+
+
+if __name__ == "__main__":
+    unittest.main()
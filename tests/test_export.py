@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import json
+import random
+import tempfile
+import unittest
+import zipfile
+from contextlib import redirect_stderr, redirect_stdout
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from mvp_image_workflow.cli import main as cli_main
+from mvp_image_workflow.export import EXPORT_MANIFEST, MARKETPLACE_PROFILES, MarketplaceProfile
+from mvp_image_workflow.generator import generate_product_package
+from mvp_image_workflow.png import decode_png, png_dimensions
+from mvp_image_workflow.renderjobs import iter_render_jobs
+from mvp_image_workflow.resample import _contributions, fit_rgb, resize_rgb
+from mvp_image_workflow.stubserver import stub_png
+
+from support import make_product
+
+
+def _reference_resize(pixels: bytes, width: int, height: int, new_width: int, new_height: int) -> bytearray:
+    # Straightforward per-pixel version of the same fixed-point filter.
+    cols, rows = _contributions(width, new_width), _contributions(height, new_height)
+    mid = [
+        [(sum(pixels[(y * width + first + k) * 3 + c] * w for k, w in enumerate(ws)) + 8192) >> 14
+         for first, ws in cols for c in range(3)]
+        for y in range(height)
+    ]
+    out = bytearray()
+    for first, ws in rows:
+        out += bytes((sum(mid[first + k][i] * w for k, w in enumerate(ws)) + 8192) >> 14 for i in range(new_width * 3))
+    return out
+
+
+class TestResample(unittest.TestCase):
+    def test_matches_reference_filter(self) -> None:
+        rng = random.Random(3)
+        pixels = bytes(rng.randrange(256) for _ in range(37 * 29 * 3))
+        for size in ((13, 11), (50, 60), (37, 10)):
+            self.assertEqual(resize_rgb(pixels, 37, 29, *size), _reference_resize(pixels, 37, 29, *size))
+
+    def test_flat_colour_is_preserved_and_fit_pads(self) -> None:
+        flat = bytes((10, 200, 30)) * (40 * 40)
+        self.assertEqual(resize_rgb(flat, 40, 40, 17, 23), bytearray(bytes((10, 200, 30)) * (17 * 23)))
+        boxed = fit_rgb(flat, 40, 40, 30, 20, pad=b"\x00\x00\x00")
+        self.assertEqual(len(boxed), 30 * 20 * 3)
+        self.assertEqual(boxed[:3], b"\x00\x00\x00")
+        self.assertEqual(boxed[(10 * 30 + 15) * 3:(10 * 30 + 16) * 3], bytes((10, 200, 30)))
+
+
+class TestExport(unittest.TestCase):
+    def test_export_writes_per_product_zips_per_profile(self) -> None:
+        profiles = {"thumb": MarketplaceProfile("thumb", ((150, 150), (100, 80)), "test sizes")}
+        with tempfile.TemporaryDirectory() as td, mock.patch.dict(MARKETPLACE_PROFILES, profiles):
+            out = Path(td) / "out"
+            dest = Path(td) / "exports"
+            for pid in ("SKU1", "SKU2"):
+                product_dir = generate_product_package(make_product(pid), out, batch_id="B1")
+                for job in iter_render_jobs(product_dir):
+                    (out / job.output).write_bytes(stub_png(job.category, job.prompt, 300))
+
+            args = ["export", "--out", str(out), "--dest", str(dest), "--profile", "thumb", "--workers", "2"]
+            with redirect_stdout(StringIO()) as stdout:
+                self.assertEqual(cli_main(args), 0)
+            self.assertIn("Exported 28 image(s)", stdout.getvalue())
+
+            with zipfile.ZipFile(dest / "SKU1.zip") as zf:
+                names = zf.namelist()
+                self.assertEqual(len(names), 15)
+                self.assertIn("thumb/150x150/SKU1_showcase_01.png", names)
+                self.assertIn("thumb/100x80/SKU1_howto_02.png", names)
+                self.assertEqual(zf.getinfo("thumb/150x150/SKU1_spec_02.png").compress_type, zipfile.ZIP_STORED)
+                self.assertEqual(png_dimensions(zf.read("thumb/100x80/SKU1_spec_01.png")), (100, 80))
+                _w, _h, pixels = decode_png(zf.read("thumb/150x150/SKU1_spec_01.png"))
+                # The light info bar survives resampling.
+                self.assertEqual(pixels[-3:], b"\xf5\xf5\xf5")
+                manifest = json.loads(zf.read(EXPORT_MANIFEST))
+            self.assertEqual(len(manifest["sources"]), 7)
+
+            with redirect_stdout(StringIO()) as stdout:
+                self.assertEqual(cli_main(args), 0)
+            self.assertIn("Exported 0 image(s)", stdout.getvalue())
+            self.assertIn("2 unchanged", stdout.getvalue())
+
+            (out / "SKU2" / "showcase" / "SKU2_showcase_01_B1.png").write_bytes(stub_png("showcase", "new", 300))
+            with redirect_stdout(StringIO()) as stdout:
+                self.assertEqual(cli_main(args), 0)
+            self.assertIn("Exported 14 image(s)", stdout.getvalue())
+            self.assertIn("1 unchanged", stdout.getvalue())
+
+    def test_corrupt_image_fails_only_its_product(self) -> None:
+        profiles = {"thumb": MarketplaceProfile("thumb", ((150, 150),), "test sizes")}
+        with tempfile.TemporaryDirectory() as td, mock.patch.dict(MARKETPLACE_PROFILES, profiles):
+            out = Path(td) / "out"
+            dest = Path(td) / "exports"
+            for pid in ("SKU1", "SKU2", "SKU3", "SKU4"):
+                product_dir = generate_product_package(make_product(pid), out, batch_id=None)
+                for job in iter_render_jobs(product_dir):
+                    (out / job.output).write_bytes(stub_png(job.category, job.prompt, 300))
+            (out / next(iter_render_jobs(out / "SKU4")).output).unlink()  # not rendered yet
+            image = out / next(iter_render_jobs(out / "SKU1")).output
+            data = image.read_bytes()
+            image.write_bytes(data[:41] + b"\xff" * 40 + data[81:])  # corrupt deflate stream
+            (out / next(iter_render_jobs(out / "SKU2")).output).write_bytes(data[:20])  # truncated header
+
+            args = ["export", "--out", str(out), "--dest", str(dest), "--profile", "thumb", "--workers", "1"]
+            with redirect_stdout(StringIO()) as stdout, redirect_stderr(StringIO()) as stderr:
+                self.assertEqual(cli_main(args), 1)
+            self.assertIn("Exported 7 image(s)", stdout.getvalue())
+            self.assertIn("SKU1.zip: cannot export", stderr.getvalue())
+            self.assertIn("SKU2.zip: cannot export", stderr.getvalue())
+            self.assertIn("SKU4.zip: missing image(s)", stderr.getvalue())
+            self.assertEqual(sorted(p.name for p in dest.iterdir()), ["SKU3.zip"])
+
+    def test_export_requires_rendered_images(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            out = Path(td) / "out"
+            generate_product_package(make_product("SKU1"), out, batch_id=None)
+            with redirect_stdout(StringIO()), redirect_stderr(StringIO()) as stderr:
+                code = cli_main(["export", "--out", str(out), "--dest", str(Path(td) / "x")])
+            self.assertEqual(code, 1)
+            self.assertIn("run render (and compose) first", stderr.getvalue())
+            self.assertEqual(list((Path(td) / "x").iterdir()), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
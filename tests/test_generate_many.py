@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from io import StringIO
+from pathlib import Path
+
+from mvp_image_workflow.cli import main as cli_main
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+EXAMPLE_CSV = REPO_ROOT / "examples" / "products_minimum.csv"
+
+
+class TestGenerateMany(unittest.TestCase):
+    def test_jobs_csv_runs_every_batch_and_reports_failures(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            (root / "a.csv").write_text(EXAMPLE_CSV.read_text(encoding="utf-8"), encoding="utf-8")
+            (root / "bad.csv").write_text("product_id\n", encoding="utf-8")
+            (root / "jobs.csv").write_text(
+                "input,out,batch_id\na.csv,out/a,B1\nbad.csv,out/bad,\na.csv,out/a2,\n", encoding="utf-8"
+            )
+            out, err = StringIO(), StringIO()
+            with redirect_stdout(out), redirect_stderr(err):
+                code = cli_main(["generate-many", "--jobs", str(root / "jobs.csv"), "--batch-id", "B0"])
+            self.assertEqual(code, 1)
+            self.assertIn("Ran 3 batch(es): 2 ok, 1 failed", out.getvalue())
+            summaries = [line for line in out.getvalue().splitlines() if line.startswith("Generated ")]
+            self.assertEqual(len(summaries), 2)
+            self.assertIn("bad.csv", err.getvalue())
+
+            manifest = json.loads((root / "out" / "a" / "SKU123" / "manifest.json").read_text(encoding="utf-8"))
+            self.assertEqual(manifest["batch_id"], "B1")
+            manifest = json.loads((root / "out" / "a2" / "SKU123" / "manifest.json").read_text(encoding="utf-8"))
+            self.assertEqual(manifest["batch_id"], "B0")
+            self.assertFalse((root / "out" / "bad").exists())
+
+    def test_input_dir_writes_one_root_per_catalog(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            cats = root / "catalogs"
+            cats.mkdir()
+            for name in ("supplier_a", "supplier_b", "supplier_c"):
+                (cats / f"{name}.csv").write_text(EXAMPLE_CSV.read_text(encoding="utf-8"), encoding="utf-8")
+            argv = ["generate-many", "--input-dir", str(cats), "--out", str(root / "out"), "--workers", "2"]
+            with redirect_stdout(StringIO()):
+                self.assertEqual(cli_main(argv), 0)
+                for name in ("supplier_a", "supplier_b", "supplier_c"):
+                    self.assertEqual(cli_main(["validate", "--out", str(root / "out" / name)]), 0)
+
+            with redirect_stderr(StringIO()):
+                self.assertEqual(cli_main(["generate-many", "--input-dir", str(cats)]), 2)
+
+    def test_validate_does_not_import_unrelated_commands(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            out = Path(td) / "out"
+            with redirect_stdout(StringIO()):
+                self.assertEqual(cli_main(["generate", "--input", str(EXAMPLE_CSV), "--out", str(out)]), 0)
+            script = (
+                "import sys\n"
+                "from mvp_image_workflow.cli import main\n"
+                "assert main(['validate', '--out', sys.argv[1]]) == 0\n"
+                "print('\\n'.join(sys.modules))\n"
+            )
+            proc = subprocess.run(
+                [sys.executable, "-c", script, str(out)], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+            )
+            loaded = set(proc.stdout.split())
+            for heavy in (
+                "http.client",
+                "sqlite3",
+                "zipfile",
+                "mvp_image_workflow.render",
+                "mvp_image_workflow.qcledger",
+                "mvp_image_workflow.jobqueue",
+                "mvp_image_workflow.contactsheet",
+                "mvp_image_workflow.generator",
+            ):
+                self.assertNotIn(heavy, loaded)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import json
+import random
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from io import StringIO
+from pathlib import Path
+
+from mvp_image_workflow.cli import main as cli_main
+from mvp_image_workflow.generator import generate_product_package
+from mvp_image_workflow.imagecheck import IMAGE_QC_FILE, analyze_image
+from mvp_image_workflow.png import encode_png
+from mvp_image_workflow.stubserver import stub_png
+
+from support import make_product
+
+SIZE = 600
+MARGIN = 60
+
+
+def _background(
+    bar: bytes = b"\xf5\xf5\xf5", product_x: int | None = None, noisy: bool = False, two_tone: bool = False
+) -> bytes:
+    rng = random.Random(7)
+    bar_top = SIZE - round(SIZE * 0.3)
+    pixels = bytearray()
+    for y in range(SIZE):
+        if y < bar_top:
+            row = bytearray(b"\x50\x60\x70" * SIZE)
+            if product_x is not None and 150 <= y < 350:
+                row[product_x * 3:(product_x + 200) * 3] = b"\x10\x10\x10" * 200
+        elif noisy:
+            row = bytearray(rng.randrange(256) for _ in range(SIZE * 3))
+        elif two_tone:
+            row = bytearray(b"\x14" * (SIZE // 2 * 3) + b"\xf0" * (SIZE // 2 * 3))
+        else:
+            row = bytearray(bar * SIZE)
+        pixels += row
+    return encode_png(SIZE, SIZE, bytes(pixels))
+
+
+class TestAnalyzeImage(unittest.TestCase):
+    def test_clean_background_passes(self) -> None:
+        problems, metrics = analyze_image(_background(), margin=MARGIN)
+        self.assertEqual(problems, [])
+        self.assertEqual(metrics["text_color"], [24, 24, 24])
+        self.assertGreater(metrics["contrast"], 10)
+        self.assertEqual(metrics["local_variance"], 0)
+
+    def test_text_colour_follows_the_bar(self) -> None:
+        problems, metrics = analyze_image(_background(bar=b"\x30\x30\x30"), margin=MARGIN)
+        self.assertEqual(problems, [])
+        self.assertEqual(metrics["text_color"], [250, 250, 250])
+
+    def test_two_tone_bar_fails_contrast(self) -> None:
+        problems, metrics = analyze_image(_background(two_tone=True), margin=MARGIN)
+        self.assertAlmostEqual(metrics["low_contrast_share"], 0.5, places=2)
+        self.assertTrue(any("too close to the text colour" in p for p in problems))
+
+    def test_busy_bar_fails_cleanliness(self) -> None:
+        problems, _ = analyze_image(_background(noisy=True), margin=MARGIN)
+        self.assertTrue(any("not clean" in p for p in problems))
+
+    def test_product_in_left_margin_is_detected(self) -> None:
+        problems, metrics = analyze_image(_background(product_x=20), margin=MARGIN)
+        self.assertEqual(len(problems), 1)
+        self.assertTrue(problems[0].startswith("content intrudes into the left margin"))
+        self.assertGreater(metrics["margin_intrusion"]["left"], 0.3)
+        self.assertEqual(metrics["margin_intrusion"]["right"], 0)
+        # Same product kept inside the margins passes.
+        self.assertEqual(analyze_image(_background(product_x=200), margin=MARGIN)[0], [])
+
+    def test_row_chunk_size_does_not_change_results(self) -> None:
+        data = _background(product_x=20, noisy=True)
+        self.assertEqual(analyze_image(data, margin=MARGIN, chunk_rows=7), analyze_image(data, margin=MARGIN))
+
+
+class TestCheckImagesCommand(unittest.TestCase):
+    def test_check_images_writes_report_and_fails_bad_backgrounds(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            out = Path(td) / "out"
+            for pid in ("SKU1", "SKU2"):
+                generate_product_package(make_product(pid), out, batch_id=None)
+            for pid in ("SKU1", "SKU2"):
+                for category in ("spec", "howto"):
+                    d = out / pid / category / "backgrounds"
+                    d.mkdir(parents=True)
+                    for n in ("01", "02"):
+                        (d / f"{pid}_{category}_{n}.png").write_bytes(stub_png(category, f"{pid}{n}"))
+            bad = out / "SKU2" / "howto" / "backgrounds" / "SKU2_howto_02.png"
+            bad.write_bytes(_background(noisy=True))
+
+            with redirect_stdout(StringIO()) as stdout, redirect_stderr(StringIO()) as stderr:
+                code = cli_main(["check-images", "--out", str(out), "--workers", "2"])
+            self.assertEqual(code, 1)
+            self.assertIn("Checked 8 image(s) for 2 product(s)", stdout.getvalue())
+            self.assertIn("1 failed", stdout.getvalue())
+            self.assertIn("FAIL: SKU2/howto/backgrounds/SKU2_howto_02.png: ", stderr.getvalue())
+            self.assertIn("info area is not clean", stderr.getvalue())
+
+            report = json.loads((out / "SKU1" / IMAGE_QC_FILE).read_text(encoding="utf-8"))
+            self.assertTrue(report["passed"])
+            self.assertEqual(len(report["images"]), 4)
+            self.assertFalse(json.loads((out / "SKU2" / IMAGE_QC_FILE).read_text(encoding="utf-8"))["passed"])
+
+            bad.write_bytes(stub_png("howto", "fixed"))
+            with redirect_stdout(StringIO()) as stdout:
+                self.assertEqual(cli_main(["check-images", "--out", str(out), "--workers", "1"]), 0)
+            self.assertIn("Checked 1 image(s) for 2 product(s) under", stdout.getvalue())
+            self.assertIn("(7 unchanged, 0 failed)", stdout.getvalue())
+
+            # A report that is valid JSON but not an object is treated like no report.
+            (out / "SKU1" / IMAGE_QC_FILE).write_text("[]", encoding="utf-8")
+            with redirect_stdout(StringIO()) as stdout:
+                self.assertEqual(cli_main(["check-images", "--out", str(out), "--workers", "1"]), 0)
+            self.assertIn("Checked 4 image(s) for 2 product(s) under", stdout.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
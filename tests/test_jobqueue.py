@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import json
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+
+from mvp_image_workflow import jobqueue
+from mvp_image_workflow.cli import main as cli_main
+from mvp_image_workflow.jobqueue import JobQueue, LeaseLost, _LeaseSink, run_worker
+from mvp_image_workflow.storage import LocalSink
+
+from support import make_product
+
+
+class TestJobQueue(unittest.TestCase):
+    def test_workers_drain_queue_and_report_status(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            db = root / "queue.sqlite"
+            out = root / "out"
+            products = [make_product(f"SKU{i}") for i in range(12)]
+            with JobQueue(db) as q:
+                self.assertEqual(q.enqueue(products, out, batch_id="B1"), 12)
+                # Identical re-enqueue of pending jobs just resets them; nothing is duplicated.
+                q.enqueue(products, out, batch_id="B1")
+                self.assertEqual(q.status()["depth"], 12)
+
+            results: dict[str, tuple[int, int]] = {}
+
+            def work(name: str) -> None:
+                with JobQueue(db) as q:
+                    results[name] = run_worker(q, name)
+
+            threads = [threading.Thread(target=work, args=(f"w{i}",)) for i in range(3)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+            self.assertEqual(sum(done for done, _failed in results.values()), 12)
+            self.assertEqual(len(list(out.glob("*/manifest.json"))), 12)
+            manifest = json.loads((out / "SKU3" / "manifest.json").read_text(encoding="utf-8"))
+            self.assertEqual(manifest["batch_id"], "B1")
+
+            with JobQueue(db) as q:
+                status = q.status()
+                self.assertEqual(status["depth"], 0)
+                self.assertEqual(status["states"]["done"], 12)
+                self.assertEqual(sum(w["done"] for w in status["workers"]), 12)
+                # Finished jobs with unchanged input stay done when enqueued again.
+                self.assertEqual(q.enqueue(products[:2], out, batch_id="B1"), 0)
+
+            with redirect_stdout(StringIO()) as buf:
+                self.assertEqual(cli_main(["status", "--db", str(db)]), 0)
+            self.assertIn("Queue depth: 0", buf.getvalue())
+
+    def test_expired_lease_is_reclaimed_and_failures_are_retried(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            db = root / "queue.sqlite"
+            blocked = root / "blocked"
+            blocked.write_text("not a dir", encoding="utf-8")
+
+            with JobQueue(db) as q:
+                q.enqueue([make_product("SKU1")], root / "out", batch_id=None)
+                q.enqueue([make_product("SKU2")], blocked, batch_id=None)
+
+                crashed = q.claim("crashed", lease_seconds=-1, max_attempts=3)
+                self.assertIsNotNone(crashed)
+                self.assertEqual(crashed.product.product_id, "SKU1")
+
+                done, failed = run_worker(q, "w2", max_attempts=2)
+                self.assertEqual((done, failed), (1, 2))
+                # The crashed worker's late completion is ignored; the job already belongs to w2.
+                self.assertFalse(q.complete(crashed, "crashed"))
+
+                states = q.status()["states"]
+                self.assertEqual(states["done"], 1)
+                self.assertEqual(states["failed"], 1)
+
+    def test_batches_sharing_a_sku_are_separate_jobs(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            with JobQueue(root / "q.sqlite") as q:
+                self.assertEqual(q.enqueue([make_product("SKU1")], root / "b1", batch_id="B1"), 1)
+                self.assertEqual(q.enqueue([make_product("SKU1")], root / "b2", batch_id="B2"), 1)
+                self.assertEqual(q.enqueue([make_product("SKU1")], root / "none", batch_id=None), 1)
+                self.assertEqual(q.status()["depth"], 3)
+                self.assertEqual(run_worker(q, "w1"), (3, 0))
+            for folder, batch_id in (("b1", "B1"), ("b2", "B2"), ("none", None)):
+                manifest = json.loads((root / folder / "SKU1" / "manifest.json").read_text(encoding="utf-8"))
+                self.assertEqual(manifest["batch_id"], batch_id)
+
+    def test_lease_is_renewed_while_writing_and_lost_lease_stops_the_writer(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            with JobQueue(root / "q.sqlite") as q:
+                q.enqueue([make_product("SKU1")], root / "out", batch_id="B1")
+                job = q.claim("w1", lease_seconds=-1, max_attempts=3)
+                sink = _LeaseSink(LocalSink(root / "out"), q, job, "w1", lease_seconds=300)
+                sink._renewed -= 300  # a third of the lease has passed since the claim
+                sink.write_bytes("SKU1/a.txt", b"a")
+                self.assertIsNone(q.claim("w2", lease_seconds=300, max_attempts=3))
+
+                self.assertTrue(q.renew(job, "w1", lease_seconds=-1))
+                stolen = q.claim("w2", lease_seconds=300, max_attempts=3)
+                self.assertIsNotNone(stolen)
+                sink._renewed -= 300
+                with self.assertRaises(LeaseLost):
+                    sink.write_bytes("SKU1/b.txt", b"b")
+                self.assertTrue(q.complete(stolen, "w2"))
+                self.assertFalse(q.complete(job, "w1"))
+
+    def test_worker_survives_an_unexpected_error(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            with JobQueue(root / "q.sqlite") as q:
+                q.enqueue([make_product("SKU1"), make_product("SKU2")], root / "out", batch_id=None)
+                real = jobqueue.generate_product_package
+
+                def flaky(product, *args, **kwargs):
+                    if product.product_id == "SKU1":
+                        raise KeyError("prompt")
+                    return real(product, *args, **kwargs)
+
+                with mock.patch.object(jobqueue, "generate_product_package", side_effect=flaky):
+                    self.assertEqual(run_worker(q, "w1", max_attempts=1), (1, 1))
+                self.assertEqual(q.status()["states"]["failed"], 1)
+                self.assertEqual(q.status()["states"]["done"], 1)
+                error = q._conn.execute("SELECT last_error FROM jobs WHERE product_id = 'SKU1'").fetchone()[0]
+                self.assertEqual(error, "KeyError: 'prompt'")
+
+    def test_cli_enqueue_and_worker(self) -> None:
+        csv_path = Path(__file__).resolve().parents[1] / "examples" / "products_minimum.csv"
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            db = root / "q.sqlite"
+            with redirect_stdout(StringIO()):
+                self.assertEqual(
+                    cli_main(["enqueue", "--input", str(csv_path), "--out", str(root / "out"), "--db", str(db)]),
+                    0,
+                )
+                self.assertEqual(cli_main(["worker", "--db", str(db), "--worker-id", "w1"]), 0)
+                self.assertEqual(cli_main(["validate", "--out", str(root / "out")]), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
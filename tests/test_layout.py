@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from io import StringIO
+from pathlib import Path
+
+from mvp_image_workflow.cli import main as cli_main
+from mvp_image_workflow.font import BUILTIN_FONT
+from mvp_image_workflow.generator import generate_product_package
+from mvp_image_workflow.layout import (
+    CANVAS_SIZE,
+    LAYOUT_FILE,
+    MAX_SCALE,
+    MIN_SCALE,
+    font_metrics,
+    info_box,
+    layout_text,
+)
+
+from support import make_product
+
+
+class TestLayoutText(unittest.TestCase):
+    def setUp(self) -> None:
+        x0, y0, x1, y1 = info_box(CANVAS_SIZE, CANVAS_SIZE)
+        self.box_w, self.box_h = x1 - x0, y1 - y0
+
+    def test_short_text_gets_the_largest_scale(self) -> None:
+        layout = layout_text("Tips\n\n- Keep dry", self.box_w, self.box_h)
+        self.assertEqual(layout.scale, MAX_SCALE)
+        self.assertEqual(layout.lines, ("Tips", "", "- Keep dry"))
+        self.assertFalse(layout.overflow)
+
+    def test_eight_long_specs_wrap_and_shrink_to_fit(self) -> None:
+        specs = [f"- Spec {i}: " + "durable food-grade stainless steel body " * 3 for i in range(6)]
+        layout = layout_text("\n".join(["Insulated Tumbler", "Dimensions: 9 x 9 x 21 cm", *specs]), self.box_w, self.box_h)
+        self.assertFalse(layout.overflow)
+        self.assertGreaterEqual(layout.scale, MIN_SCALE)
+        self.assertLess(layout.scale, MAX_SCALE)
+        self.assertGreater(len(layout.lines), 10)
+        metrics = font_metrics(BUILTIN_FONT, layout.scale)
+        self.assertTrue(all(metrics.width(line) <= self.box_w for line in layout.lines))
+        self.assertLessEqual(layout.height, self.box_h)
+        # Continuation lines of a bullet hang under its text.
+        wrapped = layout.lines[layout.lines.index(next(l for l in layout.lines if l.startswith("- Spec 0"))) + 1]
+        self.assertTrue(wrapped.startswith("  ") and not wrapped.startswith("  -"))
+
+    def test_text_that_cannot_fit_is_clipped_at_the_minimum_scale(self) -> None:
+        layout = layout_text("\n".join(f"Step {i}: do the thing" for i in range(40)), self.box_w, self.box_h)
+        self.assertTrue(layout.overflow)
+        self.assertEqual(layout.scale, MIN_SCALE)
+        self.assertEqual(len(layout.lines) + layout.clipped_lines, 40)
+
+    def test_words_wider_than_the_box_are_broken(self) -> None:
+        layout = layout_text("X" * 200, self.box_w, self.box_h)
+        self.assertEqual("".join(layout.lines), "X" * 200)
+        self.assertGreater(len(layout.lines), 1)
+
+
+class TestLayoutCommand(unittest.TestCase):
+    def test_layout_writes_meta_layout_and_reports_overflow(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            out = Path(td) / "out"
+            long_specs = dataclasses.replace(make_product("SKU2"), specs=tuple(f"Spec {i} " + "x" * 60 for i in range(8)))
+            generate_product_package(make_product("SKU1"), out, batch_id=None)
+            generate_product_package(long_specs, out, batch_id=None)
+
+            with redirect_stdout(StringIO()) as stdout:
+                self.assertEqual(cli_main(["layout", "--out", str(out)]), 0)
+            self.assertIn("Laid out 8 text(s) for 2 product(s)", stdout.getvalue())
+            doc = json.loads((out / "SKU2" / LAYOUT_FILE).read_text(encoding="utf-8"))
+            self.assertEqual(doc["canvas"], [2000, 2000])
+            self.assertEqual(doc["box"], [120, 1440, 1880, 1880])
+            self.assertEqual(
+                sorted(doc["texts"]), ["texts/howto_01.txt", "texts/howto_02.txt", "texts/spec_01.txt", "texts/spec_02.txt"]
+            )
+            spec = doc["texts"]["texts/spec_01.txt"]
+            self.assertLess(spec["scale"], doc["texts"]["texts/howto_02.txt"]["scale"])
+            with redirect_stdout(StringIO()):
+                self.assertEqual(cli_main(["verify", "--out", str(out), "--no-cache"]), 0)
+
+            with redirect_stdout(StringIO()) as stdout:
+                self.assertEqual(cli_main(["layout", "--out", str(out)]), 0)
+            self.assertIn("0 layout file(s) updated", stdout.getvalue())
+
+            (out / "SKU1" / "texts" / "howto_01.txt").write_text(
+                "\n".join(f"Step {i}: do the thing" for i in range(40)) + "\n", encoding="utf-8"
+            )
+            with redirect_stdout(StringIO()) as stdout, redirect_stderr(StringIO()) as stderr:
+                self.assertEqual(cli_main(["layout", "--out", str(out)]), 1)
+            self.assertIn("1 overflowing", stdout.getvalue())
+            self.assertIn("OVERFLOW: SKU1/texts/howto_01.txt", stderr.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
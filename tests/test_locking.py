@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+
+from mvp_image_workflow.cli import main as cli_main
+from mvp_image_workflow.generator import generate_product_package
+from mvp_image_workflow.locking import LOCK_DIR_ENV, file_lock, lock_path, locks_dir, product_lock_name
+from mvp_image_workflow.storage import LocalSink
+from mvp_image_workflow.util import ValidationError
+
+from support import make_product
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+class TestLocking(unittest.TestCase):
+    def test_lock_times_out_while_held_by_another_process(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            path = lock_path(Path(td) / "out", product_lock_name("SKU1"))
+            holder = subprocess.Popen(
+                [
+                    sys.executable,
+                    "-c",
+                    "import sys, time\n"
+                    "from pathlib import Path\n"
+                    "from mvp_image_workflow.locking import file_lock\n"
+                    "with file_lock(Path(sys.argv[1])):\n"
+                    "    print('locked', flush=True)\n"
+                    "    time.sleep(2)\n",
+                    str(path),
+                ],
+                cwd=REPO_ROOT,
+                stdout=subprocess.PIPE,
+                text=True,
+            )
+            try:
+                self.assertEqual(holder.stdout.readline().strip(), "locked")
+                start = time.monotonic()
+                with self.assertRaises(TimeoutError):
+                    with file_lock(path, timeout=0.2):
+                        pass
+                self.assertLess(time.monotonic() - start, 1.5)
+            finally:
+                holder.wait()
+                holder.stdout.close()
+            with file_lock(path, timeout=0.2):
+                pass
+
+    def test_validation_error_propagates_through_lock(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            with self.assertRaises(ValidationError):
+                with file_lock(Path(td) / "x.lock"):
+                    raise ValidationError("bad input")
+
+    def test_lock_excludes_threads_of_one_process(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            path = Path(td) / "x.lock"
+            inside: list[int] = []
+            overlaps: list[int] = []
+
+            def critical() -> None:
+                for _ in range(20):
+                    with file_lock(path):
+                        inside.append(1)
+                        if len(inside) > 1:
+                            overlaps.append(1)
+                        time.sleep(0.001)
+                        inside.pop()
+
+            threads = [threading.Thread(target=critical) for _ in range(4)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            self.assertEqual(overlaps, [])
+
+    def test_concurrent_generate_runs_share_one_output_root(self) -> None:
+        csv_path = REPO_ROOT / "examples" / "products_minimum.csv"
+        with tempfile.TemporaryDirectory() as td:
+            out = Path(td) / "out"
+            codes: list[int] = []
+
+            def run(batch: str) -> None:
+                with redirect_stdout(StringIO()):
+                    for _ in range(5):
+                        codes.append(
+                            cli_main(["generate", "--input", str(csv_path), "--out", str(out), "--batch-id", batch])
+                        )
+
+            threads = [threading.Thread(target=run, args=(b,)) for b in ("A", "B", "C")]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+            self.assertEqual(codes, [0] * 15)
+            with redirect_stdout(StringIO()):
+                self.assertEqual(cli_main(["validate", "--out", str(out)]), 0)
+            self.assertTrue((out / "changes.json").is_file())
+            self.assertEqual(list(out.glob("**/*.tmp")), [])
+
+    def test_generate_waits_for_product_lock(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            out = Path(td) / "out"
+            with file_lock(lock_path(out, product_lock_name("SKU123"))):
+                done = threading.Event()
+                errors: list[BaseException] = []
+
+                def gen() -> None:
+                    try:
+                        generate_product_package(make_product(), out, None, sink=LocalSink(out, lock_timeout=0.1))
+                    except BaseException as e:
+                        errors.append(e)
+                    done.set()
+
+                t = threading.Thread(target=gen)
+                t.start()
+                t.join()
+            self.assertTrue(done.is_set())
+            self.assertEqual(len(errors), 1)
+            self.assertIsInstance(errors[0], TimeoutError)
+            self.assertFalse((out / "SKU123" / "manifest.json").exists())
+
+    def test_lock_files_stay_outside_the_output_root(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            out = root / "out"
+            csv_path = REPO_ROOT / "examples" / "products_minimum.csv"
+            with redirect_stdout(StringIO()):
+                self.assertEqual(cli_main(["generate", "--input", str(csv_path), "--out", str(out)]), 0)
+            self.assertEqual([p for p in out.rglob("*") if p.suffix == ".lock" or p.name.startswith(".")], [])
+            path = lock_path(out, product_lock_name("SKU123"))
+            self.assertNotIn(out.resolve(), path.resolve().parents)
+            self.assertEqual(path.parent, (root / "out.state" / "locks").resolve())
+            self.assertNotEqual(lock_path(root / "other", product_lock_name("SKU123")), path)
+
+            os.environ[LOCK_DIR_ENV] = str(root / "shared-locks")
+            try:
+                self.assertEqual(lock_path(out, "root").parent.parent, root / "shared-locks")
+            finally:
+                del os.environ[LOCK_DIR_ENV]
+
+    def test_every_spelling_of_a_root_shares_one_lock_dir(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td).resolve()
+            out = root / "out"
+            out.mkdir()
+            (root / "link").symlink_to(out)
+            spellings = [out, f"{out}/", root / "link", root / "x" / ".." / "out", os.path.relpath(out)]
+            self.assertEqual({locks_dir(s) for s in spellings}, {root / "out.state" / "locks"})
+            os.environ[LOCK_DIR_ENV] = str(root / "shared-locks")
+            try:
+                self.assertEqual(len({locks_dir(s) for s in spellings}), 1)
+            finally:
+                del os.environ[LOCK_DIR_ENV]
+
+if __name__ == "__main__":
+    unittest.main()
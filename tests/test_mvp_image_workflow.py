@@ -1,9 +1,10 @@
 from __future__ import annotations
 
 import csv
+import json
 import tempfile
 import unittest
-from contextlib import redirect_stderr
+from contextlib import redirect_stderr, redirect_stdout
 from io import StringIO
 from pathlib import Path
 
@@ -14,6 +15,8 @@ from mvp_image_workflow.io_csv import read_products_csv
 from mvp_image_workflow.validator import validate_product_package
 from mvp_image_workflow.util import ValidationError
 
+EXAMPLE_CSV = Path(__file__).resolve().parents[1] / "examples" / "products_minimum.csv"
+
 
 class TestMvpImageWorkflow(unittest.TestCase):
     def test_generate_and_validate_minimum(self) -> None:
@@ -501,6 +504,51 @@ class TestMvpImageWorkflow(unittest.TestCase):
                 code = cli_main(["generate", "--input", str(csv_path), "--out", str(out_path)])
             self.assertEqual(code, 2)
 
+    def test_deterministic_generate_is_byte_reproducible(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            for name in ("a", "b", "a.zip", "b.zip"):
+                with redirect_stdout(StringIO()):
+                    code = cli_main(
+                        [
+                            "generate",
+                            "--input",
+                            str(EXAMPLE_CSV),
+                            "--out",
+                            str(root / name),
+                            "--source-date-epoch",
+                            "1766707200",
+                        ]
+                    )
+                self.assertEqual(code, 0)
+
+            files_a = sorted(p.relative_to(root / "a") for p in (root / "a").rglob("*") if p.is_file())
+            files_b = sorted(p.relative_to(root / "b") for p in (root / "b").rglob("*") if p.is_file())
+            self.assertEqual(files_a, files_b)
+            for rel in files_a:
+                self.assertEqual((root / "a" / rel).read_bytes(), (root / "b" / rel).read_bytes())
+                self.assertEqual((root / "a" / rel).stat().st_mtime, 1766707200)
+            self.assertEqual((root / "a.zip").read_bytes(), (root / "b.zip").read_bytes())
+
+            # A rerun into the same root changes nothing either.
+            with redirect_stdout(StringIO()):
+                code = cli_main(
+                    ["generate", "--input", str(EXAMPLE_CSV), "--out", str(root / "a"), "--source-date-epoch", "1766707200"]
+                )
+            self.assertEqual(code, 0)
+            rerun = sorted(p.relative_to(root / "a") for p in (root / "a").rglob("*") if p.is_file())
+            self.assertEqual(rerun, files_b)
+            # changes.json records the run against the previous one and is the documented exception.
+            for rel in rerun:
+                if rel != Path("changes.json"):
+                    self.assertEqual((root / "a" / rel).read_bytes(), (root / "b" / rel).read_bytes())
+            log = json.loads((root / "a" / "changes.json").read_text(encoding="utf-8"))
+            self.assertEqual(log["summary"]["unchanged"], 1)
+
+            manifest = (root / "a" / "SKU123" / "manifest.json").read_text(encoding="utf-8")
+            self.assertIn('"generated_at_utc": "2025-12-26T00:00:00+00:00"', manifest)
+            self.assertLess(manifest.index('"batch_id"'), manifest.index('"expected_outputs"'))
+
 
 if __name__ == "__main__":
     unittest.main()
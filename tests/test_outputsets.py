@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import json
+import tempfile
+import unittest
+from dataclasses import replace
+from pathlib import Path
+from unittest import mock
+
+from mvp_image_workflow import outputsets
+from mvp_image_workflow.generator import generate_product_package
+from mvp_image_workflow.io_csv import read_products_csv
+from mvp_image_workflow.layout import layout_package
+from mvp_image_workflow.outputsets import output_plan
+from mvp_image_workflow.renderjobs import iter_render_jobs
+from mvp_image_workflow.util import ValidationError
+from mvp_image_workflow.validator import validate_product_package
+
+from support import make_product
+
+
+def _fill_images(product_dir: Path) -> None:
+    manifest = json.loads((product_dir / "manifest.json").read_text(encoding="utf-8"))
+    for category, files in manifest["expected_outputs"].items():
+        for name in files:
+            (product_dir / manifest["paths"][f"{category}_dir"] / name).write_bytes(b"\x89PNG\r\n\x1a\n")
+
+
+class TestOutputSets(unittest.TestCase):
+    def test_minimum_plan(self) -> None:
+        plan = output_plan("minimum")
+        self.assertEqual(plan.counts, (("showcase", 3), ("spec", 2), ("howto", 2)))
+        self.assertEqual(
+            plan.expected_outputs("SKU1", "_B1")["spec"], ["SKU1_spec_01_B1.png", "SKU1_spec_02_B1.png"]
+        )
+        self.assertEqual(len(plan.required_files()), 11)
+        self.assertIs(output_plan(), plan)
+
+    def test_extended_set_generates_validates_and_renders(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            out = Path(td) / "out"
+            product = replace(
+                make_product("SKU1"), output_set="extended", dimensions_l="20", dimensions_w="8", dimensions_h="25"
+            )
+            product_dir = generate_product_package(product, out, batch_id=None)
+
+            manifest = json.loads((product_dir / "manifest.json").read_text(encoding="utf-8"))
+            self.assertEqual(
+                {c: len(files) for c, files in manifest["expected_outputs"].items()},
+                {"showcase": 6, "spec": 2, "size_chart": 2, "howto": 2},
+            )
+            self.assertEqual(manifest["paths"]["size_chart_dir"], "size_chart")
+            chart = (product_dir / "texts" / "size_chart.txt").read_text(encoding="utf-8")
+            self.assertIn("- Length: 20 cm (7.9 in)", chart)
+
+            validate_product_package(product_dir, require_images=False)
+            with self.assertRaisesRegex(ValidationError, "Missing expected image"):
+                validate_product_package(product_dir, require_images=True)
+            _fill_images(product_dir)
+            validate_product_package(product_dir, require_images=True)
+
+            jobs = list(iter_render_jobs(product_dir))
+            self.assertEqual(len(jobs), 12)
+            charts = [j for j in jobs if j.category == "size_chart"]
+            # Both size-chart shots overlay the same text source, which is laid out once.
+            self.assertEqual({j.text_source for j in charts}, {"texts/size_chart.txt"})
+            self.assertTrue(all("/size_chart/backgrounds/" in j.target for j in charts))
+            self.assertEqual(len(layout_package(product_dir)["texts"]), 5)
+
+    def test_new_set_is_data_only(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            data = json.loads(outputsets.OUTPUT_SETS_FILE.read_text(encoding="utf-8"))
+            data["output_sets"]["charts_only"] = {
+                "description": "one clean shot and a size chart",
+                "shots": [
+                    data["output_sets"]["minimum"]["shots"][0],
+                    {
+                        "category": "size_chart",
+                        "prompt": "size_chart_01.txt",
+                        "text": "size_chart.txt",
+                        "text_builder": "size_chart",
+                    },
+                ],
+            }
+            sets_file = root / "output_sets.json"
+            sets_file.write_text(json.dumps(data), encoding="utf-8")
+            csv_path = root / "products.csv"
+            csv_path.write_text(
+                "product_id,product_name_en,output_set,spec_1,spec_2,spec_3,step_1,step_2,step_3\n"
+                "SKU9,Desk Lamp,charts_only,a,b,c,d,e,f\n",
+                encoding="utf-8",
+            )
+
+            with mock.patch.object(outputsets, "OUTPUT_SETS_FILE", sets_file):
+                product = read_products_csv(csv_path)[0]
+                product_dir = generate_product_package(product, root / "out", batch_id=None)
+                self.assertEqual(sorted(p.name for p in (product_dir / "prompts").iterdir()),
+                                 ["showcase_01_clean_main.txt", "size_chart_01.txt"])
+                self.assertIn("(Required) Add dimensions", (product_dir / "texts" / "size_chart.txt").read_text())
+                _fill_images(product_dir)
+                validate_product_package(product_dir, require_images=True)
+
+                data["output_sets"]["charts_only"]["shots"][1]["text_builder"] = "nope"
+                sets_file.write_text(json.dumps(data), encoding="utf-8")
+                outputsets._load.cache_clear()
+                with self.assertRaisesRegex(ValidationError, "unknown text_builder 'nope'"):
+                    output_plan("charts_only")
+            outputsets._load.cache_clear()
+
+            csv_path.write_text(csv_path.read_text().replace("charts_only", "huge"), encoding="utf-8")
+            with self.assertRaisesRegex(ValidationError, r"Unsupported output_set 'huge' \(supported: minimum, extended\)"):
+                read_products_csv(csv_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
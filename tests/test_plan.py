@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from io import StringIO
+from pathlib import Path
+
+from mvp_image_workflow.cli import main as cli_main
+from mvp_image_workflow.plan import PlanSink
+from mvp_image_workflow.storage import LocalSink
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+EXAMPLE_CSV = REPO_ROOT / "examples" / "products_minimum.csv"
+
+
+def _plan(argv: list[str]) -> tuple[int, str]:
+    buf = StringIO()
+    with redirect_stdout(buf):
+        code = cli_main(argv)
+    return code, buf.getvalue()
+
+
+class TestGeneratePlan(unittest.TestCase):
+    def test_plan_classifies_against_existing_tree_without_writing(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            out = root / "out"
+            base = ["generate", "--input", str(EXAMPLE_CSV), "--out", str(out), "--source-date-epoch", "0"]
+
+            code, text = _plan([*base, "--plan"])
+            self.assertEqual(code, 0)
+            self.assertIn("create=1", text)
+            self.assertFalse(out.exists())
+
+            with redirect_stdout(StringIO()):
+                self.assertEqual(cli_main(base), 0)
+            before = {p: p.stat().st_mtime_ns for p in out.rglob("*")}
+
+            code, text = _plan([*base, "--plan"])
+            self.assertIn("unchanged=1", text)
+            self.assertIn("0 file(s) to write", text)
+
+            edited = root / "edited.csv"
+            edited.write_text(
+                EXAMPLE_CSV.read_text(encoding="utf-8").replace("Tumbler", "Mug"), encoding="utf-8"
+            )
+            plan_file = root / "plan.json"
+            code, _ = _plan(
+                ["generate", "--input", str(edited), "--out", str(out), "--source-date-epoch", "0",
+                 "--plan-out", str(plan_file)]
+            )
+            self.assertEqual(code, 0)
+            plan = json.loads(plan_file.read_text(encoding="utf-8"))
+            entry = plan["products"]["SKU123"]
+            self.assertEqual(entry["status"], "update")
+            self.assertEqual(entry["files"]["manifest.json"]["status"], "update")
+            self.assertGreater(plan["summary"]["files"]["unchanged"], 0)
+            self.assertEqual(entry["bytes_to_write"], plan["summary"]["bytes_to_write"])
+
+            self.assertEqual({p: p.stat().st_mtime_ns for p in out.rglob("*")}, before)
+
+    def test_plan_reports_conflicts(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            out = root / "out"
+            (out / "sku123").mkdir(parents=True)
+            argv = ["generate", "--input", str(EXAMPLE_CSV), "--out", str(out), "--plan-out", "-"]
+            code, text = _plan(argv)
+            self.assertEqual(code, 1)
+            entry = json.loads(text)["products"]["SKU123"]
+            self.assertEqual(entry["status"], "conflict")
+            self.assertIn("only in case", entry["reason"])
+
+            (out / "sku123").rmdir()
+            (out / "SKU123").mkdir()
+            manifest = {"product": {"product_id": "SKU 123"}}
+            (out / "SKU123" / "manifest.json").write_text(json.dumps(manifest), encoding="utf-8")
+            code, text = _plan(argv)
+            self.assertEqual(code, 1)
+            self.assertIn("collision", json.loads(text)["products"]["SKU123"]["reason"])
+
+            with redirect_stderr(StringIO()):
+                self.assertEqual(cli_main([*argv, "--metrics-file", str(root / "m.prom")]), 2)
+            self.assertEqual(sorted(p.name for p in out.rglob("*")), ["SKU123", "manifest.json"])
+
+    def test_index_falls_back_to_the_root_for_unlisted_files(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            out = Path(td) / "out"
+            (out / "SKU1").mkdir(parents=True)
+            (out / "SKU1" / "old.txt").write_bytes(b"same")
+            (out / "SKU1" / "listed.txt").write_bytes(b"ignored")
+            index = {"SKU1": {"listed.txt": {"size": 4, "sha256": hashlib.sha256(b"same").hexdigest()}}}
+            sink = PlanSink(LocalSink(out), index=index)
+            for name in ("old.txt", "listed.txt", "new.txt"):
+                sink.write_bytes(f"SKU1/{name}", b"same")
+            files = sink.product_plan("SKU1")["files"]
+            self.assertEqual(
+                {name: f["status"] for name, f in files.items()},
+                {"old.txt": "unchanged", "listed.txt": "unchanged", "new.txt": "create"},
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import csv
+import json
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from dataclasses import replace
+from io import StringIO
+from pathlib import Path
+
+from mvp_image_workflow.cli import main as cli_main
+from mvp_image_workflow.generator import generate_product_package
+from mvp_image_workflow.io_csv import PRODUCT_CSV_FIELDS, product_to_csv_row, read_products_csv
+from mvp_image_workflow.qcledger import QCLedger, package_review, parse_review_time
+
+from support import make_product
+
+
+class TestQCLedger(unittest.TestCase):
+    def _packages(self, out: Path) -> list:
+        products = [
+            replace(make_product(f"SKU{i}"), style_pack="minimal_white" if i < 4 else "warm_lifestyle")
+            for i in range(6)
+        ]
+        for p in products:
+            generate_product_package(p, out, batch_id="B1" if p.product_id < "SKU3" else "B2")
+        return products
+
+    def test_rates_rejects_and_latest_verdict(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            out = root / "out"
+            self._packages(out)
+            oct1 = parse_review_time("2026-10-01")
+            with QCLedger(root / "qc.sqlite") as ledger:
+                ledger.record(
+                    [
+                        package_review(out, "SKU0", "reject", ["spec_value_error"], reviewed_at=oct1 + 10),
+                        package_review(out, "SKU1", "pass", reviewed_at=oct1 + 20),
+                        package_review(out, "SKU3", "reject", ["spec_value_error", "low_realism"], reviewed_at=oct1),
+                        package_review(out, "SKU4", "reject", ["low_realism"], reviewed_at=oct1 - 86400),
+                        package_review(out, "SKU5", "pass", reviewed_at=oct1 + 30),
+                    ]
+                )
+                # A later pass clears SKU0; recorded out of order, an older reject does not override it.
+                ledger.record(
+                    [
+                        package_review(out, "SKU0", "pass", reviewed_at=oct1 + 100),
+                        package_review(out, "SKU0", "reject", ["low_realism"], reviewed_at=oct1 + 50),
+                    ]
+                )
+
+                rates = {r.key: (r.rejects, r.reviews) for r in ledger.reject_rates("style_pack", since=oct1)}
+                self.assertEqual(rates, {"minimal_white": (3, 5), "warm_lifestyle": (0, 1)})
+                by_tag = {r.key: r.rejects for r in ledger.reject_rates("tag")}
+                self.assertEqual(by_tag, {"spec_value_error": 2, "low_realism": 3})
+
+                spec_b2 = ledger.rejects("spec_value_error", batch_id="B2")
+                self.assertEqual([r.product_id for r in spec_b2], ["SKU3"])
+                self.assertEqual(spec_b2[0].tags, ("low_realism", "spec_value_error"))
+                self.assertEqual(ledger.rejected_products(), ["SKU3", "SKU4"])
+                self.assertEqual(ledger.rejected_products(since=oct1), ["SKU3"])
+                self.assertEqual(ledger.rejected_products("low_realism", batch_id="B2"), ["SKU3", "SKU4"])
+
+    def test_cli_record_report_and_regeneration_csv(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            out = root / "out"
+            products = self._packages(out)
+            db = str(root / "qc.sqlite")
+            catalog = root / "catalog.csv"
+            with catalog.open("w", encoding="utf-8", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=PRODUCT_CSV_FIELDS)
+                writer.writeheader()
+                writer.writerows(product_to_csv_row(p) for p in products)
+            reviews = root / "reviews.csv"
+            reviews.write_text(
+                "product_id,verdict,tags,reviewer,note,reviewed_at\n"
+                "SKU1,reject,spec_value_error;text_not_english,anna,wrong capacity,2026-10-02T09:00:00\n"
+                "SKU2,pass,,anna,,2026-10-02T09:05:00\n"
+                "SKU4,reject,background_too_similar,li,,2026-10-03\n",
+                encoding="utf-8",
+            )
+
+            with redirect_stdout(StringIO()) as buf:
+                self.assertEqual(cli_main(["qc", "record", "--db", db, "--out", str(out), "--csv", str(reviews)]), 0)
+                self.assertEqual(
+                    cli_main(
+                        ["qc", "record", "--db", db, "--out", str(out), "--product-id", "SKU5", "--verdict", "pass"]
+                    ),
+                    0,
+                )
+            self.assertIn("Recorded 3 QC review(s)", buf.getvalue())
+
+            with redirect_stdout(StringIO()) as buf:
+                self.assertEqual(cli_main(["qc", "report", "--db", db, "--by", "batch_id", "--json"]), 0)
+            rates = {r["key"]: r for r in json.loads(buf.getvalue())}
+            self.assertEqual((rates["B1"]["rejects"], rates["B1"]["reviews"]), (1, 2))
+            self.assertEqual(rates["B2"]["rate"], 0.5)
+
+            with redirect_stdout(StringIO()) as buf, redirect_stderr(StringIO()):
+                cli_main(["qc", "report", "--db", db, "--list", "--tag", "spec_value_error", "--batch-id", "B1"])
+            self.assertIn("SKU1", buf.getvalue())
+            self.assertIn("wrong capacity", buf.getvalue())
+
+            rerun = root / "rerun.csv"
+            with redirect_stdout(StringIO()):
+                code = cli_main(
+                    ["qc", "report", "--db", db, "--input", str(catalog), "--rejected-csv", str(rerun),
+                     "--rejected-out", str(root / "rejected.txt")]
+                )
+            self.assertEqual(code, 0)
+            self.assertEqual((root / "rejected.txt").read_text(encoding="utf-8"), "SKU1\nSKU4\n")
+            self.assertEqual([p.product_id for p in read_products_csv(rerun)], ["SKU1", "SKU4"])
+
+            # Tags come from the package's qc_checklist.json; a reject needs at least one.
+            with redirect_stderr(StringIO()) as err:
+                bad = ["qc", "record", "--db", db, "--out", str(out), "--product-id", "SKU5", "--verdict", "reject"]
+                self.assertEqual(cli_main(bad + ["--tag", "ugly"]), 2)
+                self.assertEqual(cli_main(bad), 2)
+            self.assertIn("Unknown reject tag(s)", err.getvalue())
+            self.assertIn("needs at least one reject tag", err.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
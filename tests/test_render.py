@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+import tempfile
+import time
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+
+from mvp_image_workflow.checksums import CHECKSUM_FILE, parse_checksums
+from mvp_image_workflow.cli import main as cli_main
+from mvp_image_workflow.generator import generate_product_package
+from mvp_image_workflow.locking import state_dir
+from mvp_image_workflow.png import PNG_SIGNATURE
+from mvp_image_workflow.render import RENDER_JOURNAL, HttpBackend, RenderBackend, TokenBucket, render_jobs
+from mvp_image_workflow.renderjobs import iter_render_jobs
+from mvp_image_workflow.stubserver import StubRenderServer
+
+from support import make_product
+
+
+class _CrashAfter(RenderBackend):
+    def __init__(self, inner: RenderBackend, limit: int) -> None:
+        self.inner = inner
+        self.limit = limit
+        self.calls = 0
+
+    def render(self, job):
+        self.calls += 1
+        if self.calls > self.limit:
+            raise KeyboardInterrupt
+        return self.inner.render(job)
+
+
+class _PlainBackend(RenderBackend):
+    """Does the whole request in render() and returns the image, as plugin backends may."""
+
+    def __init__(self, fail: dict[str, BaseException]) -> None:
+        self.fail = fail
+
+    def render(self, job):
+        error = self.fail.pop(job.target, None)
+        if error is not None:
+            raise error
+        return [PNG_SIGNATURE + b"plain"]
+
+
+class TestRender(unittest.TestCase):
+    def test_render_against_stub_server_with_retries_and_pooling(self) -> None:
+        with tempfile.TemporaryDirectory() as td, StubRenderServer(size=32, fail_first=3) as server:
+            out = Path(td) / "out"
+            for pid in ("SKU1", "SKU2", "SKU3"):
+                generate_product_package(make_product(pid), out, batch_id=None)
+
+            with redirect_stdout(StringIO()) as stdout:
+                code = cli_main(
+                    ["render", "--out", str(out), "--endpoint-url", server.endpoint,
+                     "--concurrency", "3", "--retry-backoff", "0"]
+                )
+            self.assertEqual(code, 0, stdout.getvalue())
+            self.assertIn("Rendered 21 image(s)", stdout.getvalue())
+            self.assertIn("3 retries", stdout.getvalue())
+            self.assertEqual(server.requests, 24)
+            # Keep-alive: a few connections serve all requests (503 replies keep the connection too).
+            self.assertLessEqual(server.connections, 6)
+
+            product_dir = out / "SKU2"
+            self.assertTrue((product_dir / "showcase" / "SKU2_showcase_01.png").read_bytes().startswith(PNG_SIGNATURE))
+            # Shots with a text overlay arrive as backgrounds; compose writes the final image.
+            background = product_dir / "spec" / "backgrounds" / "SKU2_spec_01.png"
+            self.assertTrue(background.read_bytes().startswith(PNG_SIGNATURE))
+            self.assertFalse((product_dir / "spec" / "SKU2_spec_01.png").exists())
+            recorded = parse_checksums((product_dir / CHECKSUM_FILE).read_text(encoding="utf-8"))
+            self.assertIn("spec/backgrounds/SKU2_spec_01.png", recorded)
+            self.assertEqual([p.name for p in out.rglob(".*.part")], [])
+
+            with redirect_stdout(StringIO()) as stdout:
+                self.assertEqual(cli_main(["render", "--out", str(out), "--endpoint-url", server.endpoint]), 0)
+            self.assertIn("Rendered 0 image(s)", stdout.getvalue())
+            self.assertIn("skipped 21", stdout.getvalue())
+
+    def test_resume_after_crash_renders_only_the_rest(self) -> None:
+        with tempfile.TemporaryDirectory() as td, StubRenderServer(size=16) as server:
+            out = Path(td) / "out"
+            product_dir = generate_product_package(make_product("SKU1"), out, batch_id=None)
+            jobs = list(iter_render_jobs(product_dir))
+
+            backend = HttpBackend(server.endpoint)
+            try:
+                with self.assertRaises(KeyboardInterrupt):
+                    render_jobs(out, jobs, _CrashAfter(backend, 3), concurrency=1)
+                journal = (state_dir(out) / RENDER_JOURNAL).read_text(encoding="utf-8").splitlines()
+                self.assertEqual(len(journal), 3)
+
+                # A changed prompt invalidates its journal entry.
+                prompt = product_dir / jobs[0].prompt_file
+                prompt.write_text(prompt.read_text(encoding="utf-8") + "Extra note.\n", encoding="utf-8")
+                result = render_jobs(out, list(iter_render_jobs(product_dir)), backend, concurrency=2)
+            finally:
+                backend.close()
+            self.assertEqual((result.rendered, result.skipped, result.errors), (5, 2, []))
+            entries = [json.loads(line) for line in (state_dir(out) / RENDER_JOURNAL).read_text(encoding="utf-8").splitlines()]
+            self.assertEqual(len({e["target"] for e in entries}), 7)
+
+    def test_plain_backend_errors_fail_one_job_and_are_retried(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            out = Path(td) / "out"
+            product_dir = generate_product_package(make_product("SKU1"), out, batch_id=None)
+            jobs = list(iter_render_jobs(product_dir))
+            backend = _PlainBackend({jobs[0].target: OSError("connection reset"), jobs[1].target: ValueError("bad job")})
+            result = render_jobs(out, jobs, backend, concurrency=2, retry_backoff=0)
+            self.assertEqual((result.rendered, result.retries), (6, 1))
+            self.assertEqual(len(result.errors), 1)
+            self.assertIn(f"{jobs[1].target}: bad job", result.errors[0])
+
+    def test_replaced_source_image_is_rendered_again_on_resume(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            out = Path(td) / "out"
+            product_dir = generate_product_package(make_product("SKU1"), out, batch_id=None)
+            jobs = [dataclasses.replace(j, source_sha256=("a" * 64,)) for j in iter_render_jobs(product_dir)]
+            self.assertEqual(render_jobs(out, jobs, _PlainBackend({})).rendered, 7)
+            self.assertEqual(render_jobs(out, jobs, _PlainBackend({})).skipped, 7)
+
+            jobs = [dataclasses.replace(j, source_sha256=("b" * 64,)) for j in jobs]
+            result = render_jobs(out, jobs, _PlainBackend({}))
+            self.assertEqual((result.rendered, result.skipped), (7, 0))
+
+    def test_token_bucket_limits_rate_after_burst(self) -> None:
+        bucket = TokenBucket(rate=50, burst=5)
+        start = time.monotonic()
+        for _ in range(15):
+            bucket.acquire()
+        elapsed = time.monotonic() - start
+        self.assertGreaterEqual(elapsed, 0.18)
+        self.assertLess(elapsed, 2.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+from pathlib import Path
+
+from mvp_image_workflow.generator import generate_product_package
+from mvp_image_workflow.render import HttpBackend, render_jobs
+from mvp_image_workflow.rendercache import RenderCache, cache_key
+from mvp_image_workflow.renderjobs import iter_render_jobs
+from mvp_image_workflow.stubserver import StubRenderServer
+
+from support import make_product
+
+
+class TestRenderCache(unittest.TestCase):
+    def test_unchanged_shots_are_hardlinked_from_cache(self) -> None:
+        with tempfile.TemporaryDirectory() as td, StubRenderServer(size=16) as server:
+            root = Path(td)
+            backend = HttpBackend(server.endpoint)
+            with RenderCache(root / "cache") as cache:
+                try:
+                    first = generate_product_package(make_product("SKU1"), root / "week1", batch_id=None)
+                    result = render_jobs(root / "week1", iter_render_jobs(first), backend, cache=cache)
+                    self.assertEqual((result.rendered, result.cached), (7, 0))
+
+                    second = generate_product_package(make_product("SKU1"), root / "week2", batch_id=None)
+                    result = render_jobs(root / "week2", iter_render_jobs(second), backend, cache=cache)
+                    self.assertEqual((result.rendered, result.cached), (0, 7))
+                    self.assertEqual(server.requests, 7)
+
+                    job = next(iter_render_jobs(second))
+                    hit = cache.get(cache_key(job, "1"))
+                    self.assertIsNotNone(hit)
+                    self.assertTrue(os.path.samefile(hit[0], root / "week2" / job.target))
+
+                    # Another SKU, or a new style pack version, must not reuse these renders.
+                    other = generate_product_package(make_product("SKU2"), root / "week2", batch_id=None)
+                    result = render_jobs(root / "week2", iter_render_jobs(other), backend, cache=cache)
+                    self.assertEqual(result.cached, 0)
+                    third = generate_product_package(make_product("SKU1"), root / "week3", batch_id=None)
+                    result = render_jobs(
+                        root / "week3", iter_render_jobs(third), backend, cache=cache, style_pack_version="2"
+                    )
+                    self.assertEqual(result.cached, 0)
+                finally:
+                    backend.close()
+
+    def test_lru_eviction_keeps_cache_under_limit(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            with RenderCache(root / "cache", max_bytes=250) as cache:
+                for i in range(3):
+                    src = root / f"img{i}.png"
+                    src.write_bytes(bytes([i]) * 100)
+                    cache.put(f"key{i}", src, f"{i:064x}", 100)
+                    if i == 1:
+                        self.assertIsNotNone(cache.get("key0"))  # key1 is now least recently used
+                self.assertLessEqual(cache.total_bytes(), 250)
+                self.assertIsNone(cache.get("key1"))
+                self.assertIsNotNone(cache.get("key0"))
+                self.assertIsNotNone(cache.get("key2"))
+                self.assertFalse(cache.object_path(f"{1:064x}").exists())
+                self.assertEqual(cache.total_bytes(), 200)
+                # Hits share the inode with package copies, so the cache must not change its mode.
+                self.assertTrue((root / "img2.png").stat().st_mode & 0o200)
+
+            with RenderCache(root / "cache", max_bytes=250) as cache:
+                self.assertEqual(cache.total_bytes(), 200)
+
+    def test_object_evicted_after_lookup_is_a_miss(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            src = root / "img.png"
+            src.write_bytes(b"png")
+            with RenderCache(root / "cache") as cache:
+                cache.put("key", src, "a" * 64, 3)
+                real_get = cache.get
+
+                def get_then_evict(key):
+                    hit = real_get(key)
+                    hit[0].unlink()  # another process evicts it before the link
+                    return hit
+
+                with mock.patch.object(cache, "get", get_then_evict):
+                    self.assertIsNone(cache.materialize("key", root / "pkg" / "img.png"))
+                self.assertFalse((root / "pkg" / "img.png").exists())
+                self.assertIsNone(cache.get("key"))
+                self.assertEqual(cache.total_bytes(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import json
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+
+from mvp_image_workflow.cli import main as cli_main
+from mvp_image_workflow.generator import generate_product_package
+from mvp_image_workflow.renderjobs import iter_render_jobs
+from mvp_image_workflow.util import ValidationError
+
+from support import make_product
+
+
+class TestExportJobs(unittest.TestCase):
+    def test_export_jobs_writes_one_record_per_expected_image(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            out = root / "out"
+            for pid in ("SKU1", "SKU2"):
+                generate_product_package(make_product(pid), out, batch_id="B1")
+
+            with redirect_stdout(StringIO()):
+                code = cli_main(["export-jobs", "--out", str(out), "--jsonl", str(root / "jobs.jsonl")])
+            self.assertEqual(code, 0)
+            jobs = [json.loads(line) for line in (root / "jobs.jsonl").read_text(encoding="utf-8").splitlines()]
+            self.assertEqual(len(jobs), 14)
+
+            manifest = json.loads((out / "SKU1" / "manifest.json").read_text(encoding="utf-8"))
+            sku1 = [j for j in jobs if j["product_id"] == "SKU1"]
+            for category, files in manifest["expected_outputs"].items():
+                self.assertEqual([j["filename"] for j in sku1 if j["category"] == category], files)
+
+            spec = next(j for j in sku1 if j["filename"] == "SKU1_spec_02_B1.png")
+            self.assertEqual(spec["target"], "SKU1/spec/backgrounds/SKU1_spec_02_B1.png")
+            self.assertEqual(spec["output"], "SKU1/spec/SKU1_spec_02_B1.png")
+            self.assertEqual(spec["style_pack"], "minimal_white")
+            self.assertEqual(spec["text_source"], "texts/spec_02.txt")
+            self.assertTrue(spec["text_overlay"].startswith("Key Specs"))
+            self.assertIn("TEXT SOURCE (for later overlay): texts/spec_02.txt", spec["prompt"])
+            showcase = next(j for j in sku1 if j["category"] == "showcase")
+            self.assertIsNone(showcase["text_overlay"])
+            self.assertEqual(showcase["target"], showcase["output"])
+
+    def test_manifest_paths_cannot_lead_out_of_the_package(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            product_dir = generate_product_package(make_product("SKU1"), root / "out", batch_id=None)
+            manifest_path = product_dir / "manifest.json"
+            original = manifest_path.read_text(encoding="utf-8")
+            (root / "elsewhere").mkdir()
+            (product_dir / "escape").symlink_to(root / "elsewhere")
+
+            edits = (
+                lambda m: m["paths"].update(spec_dir="../../x"),
+                lambda m: m["paths"].update(prompts_dir="/etc"),
+                lambda m: m["paths"].update(showcase_dir="escape"),
+                lambda m: m["expected_outputs"]["spec"].__setitem__(0, "../../x.png"),
+            )
+            for edit in edits:
+                manifest = json.loads(original)
+                edit(manifest)
+                manifest_path.write_text(json.dumps(manifest), encoding="utf-8")
+                with self.subTest(paths=manifest["paths"]), self.assertRaises(ValidationError):
+                    list(iter_render_jobs(product_dir))
+            self.assertEqual(list((root / "elsewhere").iterdir()), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import json
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from io import StringIO
+from pathlib import Path
+
+from mvp_image_workflow.cli import main as cli_main
+from mvp_image_workflow.runledger import RUN_LEDGER_NAME, read_run_ledger
+from mvp_image_workflow.storage import LocalSink
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+EXAMPLE_CSV = REPO_ROOT / "examples" / "products_minimum.csv"
+
+
+def _run(argv: list[str]) -> int:
+    with redirect_stdout(StringIO()), redirect_stderr(StringIO()):
+        return cli_main(argv)
+
+
+class TestRunLedger(unittest.TestCase):
+    def test_generate_and_validate_append_records(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            out = root / "out"
+            metrics = root / "metrics" / "generate.prom"
+            argv = ["generate", "--input", str(EXAMPLE_CSV), "--out", str(out), "--batch-id", "B1"]
+            self.assertEqual(_run(argv + ["--metrics-file", str(metrics)]), 0)
+            self.assertEqual(_run(argv), 0)
+            self.assertEqual(_run(["validate", "--out", str(out)]), 0)
+
+            first, second, validated = read_run_ledger(LocalSink(out))
+            self.assertEqual(first["command"], "generate")
+            self.assertEqual(first["batch_id"], "B1")
+            self.assertEqual(first["input"]["sha256"], second["input"]["sha256"])
+            self.assertEqual(first["products"], {"total": 1, "ok": 1, "failed": 0})
+            self.assertEqual(set(first["stages_s"]), {"read_input", "generate", "finalize"})
+            self.assertGreater(first["bytes_written"], 0)
+            package = [f for f in (out / "SKU123").rglob("*") if f.is_file()]
+            self.assertEqual(first["files_written"], len(package))
+            self.assertEqual(first["bytes_written"], sum(f.stat().st_size for f in package))
+            self.assertEqual(first["status"], "ok")
+            self.assertEqual(validated["command"], "validate")
+            self.assertEqual(set(validated["stages_s"]), {"discover", "validate"})
+
+            text = metrics.read_text(encoding="utf-8")
+            self.assertIn('mvp_image_workflow_run_products{command="generate",result="ok"} 1\n', text)
+            self.assertIn('mvp_image_workflow_run_success{command="generate"} 1\n', text)
+            self.assertIn('batch_id="B1"', text)
+            self.assertEqual(metrics.stat().st_mode & 0o777, 0o644)
+
+    def test_validate_records_every_failed_package(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            out = root / "out"
+            csv_path = root / "products.csv"
+            csv_path.write_text(
+                "product_id,product_name_en,spec_1,spec_2,spec_3,step_1,step_2,step_3\n"
+                "SKU1,Lamp,a,b,c,d,e,f\nSKU2,Desk,a,b,c,d,e,f\nSKU3,Chair,a,b,c,d,e,f\n",
+                encoding="utf-8",
+            )
+            self.assertEqual(_run(["generate", "--input", str(csv_path), "--out", str(out)]), 0)
+            (out / "SKU1" / "texts" / "spec_01.txt").unlink()
+            (out / "SKU3" / "texts" / "spec_01.txt").unlink()
+
+            err = StringIO()
+            metrics = root / "validate.prom"
+            with redirect_stdout(StringIO()), redirect_stderr(err):
+                code = cli_main(["validate", "--out", str(out), "--metrics-file", str(metrics)])
+            self.assertEqual(code, 2)
+            self.assertIn("Validation failed for 2 of 3 package(s)", err.getvalue())
+
+            record = read_run_ledger(LocalSink(out))[-1]
+            self.assertEqual(record["status"], "failed")
+            self.assertEqual(record["products"], {"total": 3, "ok": 1, "failed": 2})
+            self.assertEqual([f.split(":")[0] for f in sorted(record["failures"])], ["SKU1", "SKU3"])
+            self.assertIn('mvp_image_workflow_run_success{command="validate"} 0\n', metrics.read_text(encoding="utf-8"))
+
+    def test_zip_output_has_no_ledger(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            archive = Path(td) / "out.zip"
+            self.assertEqual(_run(["generate", "--input", str(EXAMPLE_CSV), "--out", str(archive)]), 0)
+            self.assertEqual(_run(["validate", "--out", str(archive)]), 0)
+            self.assertEqual(sorted(p.name for p in Path(td).iterdir()), ["out.zip"])
+
+    def test_deterministic_root_keeps_no_ledger_and_run_ledger_goes_elsewhere(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            out = root / "out"
+            ledger = root / "ledgers" / "runs.jsonl"
+            argv = ["generate", "--input", str(EXAMPLE_CSV), "--out", str(out), "--deterministic"]
+            self.assertEqual(_run(argv), 0)
+            self.assertEqual(_run(["validate", "--out", str(out)]), 0)
+            self.assertFalse((out / RUN_LEDGER_NAME).exists())
+
+            self.assertEqual(_run(argv + ["--run-ledger", str(ledger)]), 0)
+            self.assertEqual(_run(["validate", "--out", str(out), "--run-ledger", str(ledger)]), 0)
+            self.assertFalse((out / RUN_LEDGER_NAME).exists())
+            lines = ledger.read_text(encoding="utf-8").splitlines()
+            self.assertEqual([json.loads(line)["command"] for line in lines], ["generate", "validate"])
+
+
+if __name__ == "__main__":
+    unittest.main()
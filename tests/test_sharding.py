@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import csv
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from io import StringIO
+from pathlib import Path
+
+from mvp_image_workflow.cli import main as cli_main
+from mvp_image_workflow.sharding import parse_shard, shard_index
+from mvp_image_workflow.util import ValidationError
+
+
+def _write_catalog(path: Path, count: int) -> list[str]:
+    ids = [f"SKU{i:03d}" for i in range(count)]
+    with path.open("w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["product_id", "product_name_en", "spec_1", "spec_2", "spec_3", "step_1", "step_2", "step_3"])
+        for pid in ids:
+            w.writerow([pid, "Tumbler", "Capacity: 500 ml", "Insulated", "Leak-proof", "Fill", "Close", "Enjoy"])
+    return ids
+
+
+class TestSharding(unittest.TestCase):
+    def test_parse_shard(self) -> None:
+        shard = parse_shard("2/4")
+        self.assertIsNotNone(shard)
+        self.assertEqual(str(shard), "2/4")
+        for raw in ("0/4", "5/4", "1", "a/b", "1/0"):
+            with self.assertRaises(ValidationError):
+                parse_shard(raw)
+        self.assertEqual(shard_index("SKU123", 1), 1)
+        self.assertEqual(shard_index("SKU123", 7), shard_index("SKU123", 7))
+
+    def test_shards_partition_catalog_exactly_once(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            csv_path = root / "catalog.csv"
+            ids = _write_catalog(csv_path, 30)
+
+            outs = [root / f"node{i}" for i in (1, 2, 3)]
+            for i, out in enumerate(outs, start=1):
+                with redirect_stdout(StringIO()):
+                    code = cli_main(["generate", "--input", str(csv_path), "--out", str(out), "--shard", f"{i}/3"])
+                    self.assertEqual(code, 0)
+                    self.assertEqual(cli_main(["validate", "--out", str(out), "--shard", f"{i}/3"]), 0)
+
+            produced = sorted(p.parent.name for out in outs for p in out.glob("*/manifest.json"))
+            self.assertEqual(produced, ids)
+            self.assertTrue(all(any(out.glob("*/manifest.json")) for out in outs))
+
+            args = ["verify-shards", "--input", str(csv_path), "--out", *map(str, outs)]
+            with redirect_stdout(StringIO()):
+                self.assertEqual(cli_main(args), 0)
+
+            moved = next(outs[0].glob("*/manifest.json")).parent
+            shutil.copytree(moved, outs[1] / moved.name)
+            err = StringIO()
+            with redirect_stderr(err):
+                self.assertEqual(cli_main(args), 2)
+            self.assertIn(moved.name, err.getvalue())
+
+            shutil.rmtree(moved)
+            shutil.rmtree(outs[1] / moved.name)
+            with redirect_stderr(StringIO()):
+                self.assertEqual(cli_main(args), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+
+from mvp_image_workflow.cli import main as cli_main
+from mvp_image_workflow.generator import generate_product_package
+from mvp_image_workflow.sources import ingest_sources
+
+from support import make_product
+
+
+class TestIngestSources(unittest.TestCase):
+    def test_ingest_links_dedupes_and_records_fingerprints(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            out = root / "out"
+            for pid in ("SKU1", "SKU2"):
+                generate_product_package(make_product(pid), out, batch_id=None)
+
+            suppliers = root / "suppliers"
+            (suppliers / "SKU1").mkdir(parents=True)
+            (suppliers / "SKU2").mkdir(parents=True)
+            (suppliers / "SKU1" / "front.jpg").write_bytes(b"front-1")
+            (suppliers / "SKU1" / "shared.png").write_bytes(b"same-bytes")
+            (suppliers / "SKU1" / "notes.txt").write_text("ignored", encoding="utf-8")
+            (suppliers / "SKU2" / "shared_copy.png").write_bytes(b"same-bytes")
+            (suppliers / "SKU9").mkdir()
+
+            with redirect_stdout(StringIO()):
+                code = cli_main(
+                    ["ingest-sources", "--out", str(out), "--sources", str(suppliers), "--mode", "hardlink"]
+                )
+            self.assertEqual(code, 0)
+
+            placed = out / "SKU1" / "source" / "front.jpg"
+            self.assertEqual(placed.read_bytes(), b"front-1")
+            self.assertTrue(os.path.samefile(placed, suppliers / "SKU1" / "front.jpg"))
+            self.assertFalse((out / "SKU1" / "source" / "notes.txt").exists())
+            # Identical content across SKUs shares one inode.
+            self.assertTrue(
+                os.path.samefile(out / "SKU1" / "source" / "shared.png", out / "SKU2" / "source" / "shared_copy.png")
+            )
+
+            manifest = json.loads((out / "SKU2" / "manifest.json").read_text(encoding="utf-8"))
+            self.assertEqual(manifest["source_fingerprints"][0]["file"], "source/shared_copy.png")
+            self.assertEqual(manifest["source_fingerprints"][0]["size"], len(b"same-bytes"))
+
+            result = ingest_sources(out, {"SKU1": suppliers / "SKU1"}, mode="copy")
+            self.assertEqual(result.unchanged, 2)
+            self.assertEqual(result.methods, {})
+
+            # Regenerating the package keeps the recorded fingerprints.
+            generate_product_package(make_product("SKU2"), out, batch_id=None)
+            manifest = json.loads((out / "SKU2" / "manifest.json").read_text(encoding="utf-8"))
+            self.assertEqual(len(manifest["source_fingerprints"]), 1)
+
+    def test_ingest_auto_falls_back_and_copies_are_independent(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            out = root / "out"
+            generate_product_package(make_product("SKU1"), out, batch_id=None)
+            folder = root / "sup"
+            folder.mkdir()
+            (folder / "a.jpg").write_bytes(b"aaa")
+
+            result = ingest_sources(out, {"SKU1": folder}, mode="copy")
+            self.assertEqual(result.methods, {"copy": 1})
+            self.assertFalse(os.path.samefile(out / "SKU1" / "source" / "a.jpg", folder / "a.jpg"))
+
+            (folder / "a.jpg").write_bytes(b"changed")
+            result = ingest_sources(out, {"SKU1": folder}, mode="auto")
+            self.assertEqual(sum(result.methods.values()), 1)
+            self.assertEqual((out / "SKU1" / "source" / "a.jpg").read_bytes(), b"changed")
+
+    def test_deterministic_ingest_matches_deterministic_generate(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            out = root / "out"
+            generate_product_package(make_product("SKU1"), out, batch_id=None, source_date_epoch=0)
+            folder = root / "sup"
+            folder.mkdir()
+            (folder / "a.jpg").write_bytes(b"aaa")
+
+            ingest_sources(out, {"SKU1": folder}, mode="copy", deterministic=True)
+            manifest_path = out / "SKU1" / "manifest.json"
+            ingested = manifest_path.read_bytes()
+            manifest = json.loads(ingested)
+            self.assertEqual(list(manifest), sorted(manifest))
+
+            generate_product_package(make_product("SKU1"), out, batch_id=None, source_date_epoch=0)
+            self.assertEqual(manifest_path.read_bytes(), ingested)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import threading
+import unittest
+import zipfile
+from contextlib import redirect_stdout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+
+from mvp_image_workflow.cli import main as cli_main
+from mvp_image_workflow.generator import generate_product_package
+from mvp_image_workflow.storage import ArchiveSink, LocalSink, PipelinedSink, S3Sink
+
+from support import make_product
+
+
+class _FakeS3:
+    """In-process stand-in for an S3-compatible server (path-style PUT/GET/multipart)."""
+
+    def __init__(self, fail_first_puts: int = 0) -> None:
+        self.objects: dict[str, bytes] = {}
+        self.uploads: dict[str, dict[int, bytes]] = {}
+        self.client_ports: set[int] = set()
+        self.fail_remaining = fail_first_puts
+        self.lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args: object) -> None:
+                pass
+
+            def _reply(self, status: int, body: bytes = b"", headers: dict[str, str] | None = None) -> None:
+                self.send_response(status)
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _parse(self) -> tuple[str, dict[str, list[str]], bytes]:
+                with fake.lock:
+                    fake.client_ports.add(self.client_address[1])
+                parts = urlsplit(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                return parts.path, parse_qs(parts.query, keep_blank_values=True), body
+
+            def do_PUT(self) -> None:
+                path, query, body = self._parse()
+                with fake.lock:
+                    if fake.fail_remaining > 0:
+                        fake.fail_remaining -= 1
+                        self._reply(503)
+                        return
+                    if "uploadId" in query:
+                        fake.uploads[query["uploadId"][0]][int(query["partNumber"][0])] = body
+                    else:
+                        fake.objects[path] = body
+                self._reply(200, headers={"ETag": '"etag"'})
+
+            def do_GET(self) -> None:
+                path, _query, _body = self._parse()
+                with fake.lock:
+                    data = fake.objects.get(path)
+                if data is None:
+                    self._reply(404)
+                else:
+                    self._reply(200, data)
+
+            def do_POST(self) -> None:
+                path, query, _body = self._parse()
+                with fake.lock:
+                    if "uploads" in query:
+                        upload_id = f"u{len(fake.uploads) + 1}"
+                        fake.uploads[upload_id] = {}
+                        body = f"<InitiateMultipartUploadResult><UploadId>{upload_id}</UploadId></InitiateMultipartUploadResult>"
+                        self._reply(200, body.encode("utf-8"))
+                        return
+                    parts = fake.uploads.pop(query["uploadId"][0])
+                    fake.objects[path] = b"".join(parts[n] for n in sorted(parts))
+                self._reply(200, b"<CompleteMultipartUploadResult/>")
+
+            def do_DELETE(self) -> None:
+                _path, query, _body = self._parse()
+                with fake.lock:
+                    fake.uploads.pop(query.get("uploadId", [""])[0], None)
+                self._reply(204)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> _FakeS3:
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestStorageSinks(unittest.TestCase):
+    def test_s3_sink_uploads_package_with_pooled_connections(self) -> None:
+        with _FakeS3() as s3:
+            sink = S3Sink("bucket", "runs/r1", endpoint_url=s3.endpoint, max_workers=4, retry_backoff=0)
+            with sink:
+                for i in range(5):
+                    generate_product_package(make_product(f"SKU{i}"), "unused", batch_id="B1", sink=sink)
+
+            keys = sorted(s3.objects)
+            self.assertIn("/bucket/runs/r1/SKU0/manifest.json", keys)
+            self.assertEqual(len([k for k in keys if k.startswith("/bucket/runs/r1/SKU3/")]), 15)
+            # Four upload workers plus the caller's manifest lookups share keep-alive connections.
+            self.assertLessEqual(len(s3.client_ports), 5)
+
+    def test_s3_sink_retries_transient_errors_and_multipart(self) -> None:
+        with _FakeS3(fail_first_puts=2) as s3:
+            sink = S3Sink(
+                "bucket",
+                endpoint_url=s3.endpoint,
+                max_workers=2,
+                retry_backoff=0,
+                multipart_threshold=10,
+                part_size=4,
+                access_key="AKID",
+                secret_key="secret",
+            )
+            with sink:
+                sink.write_bytes("a.txt", b"tiny")
+                sink.write_bytes("big.bin", b"0123456789abcdef")
+            self.assertEqual(s3.objects["/bucket/a.txt"], b"tiny")
+            self.assertEqual(s3.objects["/bucket/big.bin"], b"0123456789abcdef")
+            self.assertEqual(s3.uploads, {})
+
+    def test_s3_sink_gives_up_after_retries(self) -> None:
+        with _FakeS3(fail_first_puts=100) as s3:
+            sink = S3Sink("bucket", endpoint_url=s3.endpoint, max_workers=1, max_retries=1, retry_backoff=0)
+            with self.assertRaises(OSError):
+                with sink:
+                    sink.write_bytes("a.txt", b"x")
+                    sink.flush()
+
+    def test_archive_sink_round_trips_through_validate(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            archive = Path(td) / "batch.zip"
+            with ArchiveSink(archive) as sink:
+                generate_product_package(make_product(), td, batch_id=None, sink=sink)
+
+            with zipfile.ZipFile(archive) as zf:
+                names = set(zf.namelist())
+            self.assertIn("SKU123/manifest.json", names)
+            self.assertIn("SKU123/showcase/", names)
+
+            with redirect_stdout(StringIO()):
+                self.assertEqual(cli_main(["validate", "--out", str(archive)]), 0)
+
+    def test_archive_sink_is_discarded_on_failure(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            archive = Path(td) / "batch.zip"
+            with self.assertRaises(RuntimeError):
+                with ArchiveSink(archive) as sink:
+                    sink.write_bytes("a.txt", b"x")
+                    raise RuntimeError("boom")
+            self.assertFalse(archive.exists())
+            self.assertEqual(list(Path(td).iterdir()), [])
+
+    def test_pipelined_sink_writes_everything_and_drains_before_unlock(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td) / "out"
+            sink = PipelinedSink(LocalSink(root), workers=4, max_pending=2)
+            with sink:
+                for i in range(6):
+                    generate_product_package(make_product(f"SKU{i}"), root, batch_id=None, sink=sink)
+                    # The product lock is released only after its writes have landed.
+                    self.assertTrue((root / f"SKU{i}" / "meta" / "product.json").is_file())
+            self.assertEqual(len(list(root.glob("*/manifest.json"))), 6)
+            self.assertTrue((root / "SKU5" / "showcase").is_dir())
+
+    def test_pipelined_sink_reads_its_queued_writes(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td) / "out"
+            inner = LocalSink(root)
+            inner.write_bytes("a.txt", b"old")
+            release = threading.Event()
+            real_write = inner.write_bytes
+
+            def slow_write(rel: str, data: bytes) -> None:
+                release.wait()
+                real_write(rel, data)
+
+            with mock.patch.object(inner, "write_bytes", side_effect=slow_write):
+                sink = PipelinedSink(inner, workers=1)
+                sink.write_bytes("a.txt", b"new")
+                sink.write_bytes("b.txt", b"b")
+                self.assertEqual(sink.read_bytes("a.txt"), b"new")
+                self.assertTrue(sink.exists("b.txt"))
+                self.assertEqual((root / "a.txt").read_bytes(), b"old")
+                release.set()
+                sink.close()
+            self.assertEqual(sink._pending, {})
+            self.assertEqual(sink.read_bytes("a.txt"), b"new")
+
+    def test_pipelined_sink_surfaces_write_errors(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            (root / "blocked").write_text("file, not a folder", encoding="utf-8")
+            sink = PipelinedSink(LocalSink(root), workers=2)
+            with self.assertRaises(OSError):
+                with sink:
+                    sink.write_bytes("blocked/a.txt", b"x")
+                    sink.flush()
+
+    def test_durability_levels_control_fsync(self) -> None:
+        real_fsync = os.fsync
+        cases = (("none", 1000, 0), ("file", 1000, None), ("batch", 1000, 0), ("batch", 20, None))
+        for level, checkpoint_every, expected_before_close in cases:
+            with self.subTest(level=level, checkpoint_every=checkpoint_every), tempfile.TemporaryDirectory() as td:
+                out = Path(td) / "out"
+                sink = LocalSink(out, durability=level, checkpoint_every=checkpoint_every)
+                with mock.patch("os.fsync", side_effect=real_fsync) as fsync:
+                    for i in range(3):
+                        generate_product_package(make_product(f"SKU{i}"), out, batch_id=None, sink=sink)
+                    before_close = fsync.call_count
+                    sink.close()
+
+                if expected_before_close is not None:
+                    self.assertEqual(before_close, expected_before_close)
+                else:
+                    self.assertGreater(before_close, 20)
+                if level == "none":
+                    self.assertEqual(fsync.call_count, 0)
+                else:
+                    # 14 files per product, each synced, plus their folders.
+                    self.assertGreater(fsync.call_count, 3 * 14)
+
+if __name__ == "__main__":
+    unittest.main()
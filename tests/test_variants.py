@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import csv
+import json
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from io import StringIO
+from pathlib import Path
+
+from mvp_image_workflow.cli import main as cli_main
+from mvp_image_workflow.util import ValidationError
+from mvp_image_workflow.validator import validate_product_package
+from mvp_image_workflow.variants import VARIANTS_FILE, VARIANTS_KEY, read_orders_csv
+
+EXAMPLE_CSV = Path(__file__).resolve().parents[1] / "examples" / "products_minimum.csv"
+
+
+def _write_orders(path: Path, rows: list[tuple[str, str, str]]) -> None:
+    with path.open("w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["order_id", "product_id", "personalization_text_en"])
+        w.writerows(rows)
+
+
+class TestPersonalizationVariants(unittest.TestCase):
+    def test_generate_with_orders_writes_one_overlay_per_product(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            with EXAMPLE_CSV.open(encoding="utf-8-sig", newline="") as f:
+                pid = next(csv.DictReader(f))["product_id"]
+            orders = [(f"ORD{i:04d}", pid, f"For Sam #{i}") for i in range(500, 0, -1)]
+            _write_orders(root / "orders.csv", orders)
+
+            out = root / "out"
+            with redirect_stdout(StringIO()) as stdout:
+                code = cli_main(
+                    ["generate", "--input", str(EXAMPLE_CSV), "--out", str(out), "--orders", str(root / "orders.csv")]
+                )
+            self.assertEqual(code, 0)
+            self.assertIn("with 500 personalization variant(s)", stdout.getvalue())
+
+            product_dir = out / pid
+            manifest = json.loads((product_dir / "manifest.json").read_text(encoding="utf-8"))
+            self.assertEqual(manifest[VARIANTS_KEY], {"file": VARIANTS_FILE, "count": 500})
+            lines = (product_dir / VARIANTS_FILE).read_text(encoding="utf-8").splitlines()
+            self.assertEqual(len(lines), 500)
+            self.assertEqual(json.loads(lines[0]), {"order_id": "ORD0001", "personalization_text_en": "For Sam #1"})
+            validate_product_package(product_dir, require_images=False)
+
+            (product_dir / VARIANTS_FILE).write_text(lines[0] + "\n", encoding="utf-8")
+            with self.assertRaisesRegex(ValidationError, "has 1 variant"):
+                validate_product_package(product_dir, require_images=False)
+
+            outside = root / "outside.jsonl"
+            outside.write_text(lines[0] + "\n", encoding="utf-8")
+            (product_dir / "texts" / "link.jsonl").symlink_to(outside)
+            for file in ("../../outside.jsonl", str(outside), "texts/link.jsonl"):
+                manifest[VARIANTS_KEY] = {"file": file, "count": 1}
+                (product_dir / "manifest.json").write_text(json.dumps(manifest), encoding="utf-8")
+                with self.assertRaisesRegex(ValidationError, "points outside the package"):
+                    validate_product_package(product_dir, require_images=False)
+
+    def test_orders_are_validated(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            _write_orders(root / "dup.csv", [("O1", "SKU1", "Hello"), ("O1", "SKU1", "Again")])
+            with self.assertRaisesRegex(ValidationError, "line 3: Duplicate order_id"):
+                read_orders_csv(root / "dup.csv")
+
+            _write_orders(root / "unknown.csv", [("O1", "NOPE", "Hello")])
+            with redirect_stderr(StringIO()) as stderr:
+                code = cli_main(
+                    ["generate", "--input", str(EXAMPLE_CSV), "--out", str(root / "out"),
+                     "--orders", str(root / "unknown.csv")]
+                )
+            self.assertEqual(code, 2)
+            self.assertIn("missing from the catalog: NOPE", stderr.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()